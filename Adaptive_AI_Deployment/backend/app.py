@@ -1,6 +1,9 @@
 import sys
 import os
 import traceback
+import json
+import hmac
+import math
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -9,13 +12,18 @@ load_dotenv()
 # Allow import from parent directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
 from models.emotion_text import detect_text_emotion
-from models.emotion_face import detect_face_emotion
-from models.empathetic_responder import generate_empathetic_response
+from models.emotion_face import detect_face_emotion, decode_frame, render_options
+from models.face_workers import analyze_face, face_pool
+from models.face_video import (analyze_face_sequence, analyze_face_clip, detect_face_emotion_sequence, iter_frames,
+                               ClipTooLarge, FACE_VIDEO_FPS, FACE_VIDEO_MAX_FRAMES)
+from models.empathetic_responder import generate_empathetic_response, stream_empathetic_response
 from models.conversation_context import get_session_memory
 from rl_engine.therapy_rl import choose_therapy, update_recommendation_model
 from backend.database import init_db, save_analysis, save_conversation_turn, get_conversation_history, get_previous_emotional_state, save_feedback
+from backend.pipeline import StageGraph
 import uuid
 
 app = Flask(__name__)
@@ -55,153 +63,412 @@ def feedback():
         print(f"Feedback Error: {e}")
         return jsonify({"error": str(e)}), 500
 
+# --- FRAME UPLOADS ---
+# Clients send their own camera frame (JPEG/PNG) so the face pipeline does
+# not depend on a webcam attached to the server.
+MAX_FRAME_BYTES = int(os.environ.get("MAX_FRAME_BYTES", 8 * 1024 * 1024))
+# Largest clip / frame sequence accepted by /analyze_video
+MAX_VIDEO_BYTES = int(os.environ.get("MAX_VIDEO_BYTES", 32 * 1024 * 1024))
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+def _read_frame_upload():
+    """
+    Return the uploaded frame bytes: a multipart 'frame' file, or the raw body
+    of an image/* or application/octet-stream request. None if there is no frame.
+    The bytes are handed to decode_frame as-is (no base64, no temp file).
+    """
+    if request.content_length and request.content_length > MAX_FRAME_BYTES:
+        raise RequestEntityTooLarge(f"Frame larger than {MAX_FRAME_BYTES} bytes")
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("frame")
+        if upload is None:
+            return None
+        stream = upload.stream
+        # Small uploads are held in a BytesIO; share its buffer instead of copying it
+        return stream.getbuffer() if hasattr(stream, "getbuffer") else stream.read()
+    if request.mimetype.startswith("image/") or request.mimetype == "application/octet-stream":
+        return request.get_data(cache=False)
+    return None
+
+def _read_analyze_request():
+    """
+    Parse an /analyze request: JSON, or multipart form fields plus a 'frame' file.
+    Returns (fields, frame_bytes).
+    """
+    if request.mimetype == "multipart/form-data":
+        data = request.form.to_dict()
+        data["use_camera"] = data.get("use_camera", "").lower() in _TRUE_VALUES
+        return data, _read_frame_upload()
+    return request.get_json(force=True), None
+
+def _capture_face(use_camera, frame_bytes=None, render=None):
+    """
+    Run facial analysis on the uploaded frame, or on the server camera if requested.
+    render: processed-frame options from render_options().
+    Returns the detect_face_emotion() tuple.
+    """
+    if frame_bytes is not None:
+        frame = decode_frame(frame_bytes)
+        if frame is None:
+            return "Neutral", {}, None, {}, "Uploaded frame could not be decoded."
+        return analyze_face(frame, render)
+    if not use_camera:
+        return "Neutral", {}, None, {}, ""
+    try:
+        return detect_face_emotion(render, analyze=analyze_face)
+    except Exception as e:
+        print(f"Camera error: {e}")
+        return "Neutral", {}, None, {}, "Camera error."
+
+def _combine_emotions(text_result, face_result):
+    """Face emotion wins unless it is Neutral."""
+    text_emotion = text_result[0].get("label", "Neutral")
+    face_emotion = face_result[0]
+    return face_emotion if face_emotion != "Neutral" else text_emotion
+
+def _build_stage_graph(text, use_camera, session_id, conversation_context, recent_history, include_response=True,
+                       frame_bytes=None, render=None):
+    """
+    Build the /analyze stage graph.
+    text/face/history run in parallel; recommendations wait for text+face;
+    the LLM response joins everything; the DB writes overlap with each other.
+    The streaming endpoint leaves out the response stages and runs them itself.
+    """
+    def recommend(text_result, face_result):
+        return choose_therapy(_combine_emotions(text_result, face_result), face_result[3])
+
+    def respond(text_result, face_result, recommendations, history):
+        return generate_empathetic_response(
+            text_emotion=text_result[0].get("label", "Neutral"),
+            face_emotion=face_result[0],
+            final_emotion=_combine_emotions(text_result, face_result),
+            user_text=text,
+            recommendations=recommendations,
+            context=conversation_context,
+            historical_context=history,
+            conversation_history=recent_history
+        )
+
+    def persist_turn(text_result, face_result, response):
+        return save_conversation_turn(
+            session_id=session_id,
+            user_text=text,
+            ai_response=response.get("conversational_response"),
+            emotion=_combine_emotions(text_result, face_result),
+            emotion_intensity=text_result[0].get("intensity", "moderate")
+        )
+
+    def persist_analysis(text_result, face_result, recommendations):
+        # Save to analysis history (existing functionality)
+        return save_analysis(
+            text_input=text,
+            text_emotion=text_result[0].get("label", "Neutral"),
+            face_emotion=face_result[0],
+            final_emotion=_combine_emotions(text_result, face_result),
+            recs=recommendations
+        )
+
+    graph = StageGraph()
+    graph.add("text_result", lambda: detect_text_emotion(text))
+    graph.add("face_result", lambda: _capture_face(use_camera, frame_bytes, render))
+    # Historical emotional state (long-term memory)
+    graph.add("history", lambda: get_previous_emotional_state(session_id))
+    graph.add("recommendations", recommend, deps=("text_result", "face_result"))
+    graph.add("save_analysis", persist_analysis, deps=("text_result", "face_result", "recommendations"))
+    if include_response:
+        graph.add("response", respond, deps=("text_result", "face_result", "recommendations", "history"))
+        graph.add("save_turn", persist_turn, deps=("text_result", "face_result", "response"))
+    return graph
+
+def _build_analysis_payload(session_id, results, conversation_context):
+    """Turn the stage results into the emotion/recommendation part of the response."""
+    text_result = results["text_result"]
+    text_emotion = text_result[0].get("label", "Neutral")
+    emotion_intensity = text_result[0].get("intensity", "moderate")
+    face_emotion, face_details, processed_frame, face_features, feature_desc = results["face_result"]
+    final_emotion = _combine_emotions(text_result, results["face_result"])
+    recommendations = results["recommendations"]
+    
+    # --- EMOTION REFINEMENT LOGIC ---
+    # Refine Face Emotion Labels
+    refined_face_emotion = face_emotion
+    ear = face_features.get("ear", 0.5)
+    
+    if face_emotion == "Fear":
+        refined_face_emotion = "Nervous"
+    elif face_emotion == "Happy" and ear > 0.32:
+         refined_face_emotion = "Enjoying"
+    elif face_emotion == "Sad":
+        # Check for high intensity or physical cues of crying (e.g., very low EAR or specific mesh patterns if we had them)
+        # For now, use intensity or low EAR as a proxy for "shut town" sadness
+        if ear < 0.22 or emotion_intensity == "high":
+            refined_face_emotion = "Crying"
+    
+    # Refine Text Emotion Labels (Simple Mapping)
+    refined_text_emotion = text_emotion
+    if text_emotion == "Anxious":
+        refined_text_emotion = "Nervous"
+        
+    # Construct Final Declaration
+    if refined_face_emotion == "Neutral" and refined_text_emotion == "Neutral":
+         final_declaration = "You seem calm and balanced today."
+    elif refined_face_emotion != "Neutral":
+        final_declaration = f"You seem {refined_text_emotion.lower()}, and your face shows signs of being {refined_face_emotion.lower()}."
+    else:
+         final_declaration = f"I sense you are feeling {refined_text_emotion.lower()}."
+
+    # Use the feature description from the model if available, otherwise fallback
+    face_feature_desc = feature_desc if feature_desc else "No specific physical cues detected."
+
+    return {
+        "session_id": session_id,  # Return session ID for client to maintain
+        "text_emotion": refined_text_emotion,
+        "face_emotion": refined_face_emotion,
+        "final_declaration": final_declaration,
+        "face_details": face_details,
+        "processed_frame": processed_frame,
+        "face_landmarks": face_features.get("landmarks"),
+        "face_feature_desc": face_feature_desc,
+        "final_emotion": final_emotion,
+        "emotion_intensity": emotion_intensity,
+        "therapy": recommendations.get("therapy"),
+        "meditation": recommendations.get("meditation"),
+        "activity": recommendations.get("activity"),
+        "music": recommendations.get("music"),
+        "movie": recommendations.get("movie"),
+        "game": recommendations.get("game"),
+        # Context information
+        "conversation_context": {
+            "relationship_stage": conversation_context.get("relationship_stage"),
+            "emotion_trend": conversation_context.get("emotion_trend"),
+            "total_turns": conversation_context.get("total_turns")
+        }
+    }
+
 @app.route("/analyze", methods=["POST"])
 def analyze():
     try:
-        data = request.get_json(force=True)
+        data, frame_bytes = _read_analyze_request()
         text = data.get("text", "")
         use_camera = data.get("use_camera", False)
         session_id = data.get("session_id", str(uuid.uuid4()))  # Generate if not provided
 
-        text_result = detect_text_emotion(text)
-        text_emotion = text_result[0].get("label", "Neutral")
-        emotion_intensity = text_result[0].get("intensity", "moderate")
-
-        # Check if user wants facial analysis
-        face_emotion = "Neutral"
-        face_details = {}
-        processed_frame = None
-        face_features = {}
-        feature_desc = ""
-        
-        if use_camera:
-            try:
-                face_emotion, face_details, processed_frame, face_features, feature_desc = detect_face_emotion()
-            except Exception as e:
-                print(f"Camera error: {e}")
-                face_emotion = "Neutral"
-                face_details = {}
-                processed_frame = None
-                face_features = {}
-                feature_desc = "Camera error."
-
-        final_emotion = face_emotion if face_emotion != "Neutral" else text_emotion
-        
-        # --- EMOTION REFINEMENT LOGIC ---
-        # Refine Face Emotion Labels
-        refined_face_emotion = face_emotion
-        ear = face_features.get("ear", 0.5)
-        
-        if face_emotion == "Fear":
-            refined_face_emotion = "Nervous"
-        elif face_emotion == "Happy" and ear > 0.32:
-             refined_face_emotion = "Enjoying"
-        elif face_emotion == "Sad":
-            # Check for high intensity or physical cues of crying (e.g., very low EAR or specific mesh patterns if we had them)
-            # For now, use intensity or low EAR as a proxy for "shut town" sadness
-            if ear < 0.22 or emotion_intensity == "high":
-                refined_face_emotion = "Crying"
-        
-        # Refine Text Emotion Labels (Simple Mapping)
-        refined_text_emotion = text_emotion
-        if text_emotion == "Anxious":
-            refined_text_emotion = "Nervous"
-            
-        # Construct Final Declaration
-        if refined_face_emotion == "Neutral" and refined_text_emotion == "Neutral":
-             final_declaration = "You seem calm and balanced today."
-        elif refined_face_emotion != "Neutral":
-            final_declaration = f"You seem {refined_text_emotion.lower()}, and your face shows signs of being {refined_face_emotion.lower()}."
-        else:
-             final_declaration = f"I sense you are feeling {refined_text_emotion.lower()}."
-
-        # Use the feature description from the model if available, otherwise fallback
-        face_feature_desc = feature_desc if feature_desc else "No specific physical cues detected."
-
-        # Get enhanced recommendations
-        recommendations = choose_therapy(final_emotion, face_features)
-        
         # Get conversation context from session memory
         session_memory = get_session_memory(session_id)
         conversation_context = session_memory.get_context_for_response()
-        
-        # Get historical emotional state (long-term memory)
-        historical_context = get_previous_emotional_state(session_id)
-        
+
         # Get explicit conversation history (last 20 turns)
         recent_history = session_memory.get_recent_exchanges(20)
 
-        # Generate empathetic conversational response with context
-        empathetic_response = generate_empathetic_response(
-            text_emotion=text_emotion,
-            face_emotion=face_emotion,
-            final_emotion=final_emotion,
-            user_text=text,
-            recommendations=recommendations,
-            context=conversation_context,
-            historical_context=historical_context,
-            conversation_history=recent_history
-        )
-        
+        graph = _build_stage_graph(text, use_camera, session_id, conversation_context, recent_history,
+                                   frame_bytes=frame_bytes, render=render_options(data))
+        results = graph.run()
+
+        payload = _build_analysis_payload(session_id, results, conversation_context)
+        empathetic_response = results["response"]
         ai_response = empathetic_response.get("conversational_response")
         
-        # Save conversation turn to memory and database
+        # Save conversation turn to session memory (the DB write ran in the pipeline)
         session_memory.add_exchange(
             user_text=text,
             ai_response=ai_response,
-            emotion=final_emotion,
-            emotion_intensity=emotion_intensity
-        )
-        
-        save_conversation_turn(
-            session_id=session_id,
-            user_text=text,
-            ai_response=ai_response,
-            emotion=final_emotion,
-            emotion_intensity=emotion_intensity
+            emotion=payload["final_emotion"],
+            emotion_intensity=payload["emotion_intensity"]
         )
 
-        # Save to analysis history (existing functionality)
-        save_analysis(
-            text_input=text,
-            text_emotion=text_emotion,
-            face_emotion=face_emotion,
-            final_emotion=final_emotion,
-            recs=recommendations
-        )
+        # New conversational fields
+        payload["conversational_response"] = ai_response
+        payload["follow_up_suggestions"] = empathetic_response.get("follow_up_suggestions", [])
+        return jsonify(payload)
+
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except Exception as e:
+        print("Error processing request:")
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/analyze_frame", methods=["POST"])
+def analyze_frame():
+    """
+    Face-only analysis of a client-supplied frame.
+    Send JPEG/PNG bytes as a multipart 'frame' file or as the raw request body
+    (Content-Type image/jpeg, image/png or application/octet-stream).
+    Optional query/form fields choose what comes back: render=full|landmarks|none,
+    render_scale, image_format=jpeg|webp, image_quality.
+    """
+    try:
+        frame_bytes = _read_frame_upload()
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+
+    try:
+        if frame_bytes is None:
+            return jsonify({"error": "No frame provided"}), 400
+        frame = decode_frame(frame_bytes)
+        if frame is None:
+            return jsonify({"error": "Frame is not a JPEG/PNG image"}), 400
 
+        face_emotion, face_details, processed_frame, face_features, feature_desc = analyze_face(
+            frame, render_options(request.values)
+        )
         return jsonify({
-            "session_id": session_id,  # Return session ID for client to maintain
-            "text_emotion": refined_text_emotion,
-            "face_emotion": refined_face_emotion,
-            "final_declaration": final_declaration,
+            "face_emotion": face_emotion,
             "face_details": face_details,
             "processed_frame": processed_frame,
-            "face_feature_desc": face_feature_desc,
-            "final_emotion": final_emotion,
-            "emotion_intensity": emotion_intensity,
-            "therapy": recommendations.get("therapy"),
-            "meditation": recommendations.get("meditation"),
-            "activity": recommendations.get("activity"),
-            "music": recommendations.get("music"),
-            "movie": recommendations.get("movie"),
-            "game": recommendations.get("game"),
-            # New conversational fields
-            "conversational_response": ai_response,
-            "follow_up_suggestions": empathetic_response.get("follow_up_suggestions", []),
-            # Context information
-            "conversation_context": {
-                "relationship_stage": conversation_context.get("relationship_stage"),
-                "emotion_trend": conversation_context.get("emotion_trend"),
-                "total_turns": conversation_context.get("total_turns")
-            }
+            "face_landmarks": face_features.pop("landmarks", None),
+            "face_features": face_features,
+            "face_feature_desc": feature_desc
         })
 
     except Exception as e:
-        print("Error processing request:")
+        print("Error analyzing frame:")
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/analyze_video", methods=["POST"])
+def analyze_video():
+    """
+    Face-only analysis of a short sequence, with a smoothed emotion distribution
+    and per-frame EAR/MAR time series (see models/face_video.py).
+    Send one of:
+      - a clip as a multipart 'video' file or as the raw body (Content-Type video/*)
+      - several JPEG/PNG multipart 'frame' files, in order (taken 'fps' apart)
+      - use_camera=true (query or form) for a burst of 'frames' frames from the server camera
+    Optional query/form fields: keyframe_interval, smoothing, fps, frames.
+    """
+    if request.content_length and request.content_length > MAX_VIDEO_BYTES:
+        return jsonify({"error": f"Upload larger than {MAX_VIDEO_BYTES} bytes"}), 413
+
+    try:
+        params = request.values
+        options = {}
+        for key, cast in (("keyframe_interval", int), ("smoothing", float)):
+            if params.get(key):
+                options[key] = cast(params[key])
+        fps = float(params.get("fps") or FACE_VIDEO_FPS)
+        # float() accepts "nan" and "inf", which would end up in the JSON response
+        if not math.isfinite(fps) or fps <= 0:
+            return jsonify({"error": "fps must be a positive number"}), 400
+        if not math.isfinite(options.get("smoothing", 0.0)):
+            return jsonify({"error": "smoothing must be a finite number"}), 400
+        burst_frames = int(params.get("frames") or 0)
+        if burst_frames < 0:
+            return jsonify({"error": "frames must not be negative"}), 400
+        burst_frames = burst_frames or None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+
+    try:
+        video = request.files.get("video")
+        frame_files = request.files.getlist("frame")
+        if video is not None:
+            result = analyze_face_clip(video, fps, max_bytes=MAX_VIDEO_BYTES, **options)
+        elif frame_files:
+            frames = [decode_frame(f.read()) for f in frame_files[:FACE_VIDEO_MAX_FRAMES]]
+            if any(frame is None for frame in frames):
+                return jsonify({"error": "A frame is not a JPEG/PNG image"}), 400
+            result = analyze_face_sequence(iter_frames(frames, fps), **options)
+        elif request.mimetype.startswith("video/"):
+            # A chunked body has no Content-Length, so the limit is enforced while copying
+            result = analyze_face_clip(request.stream, fps, max_bytes=MAX_VIDEO_BYTES, **options)
+        elif params.get("use_camera", "").lower() in _TRUE_VALUES:
+            result = detect_face_emotion_sequence(burst_frames, **options)
+        else:
+            return jsonify({"error": "No video or frames provided"}), 400
+        return jsonify(result)
+
+    except ClipTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except Exception as e:
+        print("Error analyzing video:")
+        print(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+
+def _sse(event, data):
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/analyze/stream", methods=["POST"])
+def analyze_stream():
+    """
+    Streaming variant of /analyze (text/event-stream).
+    Sends an 'analysis' event with the emotion/recommendation payload as soon as
+    it is ready, then 'token' events as the LLM generates, then a 'done' event
+    with the full conversational response.
+    """
+    try:
+        data, frame_bytes = _read_analyze_request()
+        text = data.get("text", "")
+        use_camera = data.get("use_camera", False)
+        session_id = data.get("session_id", str(uuid.uuid4()))
+
+        session_memory = get_session_memory(session_id)
+        conversation_context = session_memory.get_context_for_response()
+        recent_history = session_memory.get_recent_exchanges(20)
+
+        graph = _build_stage_graph(text, use_camera, session_id, conversation_context, recent_history,
+                                   include_response=False, frame_bytes=frame_bytes, render=render_options(data))
+        results = graph.run()
+        payload = _build_analysis_payload(session_id, results, conversation_context)
+
+    except RequestEntityTooLarge as e:
+        return jsonify({"error": e.description}), 413
+    except Exception as e:
+        print("Error processing stream request:")
         print(traceback.format_exc())
         return jsonify({"error": str(e)}), 500
 
+    def events():
+        yield _sse("analysis", payload)
+        try:
+            empathetic_response = {}
+            for kind, value in stream_empathetic_response(
+                text_emotion=results["text_result"][0].get("label", "Neutral"),
+                face_emotion=results["face_result"][0],
+                final_emotion=payload["final_emotion"],
+                user_text=text,
+                recommendations=results["recommendations"],
+                context=conversation_context,
+                historical_context=results["history"],
+                conversation_history=recent_history
+            ):
+                if kind == "token":
+                    yield _sse("token", {"text": value})
+                else:
+                    empathetic_response = value
+
+            ai_response = empathetic_response.get("conversational_response")
+            session_memory.add_exchange(
+                user_text=text,
+                ai_response=ai_response,
+                emotion=payload["final_emotion"],
+                emotion_intensity=payload["emotion_intensity"]
+            )
+            save_conversation_turn(
+                session_id=session_id,
+                user_text=text,
+                ai_response=ai_response,
+                emotion=payload["final_emotion"],
+                emotion_intensity=payload["emotion_intensity"]
+            )
+
+            yield _sse("done", {
+                "conversational_response": ai_response,
+                "follow_up_suggestions": empathetic_response.get("follow_up_suggestions", [])
+            })
+        except Exception as e:
+            print("Error while streaming response:")
+            print(traceback.format_exc())
+            yield _sse("error", {"error": str(e)})
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        # Stop proxies (nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 
 
 
@@ -270,6 +537,50 @@ def tts_endpoint():
         print(f"TTS Endpoint Error: {e}")
         return jsonify({"error": str(e)}), 500
 
+# --- CACHE STATS ---
+from models.result_cache import text_cache
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss/eviction counters for the shared text result cache (per worker process)."""
+    return jsonify(text_cache.stats())
+
+@app.route("/face/stats", methods=["GET"])
+def face_stats():
+    """Face worker pool counters for this worker process (FACE_WORKERS > 0)."""
+    return jsonify(face_pool.stats())
+
+from backend.provider_router import router as llm_router
+
+@app.route("/llm/stats", methods=["GET"])
+def llm_stats():
+    """Per-provider LLM latency percentiles, error rates, hedges and failovers (per worker process)."""
+    return jsonify(llm_router.stats())
+
+# --- LEXICON HOT RELOAD ---
+from models.emotion_text import reload_lexicon
+
+@app.route("/admin/lexicon/reload", methods=["POST"])
+def lexicon_reload():
+    """
+    Rebuild the lexicon artifact from models/data/emotion_lexicon.json and swap it in.
+    Only this worker reloads immediately; the others pick up the new artifact on
+    their next file check (LEXICON_WATCH_INTERVAL).
+    Disabled unless ADMIN_TOKEN is set; requests must send it in X-Admin-Token.
+    """
+    admin_token = os.environ.get("ADMIN_TOKEN")
+    if not admin_token:
+        return jsonify({"error": "Admin endpoints are disabled (ADMIN_TOKEN is not set)"}), 403
+    sent_token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(sent_token.encode(), admin_token.encode()):
+        return jsonify({"error": "Unauthorized"}), 401
+    try:
+        version = reload_lexicon(force=True)
+        return jsonify({"status": "success", "version": version})
+    except Exception as e:
+        print(f"Lexicon Reload Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == "__main__":
-    # LOCAL RUN ONLY
-    app.run(debug=True)
+    # LOCAL RUN ONLY - production uses gunicorn via backend/wsgi.py
+    app.run(debug=os.environ.get("FLASK_ENV") != "production")
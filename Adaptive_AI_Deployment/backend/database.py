@@ -1,12 +1,84 @@
 import sqlite3
 import os
+import sys
+import threading
 from datetime import datetime
 
+# Allow import from parent directory (when run as a script)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.write_behind import WriteBehindWriter
+
 DB_PATH = os.path.join(os.path.dirname(__file__), "mental_health.db")
 
+# --- CONNECTION MANAGEMENT ---
+# Each thread keeps one open, pre-configured connection instead of opening
+# and closing a new one for every query.
+
+# WAL lets readers run alongside the writer; NORMAL sync is durable in WAL mode
+# except for the last transactions before a power loss.
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+    f"PRAGMA cache_size=-{int(os.environ.get('SQLITE_CACHE_KB', 16000))}",
+    f"PRAGMA busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+    "PRAGMA temp_store=MEMORY",
+]
+
+# Per-connection cache of compiled statements (sqlite3's LRU statement cache)
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+
+def _open_connection(path):
+    conn = sqlite3.connect(path, cached_statements=STATEMENT_CACHE_SIZE)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def get_connection():
+    """
+    Return this thread's connection, opening it on first use.
+    A connection inherited across fork, or opened for a different DB_PATH,
+    is replaced.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid() and _local.path == DB_PATH:
+        return conn
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn = _open_connection(DB_PATH)
+    _local.pid = os.getpid()
+    _local.path = DB_PATH
+    return _local.conn
+
+# History/feedback inserts are batched by a background writer thread.
+# DB_WRITE_MODE=sync writes inline instead (tests and one-off scripts).
+_writer = WriteBehindWriter(
+    get_connection,
+    flush_interval_ms=int(os.environ.get("DB_FLUSH_INTERVAL_MS", 50)),
+    max_batch_rows=int(os.environ.get("DB_FLUSH_MAX_ROWS", 200)),
+    synchronous=os.environ.get("DB_WRITE_MODE", "batched") == "sync"
+)
+
+def flush_writes(timeout=5.0):
+    """Block until all queued writes are committed."""
+    return _writer.flush(timeout)
+
+def close_writer(timeout=5.0):
+    """Flush queued writes and stop the writer thread (shutdown hook)."""
+    return _writer.close(timeout)
+
+def set_synchronous_writes(enabled=True):
+    """Write inline instead of batching (for tests)."""
+    _writer.set_synchronous(enabled)
+
 def init_db():
     """Initializes the database and creates the necessary tables."""
-    conn = sqlite3.connect(DB_PATH)
+    # Short-lived connection: init_db runs in the gunicorn master before
+    # forking, and SQLite connections must not be carried across a fork.
+    conn = _open_connection(DB_PATH)
     cursor = conn.cursor()
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS analysis_history (
@@ -58,15 +130,64 @@ def init_db():
         )
     ''')
 
+    # --- INDEXES ---
+    # Per-session history lookups (get_conversation_history)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conversation_session_ts
+        ON conversation_history (session_id, timestamp)
+    ''')
+    # Long-term memory lookups (get_user_facts runs on every LLM turn)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_facts_user_ts
+        ON user_facts (user_id, timestamp)
+    ''')
+
+    # Materialized "last emotional state" per session, kept current by a trigger.
+    # get_previous_emotional_state reads this instead of scanning and sorting
+    # the whole conversation_history table.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS last_state (
+            session_id TEXT PRIMARY KEY,
+            turn_id INTEGER NOT NULL,
+            timestamp DATETIME NOT NULL,
+            emotion TEXT,
+            emotion_intensity TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_last_state_recent
+        ON last_state (timestamp, turn_id)
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_conversation_last_state
+        AFTER INSERT ON conversation_history
+        BEGIN
+            INSERT OR REPLACE INTO last_state (session_id, turn_id, timestamp, emotion, emotion_intensity)
+            VALUES (NEW.session_id, NEW.id, NEW.timestamp, NEW.emotion, NEW.emotion_intensity);
+        END
+    ''')
+
+    # Backfill once for databases created before last_state existed
+    has_state = cursor.execute("SELECT 1 FROM last_state LIMIT 1").fetchall()
+    if not has_state:
+        cursor.execute('''
+            INSERT OR REPLACE INTO last_state (session_id, turn_id, timestamp, emotion, emotion_intensity)
+            SELECT c.session_id, c.id, c.timestamp, c.emotion, c.emotion_intensity
+            FROM conversation_history c
+            JOIN (
+                SELECT session_id, MAX(id) AS last_id
+                FROM conversation_history
+                GROUP BY session_id
+            ) latest ON c.id = latest.last_id
+        ''')
+
     conn.commit()
     conn.close()
 
 def save_analysis(text_input, text_emotion, face_emotion, final_emotion, recs):
-    """Saves analysis results and recommendations to the database."""
+    """Queues analysis results and recommendations for the database."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
+        _writer.execute('''
             INSERT INTO analysis_history (
                 text_input, text_emotion, face_emotion, final_emotion, 
                 therapy, meditation, activity
@@ -80,25 +201,19 @@ def save_analysis(text_input, text_emotion, face_emotion, final_emotion, recs):
             recs.get("meditation"), 
             recs.get("activity")
         ))
-        conn.commit()
-        conn.close()
         return True
     except Exception as e:
         print(f"Database error: {e}")
         return False
 
 def save_conversation_turn(session_id, user_text, ai_response, emotion, emotion_intensity="moderate"):
-    """Save a single conversation turn to the database."""
+    """Queue a single conversation turn for the database."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
+        _writer.execute('''
             INSERT INTO conversation_history (
                 session_id, user_text, ai_response, emotion, emotion_intensity
             ) VALUES (?, ?, ?, ?, ?)
         ''', (session_id, user_text, ai_response, emotion, emotion_intensity))
-        conn.commit()
-        conn.close()
         return True
     except Exception as e:
         print(f"Database error saving conversation: {e}")
@@ -107,17 +222,13 @@ def save_conversation_turn(session_id, user_text, ai_response, emotion, emotion_
 def get_conversation_history(session_id, limit=10):
     """Retrieve conversation history for a session."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
+        rows = get_connection().execute('''
             SELECT timestamp, user_text, ai_response, emotion, emotion_intensity
             FROM conversation_history
             WHERE session_id = ?
             ORDER BY timestamp DESC
             LIMIT ?
-        ''', (session_id, limit))
-        rows = cursor.fetchall()
-        conn.close()
+        ''', (session_id, limit)).fetchall()
         
         # Convert to list of dicts (reversed to chronological order)
         history = []
@@ -140,22 +251,21 @@ def get_previous_emotional_state(current_session_id):
     Useful for "Yesterday you felt..." type responses.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Find the most recent entry from a different session
-        cursor.execute('''
+        # Find the most recent entry from a different session.
+        # last_state holds one row per session and is walked newest-first
+        # through idx_last_state_recent, so at most two rows are read.
+        # fetchall() (not fetchone) so the statement is reset and the
+        # connection does not hold a read snapshot open.
+        rows = get_connection().execute('''
             SELECT timestamp, emotion, emotion_intensity
-            FROM conversation_history
+            FROM last_state
             WHERE session_id != ?
-            ORDER BY timestamp DESC
+            ORDER BY timestamp DESC, turn_id DESC
             LIMIT 1
-        ''', (current_session_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        ''', (current_session_id,)).fetchall()
         
-        if row:
+        if rows:
+            row = rows[0]
             return {
                 "timestamp": row[0],
                 "emotion": row[1],
@@ -171,33 +281,28 @@ def get_previous_emotional_state(current_session_id):
 
 def save_user_fact(fact_content, category="general", user_id="default_user"):
     """Save a specific fact about the user."""
+    conn = get_connection()
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
+        conn.execute('''
             INSERT INTO user_facts (user_id, fact_content, category)
             VALUES (?, ?, ?)
         ''', (user_id, fact_content, category))
         conn.commit()
-        conn.close()
         return True
     except Exception as e:
+        conn.rollback()
         print(f"Database error saving fact: {e}")
         return False
 
 def get_user_facts(user_id="default_user"):
     """Retrieve all facts about a user."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
+        rows = get_connection().execute('''
             SELECT fact_content, category, timestamp
             FROM user_facts
             WHERE user_id = ?
             ORDER BY timestamp DESC
-        ''', (user_id,))
-        rows = cursor.fetchall()
-        conn.close()
+        ''', (user_id,)).fetchall()
         
         facts = []
         for row in rows:
@@ -211,19 +316,35 @@ def get_user_facts(user_id="default_user"):
         print(f"Database error retrieving facts: {e}")
         return []
 
+# --- TRAINING DATA ---
+
+def get_labeled_texts():
+    """
+    (text, label) pairs for training the text emotion model.
+    analysis_history holds the text-only label; conversation_history holds
+    the combined text/face label, so callers should filter to text labels.
+    """
+    try:
+        return get_connection().execute('''
+            SELECT text_input, text_emotion FROM analysis_history
+            WHERE text_input IS NOT NULL AND text_input != '' AND text_emotion IS NOT NULL
+            UNION ALL
+            SELECT user_text, emotion FROM conversation_history
+            WHERE user_text IS NOT NULL AND user_text != '' AND emotion IS NOT NULL
+        ''').fetchall()
+    except Exception as e:
+        print(f"Database error retrieving training data: {e}")
+        return []
+
 # --- RL FEEDBACK FUNCTIONS ---
 
 def save_feedback(session_id, emotion, action, reward):
-    """Save user feedback for RL training."""
+    """Queue user feedback for RL training."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
+        _writer.execute('''
             INSERT INTO feedback_history (session_id, emotion, action, reward)
             VALUES (?, ?, ?, ?)
         ''', (session_id, emotion, action, reward))
-        conn.commit()
-        conn.close()
         return True
     except Exception as e:
         print(f"Database error saving feedback: {e}")
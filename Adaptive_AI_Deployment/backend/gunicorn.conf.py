@@ -0,0 +1,79 @@
+"""
+Gunicorn configuration for the production backend.
+Every setting can be overridden through the environment (see .env.example).
+"""
+
+import multiprocessing
+import os
+
+# --- SERVER ---
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Pre-fork workers, each with a small thread pool.
+# The face models are large, so default to a modest worker count.
+workers = int(os.environ.get("GUNICORN_WORKERS", min(4, multiprocessing.cpu_count())))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+
+# --- TIMEOUTS ---
+# /analyze waits on the LLM, so allow more than gunicorn's default 30s.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Load backend.wsgi (and with it all models) once in the master before forking
+# (PRELOAD_MODELS=0: every worker loads its own copy after the fork).
+preload_app = os.environ.get("PRELOAD_MODELS", "1") == "1"
+
+# Recycle workers occasionally to cap slow memory growth.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOGLEVEL", "info")
+
+
+# --- SERVER HOOKS ---
+def post_fork(server, worker):
+    """Rebuild per-process model state that cannot be inherited across fork."""
+    try:
+        from models.emotion_face import get_face_mesh
+        get_face_mesh()
+    except Exception as e:
+        server.log.warning(f"FaceMesh warm-up failed in worker {worker.pid}: {e}")
+
+    try:
+        # Start loading the face worker processes' models right away
+        from models.face_workers import face_pool
+        if face_pool.num_workers > 0:
+            face_pool.start()
+    except Exception as e:
+        server.log.warning(f"Face worker pool start failed in worker {worker.pid}: {e}")
+
+
+def worker_exit(server, worker):
+    """Finish queued background work before the worker process goes away."""
+    try:
+        from backend.llm_service import fact_jobs
+        fact_jobs.drain(timeout=graceful_timeout / 2)
+    except Exception as e:
+        server.log.warning(f"Background job drain failed in worker {worker.pid}: {e}")
+
+    try:
+        from backend.database import close_writer
+        close_writer(timeout=graceful_timeout / 2)
+    except Exception as e:
+        server.log.warning(f"DB writer flush failed in worker {worker.pid}: {e}")
+
+    try:
+        from models.camera_capture import camera
+        camera.stop()
+    except Exception as e:
+        server.log.warning(f"Camera release failed in worker {worker.pid}: {e}")
+
+    try:
+        from models.face_workers import face_pool
+        face_pool.close()
+    except Exception as e:
+        server.log.warning(f"Face worker pool shutdown failed in worker {worker.pid}: {e}")
@@ -0,0 +1,126 @@
+"""
+Bounded in-process background job queue.
+Used for work that must not delay the user-facing response (e.g. learning
+long-term-memory facts). Jobs that raise are retried with exponential backoff.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class JobQueue:
+    """
+    A fixed pool of daemon worker threads fed by a bounded queue.
+    Threads are started lazily on the first submit (and again after a fork),
+    so a queue created at import time is safe under gunicorn's preload_app.
+    """
+
+    def __init__(self, name, num_workers=1, maxsize=100, max_retries=2, retry_backoff=0.5):
+        """
+        Args:
+            name: Used for thread names and log messages.
+            num_workers: Number of worker threads.
+            maxsize: Maximum queued jobs; submit() drops jobs beyond this.
+            max_retries: Extra attempts for a job that raises.
+            retry_backoff: Seconds before the first retry (doubles each time).
+        """
+        self.name = name
+        self.num_workers = num_workers
+        self.maxsize = maxsize
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._threads = []
+        self._pid = None
+        self._accepting = True
+
+        atexit.register(self.drain)
+
+    def _ensure_started(self):
+        """Start the workers for this process if they are not running yet."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Threads from a parent process do not survive fork; start fresh.
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._threads = []
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._accepting = True
+            self._pid = os.getpid()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs) without blocking.
+        Returns False if the queue is full or shutting down (the job is dropped).
+        """
+        if not self._accepting:
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((fn, args, kwargs))
+            return True
+        except queue.Full:
+            print(f"[{self.name}] Queue full, dropping job.")
+            return False
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                self._run(*job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, fn, args, kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                fn(*args, **kwargs)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"[{self.name}] Job failed after {attempt + 1} attempts: {e}")
+                    return
+                time.sleep(self.retry_backoff * (2 ** attempt))
+
+    def pending(self):
+        """Number of jobs waiting in the queue."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def drain(self, timeout=10.0):
+        """
+        Stop accepting jobs, finish everything already queued, and stop the workers.
+        Returns True if all workers exited within the timeout.
+        """
+        self._accepting = False
+        if self._pid != os.getpid():
+            return True
+
+        deadline = time.monotonic() + timeout
+        for _ in self._threads:
+            try:
+                self._queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+        finished = not any(thread.is_alive() for thread in self._threads)
+        if not finished:
+            print(f"[{self.name}] Shutdown timed out with {self.pending()} jobs pending.")
+        self._pid = None
+        return finished
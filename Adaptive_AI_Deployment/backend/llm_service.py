@@ -1,16 +1,38 @@
 import os
-import requests
 import json
 import traceback
-from openai import OpenAI
+from functools import partial
+from backend import provider_clients
+from backend.provider_router import router
 from backend.database import get_user_facts, save_user_fact
+from backend.job_queue import JobQueue
 
-def generate_llm_response(user_text, conversation_history, system_prompt=None, user_id="default_user"):
+# Fact extraction runs in the background so it never delays the reply
+fact_jobs = JobQueue(
+    "fact-extraction",
+    num_workers=int(os.environ.get("FACT_WORKERS", 1)),
+    maxsize=int(os.environ.get("FACT_QUEUE_SIZE", 100)),
+    max_retries=int(os.environ.get("FACT_MAX_RETRIES", 2))
+)
+
+# Provider endpoints (overridable for proxies and local test servers)
+GROQ_API_BASE = os.environ.get("GROQ_API_BASE", "https://api.groq.com/openai/v1")
+GEMINI_API_BASE = os.environ.get("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+# Whisper uploads can be large; the call used to have no timeout at all
+TRANSCRIBE_TIMEOUT = float(os.environ.get("TRANSCRIBE_TIMEOUT", 60))
+
+FACT_PREFIXES = [
+    "my name is ", "i am called ", "call me ",
+    "i live in ", "i'm from ",
+    "i love ", "i hate ", "i like ", "my favorite ",
+    "i work as ", "i am a "
+]
+
+def _inject_memory(user_text, system_prompt, user_id):
     """
-    Generate a response using an LLM (Groq, OpenAI, or Gemini) if available.
-    Returns None if no API key is configured or if the request fails.
+    Add known user facts to the system prompt and learn new facts from this input.
+    Returns the augmented system prompt.
     """
-    
     # --- LONG TERM MEMORY INJECTION ---
     # Fetch known facts about the user
     user_facts = get_user_facts(user_id)
@@ -23,105 +45,157 @@ def generate_llm_response(user_text, conversation_history, system_prompt=None, u
             system_prompt = memory_context
 
     # --- FACT EXTRACTION (SIDE EFFECT) ---
-    # We attempt to learn new things from this input
-    try:
-        extract_and_save_facts(user_text, user_id)
-    except Exception as e:
-        print(f"Fact extraction failed: {e}")
-    
-    # Priority 1: Groq (Free / Open Source Models like Llama 3) - RECOMMENDED
-    groq_api_key = os.environ.get("GROQ_API_KEY")
-    if groq_api_key:
-        return _call_groq(groq_api_key, user_text, conversation_history, system_prompt)
+    # We attempt to learn new things from this input, off the request path
+    if _has_fact_prefix(user_text):
+        fact_jobs.submit(extract_and_save_facts, user_text, user_id)
 
-    # Priority 2: OpenAI (Paid)
-    openai_api_key = os.environ.get("OPENAI_API_KEY")
-    if openai_api_key:
-        return _call_openai(openai_api_key, user_text, conversation_history, system_prompt)
-        
-    # Priority 3: Google Gemini (Free Tier available)
-    gemini_api_key = os.environ.get("GEMINI_API_KEY")
-    if gemini_api_key:
-        return _call_gemini(gemini_api_key, user_text, conversation_history, system_prompt)
+    return system_prompt
 
-    # No keys found
-    return None
+def generate_llm_response(user_text, conversation_history, system_prompt=None, user_id="default_user"):
+    """
+    Generate a response using an LLM (Groq, OpenAI, or Gemini) if available.
+    With several API keys configured, the router hedges slow calls and fails
+    over between providers (see provider_router.py).
+    Returns None if no API key is configured or if every request fails.
+    """
+    system_prompt = _inject_memory(user_text, system_prompt, user_id)
+    return router.call(_provider_attempts(user_text, conversation_history, system_prompt))
+
+def stream_llm_response(user_text, conversation_history, system_prompt=None, user_id="default_user"):
+    """
+    Streaming variant of generate_llm_response.
+    Yields text chunks as the provider generates them. Yields nothing if no
+    API key is configured or if every request fails before the first token;
+    raises RuntimeError if the answering provider fails part-way.
+    """
+    system_prompt = _inject_memory(user_text, system_prompt, user_id)
+    yield from router.stream(_provider_attempts(user_text, conversation_history, system_prompt, stream=True))
+
+def _provider_attempts(user_text, conversation_history, system_prompt, stream=False):
+    """(name, fn) for every provider with an API key, in priority order."""
+    providers = (
+        # Priority 1: Groq (Free / Open Source Models like Llama 3) - RECOMMENDED
+        ("groq", "GROQ_API_KEY", _call_groq, _stream_groq),
+        # Priority 2: OpenAI (Paid)
+        ("openai", "OPENAI_API_KEY", _call_openai, _stream_openai),
+        # Priority 3: Google Gemini (Free Tier available)
+        ("gemini", "GEMINI_API_KEY", _call_gemini, _stream_gemini),
+    )
+    attempts = []
+    for name, env_var, call, streamer in providers:
+        api_key = os.environ.get(env_var)
+        if api_key:
+            fn = streamer if stream else call
+            attempts.append((name, partial(fn, api_key, user_text, conversation_history, system_prompt)))
+    return attempts
+
+def _has_fact_prefix(user_text):
+    """Cheap check for phrases that usually introduce a personal fact."""
+    user_text_lower = user_text.lower()
+    return any(prefix in user_text_lower for prefix in FACT_PREFIXES)
 
 def extract_and_save_facts(user_text, user_id):
     """
     Analyze user text for permanent facts (Name, Location, Hobbies, etc.)
     and save them to the database.
+    Runs on the fact_jobs background queue; raising makes the queue retry.
     """
     # Simple Heuristics for speed/cost (can be replaced with LLM call)
-    user_text_lower = user_text.lower()
-    
-    fact_prefixes = [
-        "my name is ", "i am called ", "call me ",
-        "i live in ", "i'm from ",
-        "i love ", "i hate ", "i like ", "my favorite ",
-        "i work as ", "i am a "
-    ]
+    if not _has_fact_prefix(user_text):
+        return
+
+    # Simple extraction: Save the whole sentence as a fact for now
+    # In a production system, we'd use an LLM to clean this up
+    # e.g., "My name is John" -> "Name: John"
     
-    for prefix in fact_prefixes:
-        if prefix in user_text_lower:
-            # Simple extraction: Save the whole sentence as a fact for now
-            # In a production system, we'd use an LLM to clean this up
-            # e.g., "My name is John" -> "Name: John"
-            
-            # Using a mini-LLM call for extraction if Groq is available is better
-            groq_key = os.environ.get("GROQ_API_KEY")
-            if groq_key:
-                _llm_extract_fact(groq_key, user_text, user_id)
-            else:
-                # Fallback: Save raw sentence if it's short
-                if len(user_text) < 100:
-                    save_user_fact(user_text, "heuristic", user_id)
-            break
+    # Using a mini-LLM call for extraction if Groq is available is better
+    groq_key = os.environ.get("GROQ_API_KEY")
+    if groq_key:
+        _llm_extract_fact(groq_key, user_text, user_id)
+    else:
+        # Fallback: Save raw sentence if it's short
+        if len(user_text) < 100:
+            save_user_fact(user_text, "heuristic", user_id)
 
 def _llm_extract_fact(api_key, text, user_id):
-    """Use Llama 3 via Groq to exact precise facts."""
-    try:
-        url = "https://api.groq.com/openai/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        system = "You are a fact extractor. If the user mentions a personal fact (name, hobby, job, location), extract it as a concise statement. If not, return 'None'."
+    """
+    Use Llama 3 via Groq to exact precise facts.
+    Raises on network errors, rate limits and server errors so the job can be retried.
+    """
+    url = f"{GROQ_API_BASE}/chat/completions"
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    
+    system = "You are a fact extractor. If the user mentions a personal fact (name, hobby, job, location), extract it as a concise statement. If not, return 'None'."
+    
+    payload = {
+        "model": "llama-3.3-70b-versatile",
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": text}
+        ],
+        "temperature": 0.1,
+        "max_tokens": 50
+    }
+    
+    response = provider_clients.post(url, headers=headers, json=payload, timeout=5)
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RuntimeError(f"Groq fact extraction error {response.status_code}: {response.text}")
+    if response.status_code != 200:
+        print(f"Groq fact extraction error {response.status_code}: {response.text}")
+        return
+
+    fact = response.json()["choices"][0]["message"]["content"].strip()
+    if fact and "None" not in fact:
+        print(f"[MEMORY] Learned new fact: {fact}")
+        save_user_fact(fact, "learned", user_id)
+
+def _build_chat_messages(user_text, history, system_prompt):
+    """Build an OpenAI-style message list (also used by Groq)."""
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
         
-        payload = {
-            "model": "llama-3.3-70b-versatile",
-            "messages": [
-                {"role": "system", "content": system},
-                {"role": "user", "content": text}
-            ],
-            "temperature": 0.1,
-            "max_tokens": 50
-        }
+    # Add recent history (limited to last 20 turns to save context)
+    for msg in history[-20:]:
+        role = "user" if msg["role"] == "user" else "assistant"
+        messages.append({"role": role, "content": msg["content"]})
         
-        response = requests.post(url, headers=headers, json=payload, timeout=5)
-        if response.status_code == 200:
-            fact = response.json()["choices"][0]["message"]["content"].strip()
-            if fact and "None" not in fact:
-                print(f"[MEMORY] Learned new fact: {fact}")
-                save_user_fact(fact, "learned", user_id)
-    except:
-        pass
+    messages.append({"role": "user", "content": user_text})
+    return messages
+
+def _build_gemini_contents(user_text, history, system_prompt):
+    """Build the Gemini 'contents' list."""
+    contents = []
+    
+    if system_prompt:
+         contents.append({"role": "user", "parts": [{"text": system_prompt}]})
+         contents.append({"role": "model", "parts": [{"text": "Understood. I will act as the supportive empathetic friend."}]})
+
+    for msg in history[-20:]:
+         role = "user" if msg["role"] == "user" else "model"
+         contents.append({"role": role, "parts": [{"text": msg["content"]}]})
+         
+    contents.append({"role": "user", "parts": [{"text": user_text}]})
+    return contents
+
+def _iter_sse_data(response):
+    """Yield the JSON payload of each 'data:' line in a server-sent event stream."""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        yield json.loads(data)
 
 def _call_openai(api_key, user_text, history, system_prompt):
     try:
-        client = OpenAI(api_key=api_key)
+        client = provider_clients.openai_client(api_key)
         
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-            
-        # Add recent history (limited to last 20 turns to save context)
-        for msg in history[-20:]:
-            role = "user" if msg["role"] == "user" else "assistant"
-            messages.append({"role": role, "content": msg["content"]})
-            
-        messages.append({"role": "user", "content": user_text})
+        messages = _build_chat_messages(user_text, history, system_prompt)
         
         response = client.chat.completions.create(
             model="gpt-3.5-turbo", # or "gpt-4o" if available/preferred
@@ -137,24 +211,37 @@ def _call_openai(api_key, user_text, history, system_prompt):
         traceback.print_exc()
         return None
 
+def _stream_openai(api_key, user_text, history, system_prompt):
+    try:
+        client = provider_clients.openai_client(api_key)
+        
+        stream = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=_build_chat_messages(user_text, history, system_prompt),
+            temperature=0.7,
+            max_tokens=300,
+            stream=True
+        )
+        
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+                
+    except Exception as e:
+        print(f"LLM Service Error (OpenAI stream): {e}")
+        traceback.print_exc()
+        # Re-raise so the router can tell a cut-off reply from a finished one
+        raise
+
 def _call_groq(api_key, user_text, history, system_prompt):
     try:
-        url = "https://api.groq.com/openai/v1/chat/completions"
+        url = f"{GROQ_API_BASE}/chat/completions"
         headers = {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
         
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-            
-        # Add recent history (limited to last 20 turns to save context)
-        for msg in history[-20:]:
-            role = "user" if msg["role"] == "user" else "assistant"
-            messages.append({"role": role, "content": msg["content"]})
-            
-        messages.append({"role": "user", "content": user_text})
+        messages = _build_chat_messages(user_text, history, system_prompt)
         
         payload = {
             "model": "llama-3.3-70b-versatile", # Updated to supported model
@@ -163,7 +250,7 @@ def _call_groq(api_key, user_text, history, system_prompt):
             "max_tokens": 300
         }
         
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        response = provider_clients.post(url, headers=headers, json=payload, timeout=10)
         
         if response.status_code == 200:
             return response.json()["choices"][0]["message"]["content"]
@@ -176,24 +263,44 @@ def _call_groq(api_key, user_text, history, system_prompt):
         traceback.print_exc()
         return None
 
+def _stream_groq(api_key, user_text, history, system_prompt):
+    try:
+        url = f"{GROQ_API_BASE}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": "llama-3.3-70b-versatile",
+            "messages": _build_chat_messages(user_text, history, system_prompt),
+            "temperature": 0.7,
+            "max_tokens": 300,
+            "stream": True
+        }
+        
+        with provider_clients.stream(url, headers=headers, json=payload, timeout=10) as response:
+            if response.status_code != 200:
+                print(f"Groq API Error: {response.text}")
+                return
+            for chunk in _iter_sse_data(response):
+                delta = chunk["choices"][0]["delta"].get("content")
+                if delta:
+                    yield delta
+                    
+    except Exception as e:
+        print(f"LLM Service Error (Groq stream): {e}")
+        traceback.print_exc()
+        raise
+
 def _call_gemini(api_key, user_text, history, system_prompt):
     # Valid but basic implementation for Gemini REST API
     try:
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={api_key}"
+        url = f"{GEMINI_API_BASE}/models/gemini-pro:generateContent?key={api_key}"
         headers = {"Content-Type": "application/json"}
         
         # Gemini specific formatting
-        contents = []
-        
-        if system_prompt:
-             contents.append({"role": "user", "parts": [{"text": system_prompt}]})
-             contents.append({"role": "model", "parts": [{"text": "Understood. I will act as the supportive empathetic friend."}]})
-
-        for msg in history[-20:]:
-             role = "user" if msg["role"] == "user" else "model"
-             contents.append({"role": role, "parts": [{"text": msg["content"]}]})
-             
-        contents.append({"role": "user", "parts": [{"text": user_text}]})
+        contents = _build_gemini_contents(user_text, history, system_prompt)
         
         payload = {
             "contents": contents,
@@ -203,7 +310,7 @@ def _call_gemini(api_key, user_text, history, system_prompt):
             }
         }
         
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
+        response = provider_clients.post(url, headers=headers, json=payload, timeout=10)
         
         if response.status_code == 200:
             return response.json()["candidates"][0]["content"]["parts"][0]["text"]
@@ -215,6 +322,36 @@ def _call_gemini(api_key, user_text, history, system_prompt):
         print(f"LLM Service Error (Gemini): {e}")
         return None
 
+def _stream_gemini(api_key, user_text, history, system_prompt):
+    try:
+        # alt=sse switches streamGenerateContent from a JSON array to server-sent events
+        url = f"{GEMINI_API_BASE}/models/gemini-pro:streamGenerateContent?alt=sse&key={api_key}"
+        headers = {"Content-Type": "application/json"}
+        
+        payload = {
+            "contents": _build_gemini_contents(user_text, history, system_prompt),
+            "generationConfig": {
+                "temperature": 0.7,
+                "maxOutputTokens": 300
+            }
+        }
+        
+        with provider_clients.stream(url, headers=headers, json=payload, timeout=10) as response:
+            if response.status_code != 200:
+                print(f"Gemini API Error: {response.text}")
+                return
+            for chunk in _iter_sse_data(response):
+                candidates = chunk.get("candidates") or []
+                if not candidates:
+                    continue
+                for part in candidates[0].get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        yield part["text"]
+
+    except Exception as e:
+        print(f"LLM Service Error (Gemini stream): {e}")
+        raise
+
 def transcribe_audio(audio_file_path):
     """
     Transcribe audio file using Groq's Whisper API.
@@ -225,7 +362,7 @@ def transcribe_audio(audio_file_path):
             print("Groq API Key missing for transcription")
             return None
             
-        url = "https://api.groq.com/openai/v1/audio/transcriptions"
+        url = f"{GROQ_API_BASE}/audio/transcriptions"
         headers = {
             "Authorization": f"Bearer {groq_api_key}"
         }
@@ -237,7 +374,7 @@ def transcribe_audio(audio_file_path):
                 "model": (None, "distil-whisper-large-v3-en") # or "whisper-large-v3"
             }
             
-            response = requests.post(url, headers=headers, files=files)
+            response = provider_clients.post(url, headers=headers, files=files, timeout=TRANSCRIBE_TIMEOUT)
             
         if response.status_code == 200:
             return response.json().get("text")
@@ -0,0 +1,187 @@
+"""
+Long-lived HTTP clients for the LLM and speech providers.
+
+A bare requests.post opens a new TCP + TLS connection per call, and a new
+OpenAI(...) client starts with an empty connection pool. The clients here are
+created once per process and keep their connections alive between calls:
+
+- post() / stream() for Groq, Gemini, fact extraction and transcription go
+  through one requests.Session with a pooled HTTPAdapter (PROVIDER_POOL_SIZE
+  connections kept per host); with PROVIDER_HTTP2=1 and httpx[http2]
+  installed they go through one HTTP/2 httpx.Client instead;
+- openai_client(api_key) returns one cached OpenAI client per key.
+
+Like JobQueue, the clients are rebuilt after a fork: pooled sockets must not
+be shared between gunicorn workers.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connections kept alive per provider host
+PROVIDER_POOL_SIZE = int(os.environ.get("PROVIDER_POOL_SIZE", 10))
+# Use HTTP/2 where the provider supports it (needs httpx[http2])
+PROVIDER_HTTP2 = os.environ.get("PROVIDER_HTTP2", "0").lower() in ("1", "true", "yes", "on")
+PROVIDER_CONNECT_TIMEOUT = float(os.environ.get("PROVIDER_CONNECT_TIMEOUT", 3.05))
+# Retries of failed connection attempts (the request was never sent, so POST is safe)
+PROVIDER_CONNECT_RETRIES = int(os.environ.get("PROVIDER_CONNECT_RETRIES", 1))
+
+# Read timeout of OpenAI calls; keep it below LLM_DEADLINE
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", 10))
+
+# Hosts with their own connection pool (Groq and Gemini, plus room for proxies)
+_PROVIDER_HOSTS = 4
+
+_lock = threading.Lock()
+_pid = None
+_session = None
+_http2_client = None
+_http2_checked = False
+_openai_clients = {}
+
+
+def _check_fork():
+    """Drop clients inherited from a parent process (call with _lock held)."""
+    global _pid, _session, _http2_client, _http2_checked, _openai_clients
+    if _pid != os.getpid():
+        _session, _http2_client, _http2_checked, _openai_clients = None, None, False, {}
+        _pid = os.getpid()
+
+
+def session():
+    """The pooled keep-alive requests.Session of this process."""
+    global _session
+    with _lock:
+        _check_fork()
+        if _session is None:
+            retries = Retry(total=PROVIDER_CONNECT_RETRIES, connect=PROVIDER_CONNECT_RETRIES,
+                            read=0, status=0, other=0, raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=_PROVIDER_HOSTS, pool_maxsize=PROVIDER_POOL_SIZE,
+                                  max_retries=retries)
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def http2_client():
+    """The shared HTTP/2 httpx.Client, or None if disabled or httpx[http2] is missing."""
+    global _http2_client, _http2_checked
+    if not PROVIDER_HTTP2:
+        return None
+    with _lock:
+        _check_fork()
+        if not _http2_checked:
+            _http2_checked = True
+            try:
+                import httpx
+                limits = httpx.Limits(max_connections=PROVIDER_POOL_SIZE * _PROVIDER_HOSTS,
+                                      max_keepalive_connections=PROVIDER_POOL_SIZE)
+                transport = httpx.HTTPTransport(http2=True, limits=limits, retries=PROVIDER_CONNECT_RETRIES)
+                _http2_client = httpx.Client(transport=transport)
+            except ImportError as e:
+                print(f"HTTP/2 unavailable, using pooled HTTP/1.1 ({e})")
+        return _http2_client
+
+
+def _timeouts(timeout):
+    """(connect, read) seconds from a read timeout or an explicit pair."""
+    if isinstance(timeout, tuple):
+        return timeout
+    return (min(PROVIDER_CONNECT_TIMEOUT, timeout), timeout)
+
+
+def _httpx_timeout(timeout):
+    import httpx
+    connect, read = _timeouts(timeout)
+    return httpx.Timeout(read, connect=connect)
+
+
+def post(url, headers=None, json=None, data=None, files=None, timeout=10):
+    """
+    POST over the pooled connections. Returns a requests or httpx response
+    (both have status_code, text and json()).
+    timeout: read timeout in seconds, or a (connect, read) pair.
+    """
+    client = http2_client()
+    if client is not None:
+        return client.post(url, headers=headers, json=json, data=data, files=files,
+                           timeout=_httpx_timeout(timeout))
+    return session().post(url, headers=headers, json=json, data=data, files=files,
+                          timeout=_timeouts(timeout))
+
+
+class _HttpxStream:
+    """requests-style view of a streaming httpx response."""
+
+    def __init__(self, response):
+        self._response = response
+        self._lines = None
+        self.status_code = response.status_code
+
+    @property
+    def text(self):
+        self._response.read()
+        return self._response.text
+
+    def json(self):
+        self._response.read()
+        return self._response.json()
+
+    def iter_lines(self, decode_unicode=True):
+        # One iterator per response: httpx bodies can only be streamed once
+        if self._lines is None:
+            self._lines = self._response.iter_lines()
+        return self._lines
+
+
+@contextmanager
+def stream(url, headers=None, json=None, timeout=10):
+    """
+    Streaming POST over the pooled connections, as a context manager yielding
+    a response with status_code, text and iter_lines(decode_unicode=True).
+    The connection goes back to the pool when the block exits normally: the
+    rest of the body (e.g. the chunk terminator after "data: [DONE]") is read
+    first, since a connection with unread data is closed instead of reused.
+    """
+    client = http2_client()
+    if client is not None:
+        with client.stream("POST", url, headers=headers, json=json, timeout=_httpx_timeout(timeout)) as response:
+            wrapped = _HttpxStream(response)
+            yield wrapped
+            if not response.is_closed:
+                for _ in wrapped.iter_lines():
+                    pass
+        return
+    with session().post(url, headers=headers, json=json, timeout=_timeouts(timeout), stream=True) as response:
+        yield response
+        # Bodies without a terminator event (Gemini alt=sse) are already read to the end
+        if not response._content_consumed:
+            for _ in response.iter_content(8192):
+                pass
+
+
+def openai_client(api_key):
+    """The cached OpenAI client for api_key (its httpx pool is reused across calls)."""
+    with _lock:
+        _check_fork()
+        client = _openai_clients.get(api_key)
+        if client is None:
+            from openai import OpenAI, DefaultHttpxClient
+            http_client = None
+            if PROVIDER_HTTP2:
+                try:
+                    http_client = DefaultHttpxClient(http2=True)
+                except ImportError as e:
+                    print(f"HTTP/2 unavailable for OpenAI, using HTTP/1.1 ({e})")
+            # The SDK default (600 s, 2 retries) would let a hedged-away call hold a
+            # router thread for minutes; match the 10 s read timeout of the other providers
+            client = OpenAI(api_key=api_key, http_client=http_client,
+                            timeout=_httpx_timeout(OPENAI_TIMEOUT), max_retries=0)
+            _openai_clients[api_key] = client
+        return client
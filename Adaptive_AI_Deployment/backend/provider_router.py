@@ -0,0 +1,354 @@
+"""
+Latency-aware routing of LLM requests across the configured providers.
+
+generate_llm_response used to call exactly one provider, picked by which API
+key is set, so one provider's slow or failing minutes became our tail
+latency. The router instead:
+
+- keeps rolling latency and error statistics per provider (the last
+  LLM_STATS_WINDOW calls, at most LLM_STATS_MAX_AGE seconds old);
+- tries providers in priority order, moving those with a high recent error
+  rate to the back;
+- hedges: when the current provider has not answered within its own p95
+  latency, the next provider is asked as well and the first answer wins;
+- fails over to the next provider as soon as a call fails.
+
+The losing request is cancelled. A streaming attempt stops at its next chunk
+and closes its connection; a blocking call that was already sent cannot be
+interrupted from another thread, so its answer is discarded. Either way the
+loser's latency still goes into the statistics, so a provider's p95 (and its
+hedge delay) is not computed from its fast, winning attempts alone.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Ask the next provider when the current one is slower than its p95 (0 = failover only)
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "1").lower() in ("1", "true", "yes", "on")
+# Hedge delay in seconds until a provider has LLM_HEDGE_MIN_SAMPLES latencies
+LLM_HEDGE_DELAY = float(os.environ.get("LLM_HEDGE_DELAY", 2.0))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", 20))
+# Never hedge sooner than this, however fast the provider usually is
+LLM_HEDGE_MIN_DELAY = float(os.environ.get("LLM_HEDGE_MIN_DELAY", 0.3))
+LLM_STATS_WINDOW = int(os.environ.get("LLM_STATS_WINDOW", 200))
+LLM_STATS_MAX_AGE = float(os.environ.get("LLM_STATS_MAX_AGE", 300))
+# Providers failing at least this often (over 5+ recent calls) are tried last
+LLM_DEMOTE_ERROR_RATE = float(os.environ.get("LLM_DEMOTE_ERROR_RATE", 0.5))
+# Seconds before the router gives up and the caller falls back to templates
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", 15))
+
+_MIN_ERROR_SAMPLES = 5
+
+# Threads are only started on first submit, as in pipeline.py,
+# so creating the pool at import time is safe under preload_app.
+# A losing blocking call keeps its thread until its provider timeout, so each
+# request thread may hold one router thread per provider (Groq, OpenAI, Gemini).
+_PROVIDERS = 3
+_REQUEST_THREADS = int(os.environ.get("GUNICORN_THREADS", 4))
+LLM_ROUTER_WORKERS = int(os.environ.get("LLM_ROUTER_WORKERS", max(16, _REQUEST_THREADS * _PROVIDERS)))
+_executor = ThreadPoolExecutor(max_workers=LLM_ROUTER_WORKERS, thread_name_prefix="llm-router")
+
+
+class ProviderStats:
+    """Rolling latency / error record of one provider (thread-safe)."""
+
+    def __init__(self, window=LLM_STATS_WINDOW, max_age=LLM_STATS_MAX_AGE):
+        self.max_age = max_age
+        self._samples = deque(maxlen=window)  # (monotonic time, seconds, ok)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.wins = 0
+        self.hedged = 0  # times the next provider was asked because this one was slow
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self._samples.append((time.monotonic(), seconds, ok))
+            self.calls += 1
+
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def record_hedge(self):
+        with self._lock:
+            self.hedged += 1
+
+    def _recent(self):
+        cutoff = time.monotonic() - self.max_age
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            return list(self._samples)
+
+    def latency_percentile(self, percentile):
+        """Latency percentile of recent successful calls in seconds, or None."""
+        latencies = sorted(seconds for _, seconds, ok in self._recent() if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(percentile / 100.0 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def error_rate(self):
+        """Share of recent calls that failed, or None with fewer than 5 calls."""
+        samples = self._recent()
+        if len(samples) < _MIN_ERROR_SAMPLES:
+            return None
+        return sum(1 for _, _, ok in samples if not ok) / len(samples)
+
+    def unhealthy(self):
+        rate = self.error_rate()
+        return rate is not None and rate >= LLM_DEMOTE_ERROR_RATE
+
+    def hedge_delay(self):
+        """Seconds to wait for this provider before asking the next one."""
+        if not LLM_HEDGE:
+            return float("inf")
+        successes = sum(1 for _, _, ok in self._recent() if ok)
+        if successes < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DELAY
+        return max(self.latency_percentile(95), LLM_HEDGE_MIN_DELAY)
+
+    def snapshot(self):
+        p50, p95 = self.latency_percentile(50), self.latency_percentile(95)
+        rate = self.error_rate()
+        recent = len(self._recent())
+        with self._lock:
+            calls, wins, hedged = self.calls, self.wins, self.hedged
+        return {
+            "calls": calls,
+            "recent": recent,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(rate, 3) if rate is not None else None,
+            "wins": wins,
+            "hedged": hedged,
+        }
+
+
+class _StreamAttempt:
+    """One provider's stream, pumped into the router's queue by a pool thread."""
+
+    def __init__(self, name, fn):
+        self.name = name
+        self.fn = fn
+        self.cancelled = threading.Event()
+        self.started = None
+        self.first_chunk = False
+
+
+class ProviderRouter:
+    """
+    Routes a request across providers given as (name, fn) pairs in priority
+    order. fn takes no arguments; for call() it returns the answer text or
+    None on failure, for stream() it is a generator of text chunks (no chunks
+    means failure).
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor = None):
+        self.executor = executor or _executor
+        self._stats = {}  # (mode, provider name) -> ProviderStats
+        self._lock = threading.Lock()
+        self.hedges = 0
+        self.failovers = 0
+
+    def stats_for(self, name, mode="call"):
+        with self._lock:
+            stats = self._stats.get((mode, name))
+            if stats is None:
+                stats = self._stats[(mode, name)] = ProviderStats()
+            return stats
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def order(self, providers, mode="call"):
+        """Providers in priority order, the ones with a high error rate last."""
+        return sorted(providers, key=lambda p: self.stats_for(p[0], mode).unhealthy())
+
+    def _timed_call(self, name, fn):
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            print(f"LLM provider {name} error: {e}")
+            result = None
+        self.stats_for(name).record(time.perf_counter() - start, bool(result))
+        return result
+
+    def call(self, providers, deadline=LLM_DEADLINE):
+        """
+        The first successful answer among providers, or None if they all
+        fail or the deadline passes.
+        """
+        providers = self.order(providers)
+        if not providers:
+            return None
+        deadline_at = time.monotonic() + deadline
+        pending = {}  # future -> provider name
+        next_index = 0
+        hedge_at = None
+        newest = None
+
+        def launch():
+            nonlocal next_index, hedge_at, newest
+            name, fn = providers[next_index]
+            next_index += 1
+            pending[self.executor.submit(self._timed_call, name, fn)] = name
+            hedge_at = time.monotonic() + self.stats_for(name).hedge_delay()
+            newest = name
+
+        launch()
+        while pending:
+            now = time.monotonic()
+            if now >= deadline_at:
+                break
+            timeout = deadline_at - now
+            if next_index < len(providers):
+                timeout = min(timeout, max(hedge_at - now, 0))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = pending.pop(future)
+                result = future.result()
+                if result:
+                    self.stats_for(name).record_win()
+                    # Not-yet-started attempts are dropped; running ones finish unseen
+                    for other in pending:
+                        other.cancel()
+                    return result
+
+            if next_index < len(providers):
+                if done:
+                    self._count("failovers")
+                    launch()
+                elif time.monotonic() >= hedge_at:
+                    self._count("hedges")
+                    self.stats_for(newest).record_hedge()
+                    launch()
+
+        for future in pending:
+            future.cancel()
+        if pending:
+            print(f"LLM providers timed out after {deadline:.0f}s: {', '.join(pending.values())}")
+        return None
+
+    def _pump(self, attempt, events):
+        """
+        Run attempt's generator on a pool thread, forwarding ("chunk", text)
+        events, then ("end", None) or ("error", exception) to events.
+        """
+        generator = attempt.fn()
+        error = None
+        try:
+            for chunk in generator:
+                if not attempt.first_chunk:
+                    attempt.first_chunk = True
+                    # Recorded even when the attempt was hedged away meanwhile: the
+                    # cancellation is only seen here, so this is its real time to first chunk
+                    self.stats_for(attempt.name, "stream").record(time.perf_counter() - attempt.started, True)
+                if attempt.cancelled.is_set():
+                    break
+                events.put((attempt, "chunk", chunk))
+        except Exception as e:
+            print(f"LLM provider {attempt.name} stream error: {e}")
+            error = e
+        finally:
+            # Closing the generator closes its HTTP response
+            generator.close()
+            if not attempt.first_chunk:
+                self.stats_for(attempt.name, "stream").record(time.perf_counter() - attempt.started, False)
+            events.put((attempt, "error", error) if error is not None else (attempt, "end", None))
+
+    def stream(self, providers, deadline=LLM_DEADLINE):
+        """
+        Yield the text chunks of the first provider to produce one. Hedging
+        and failover apply to the time to first chunk; after that the winner
+        streams alone and the other attempts are cancelled.
+        Raises RuntimeError if the winner fails or stalls part-way, so a cut-off
+        reply is never passed off as complete.
+        """
+        providers = self.order(providers, "stream")
+        if not providers:
+            return
+        events = queue.Queue()
+        attempts = []
+        next_index = 0
+        hedge_at = None
+        winner = None
+
+        def launch():
+            nonlocal next_index, hedge_at
+            name, fn = providers[next_index]
+            next_index += 1
+            attempt = _StreamAttempt(name, fn)
+            attempt.started = time.perf_counter()
+            attempts.append(attempt)
+            self.executor.submit(self._pump, attempt, events)
+            hedge_at = time.monotonic() + self.stats_for(name, "stream").hedge_delay()
+
+        launch()
+        running = 1
+        # The deadline covers the wait for the first chunk and each gap between chunks
+        wait_until = time.monotonic() + deadline
+        try:
+            while running:
+                now = time.monotonic()
+                timeout = wait_until - now
+                if winner is None and next_index < len(providers):
+                    timeout = min(timeout, hedge_at - now)
+                try:
+                    attempt, kind, value = events.get(timeout=max(timeout, 0))
+                except queue.Empty:
+                    if time.monotonic() >= wait_until:
+                        if winner is not None:
+                            raise RuntimeError(f"LLM stream from {winner.name} stalled for {deadline:.0f}s")
+                        print(f"LLM stream timed out after {deadline:.0f}s")
+                        return
+                    self._count("hedges")
+                    self.stats_for(attempts[-1].name, "stream").record_hedge()
+                    launch()
+                    running += 1
+                    continue
+
+                if kind != "chunk":
+                    running -= 1
+                    if attempt is winner:
+                        if kind == "error":
+                            raise RuntimeError(f"LLM stream from {attempt.name} failed part-way: {value}")
+                        return
+                    if winner is None and next_index < len(providers):
+                        self._count("failovers")
+                        launch()
+                        running += 1
+                    continue
+                if winner is None:
+                    winner = attempt
+                    self.stats_for(attempt.name, "stream").record_win()
+                    for other in attempts:
+                        if other is not winner:
+                            other.cancelled.set()
+                if attempt is winner:
+                    wait_until = time.monotonic() + deadline
+                    yield value
+        finally:
+            # Also reached when the client disconnects mid-stream
+            for attempt in attempts:
+                attempt.cancelled.set()
+
+    def stats(self):
+        with self._lock:
+            items = list(self._stats.items())
+            hedges, failovers = self.hedges, self.failovers
+        providers = {}
+        for (mode, name), stats in items:
+            providers.setdefault(name, {})[mode] = stats.snapshot()
+        return {"hedges": hedges, "failovers": failovers, "providers": providers}
+
+
+# Shared router used by generate_llm_response / stream_llm_response
+router = ProviderRouter()
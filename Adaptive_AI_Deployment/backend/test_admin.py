@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import backend.database as database
+
+def _client():
+    """Flask test client; a first import of the app initializes a temporary database."""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    original_path = database.DB_PATH
+    database.DB_PATH = path
+    try:
+        from backend.app import app
+    finally:
+        database.DB_PATH = original_path
+        os.remove(path)
+    return app.test_client()
+
+def test_lexicon_reload_requires_token():
+    print("Testing admin endpoint authentication...")
+    client = _client()
+    original = os.environ.pop("ADMIN_TOKEN", None)
+    try:
+        # No token configured: the endpoint is disabled, not open
+        response = client.post("/admin/lexicon/reload", headers={"X-Admin-Token": ""})
+        assert response.status_code == 403
+
+        os.environ["ADMIN_TOKEN"] = "s3cret"
+        assert client.post("/admin/lexicon/reload").status_code == 401
+        response = client.post("/admin/lexicon/reload", headers={"X-Admin-Token": "wrong"})
+        assert response.status_code == 401
+    finally:
+        os.environ.pop("ADMIN_TOKEN", None)
+        if original is not None:
+            os.environ["ADMIN_TOKEN"] = original
+
+if __name__ == "__main__":
+    test_lexicon_reload_requires_token()
+    print("\nAll admin endpoint tests passed!")
@@ -0,0 +1,144 @@
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import backend.database as database
+import models.empathetic_responder as empathetic_responder
+from models.empathetic_responder import EmpathicResponder
+from ui.sse_client import iter_sse_events
+
+MESSAGE = "I had a really long and tiring day at work today"
+
+class _Lines:
+    """Stands in for a streaming requests.Response."""
+
+    def __init__(self, body):
+        self.body = body
+
+    def iter_lines(self, decode_unicode=True):
+        return iter(self.body.split("\n"))
+
+class _StubLLM:
+    """Replaces stream_llm_response for one test (no API key, no network)."""
+
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.original = None
+
+    def __call__(self, user_text, conversation_history, system_prompt=None, user_id="default_user"):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise RuntimeError("provider connection reset")
+            yield chunk
+
+    def __enter__(self):
+        self.original = empathetic_responder.stream_llm_response
+        empathetic_responder.stream_llm_response = self
+        return self
+
+    def __exit__(self, *exc):
+        empathetic_responder.stream_llm_response = self.original
+
+def _with_temp_db(test):
+    """Run test(client) against a Flask test client and a temporary database."""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    original_path = database.DB_PATH
+    database.DB_PATH = path
+    try:
+        database.init_db()
+        from backend.app import app
+        test(app.test_client())
+    finally:
+        database.flush_writes()
+        database.DB_PATH = original_path
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+def _events(response):
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    return list(iter_sse_events(_Lines(response.get_data(as_text=True))))
+
+def test_iter_sse_events():
+    print("Testing the SSE parser...")
+    body = (
+        'event: analysis\ndata: {"final_emotion": "Sad"}\n\n'
+        ": keep-alive comment\n\n"
+        'event: token\ndata: {"text": "Hi"}\n\n'
+        'data: {"a": 1,\ndata: "b": 2}\n\n'
+        'event: done\ndata: {"conversational_response": "Hi"}\n\n'
+    )
+    assert list(iter_sse_events(_Lines(body))) == [
+        ("analysis", {"final_emotion": "Sad"}),
+        ("token", {"text": "Hi"}),
+        ("message", {"a": 1, "b": 2}),
+        ("done", {"conversational_response": "Hi"}),
+    ]
+
+def test_stream_response_template_fallback():
+    print("Testing the streamed template fallback...")
+    responder = EmpathicResponder()
+    kwargs = dict(text_emotion="sadness", face_emotion="Neutral", final_emotion="Sad",
+                  user_text=MESSAGE, recommendations={})
+
+    with _StubLLM(["I'm ", "sorry ", "to hear that."]):
+        events = list(responder.stream_response(**kwargs))
+    assert [kind for kind, _ in events] == ["token", "token", "token", "done"]
+    assert events[-1][1]["conversational_response"] == "I'm sorry to hear that."
+
+    # No LLM output: the template reply is sent as a single token
+    with _StubLLM([]):
+        events = list(responder.stream_response(**kwargs))
+    assert [kind for kind, _ in events] == ["token", "done"]
+    assert events[0][1] == events[1][1]["conversational_response"] and events[0][1]
+
+def test_analyze_stream_events():
+    print("Testing /analyze/stream...")
+
+    def run(client):
+        with _StubLLM(["That sounds ", "exhausting."]):
+            response = client.post("/analyze/stream", json={"text": MESSAGE, "session_id": "stream-test"})
+            events = _events(response)
+        kinds = [kind for kind, _ in events]
+        print(f"Events: {kinds}")
+        assert kinds == ["analysis", "token", "token", "done"]
+        analysis = events[0][1]
+        assert analysis["session_id"] == "stream-test" and "final_emotion" in analysis
+        assert "".join(data["text"] for kind, data in events if kind == "token") == "That sounds exhausting."
+        assert events[-1][1]["conversational_response"] == "That sounds exhausting."
+
+        # The turn is saved once the stream has finished
+        database.flush_writes()
+        history = database.get_conversation_history("stream-test")
+        assert len(history) == 1
+        assert history[0]["ai_response"] == "That sounds exhausting."
+
+    _with_temp_db(run)
+
+def test_analyze_stream_error():
+    print("Testing an error during the stream...")
+
+    def run(client):
+        with _StubLLM(["That sounds ", "exhausting."], fail_after=1):
+            events = _events(client.post("/analyze/stream", json={"text": MESSAGE, "session_id": "stream-error"}))
+        kinds = [kind for kind, _ in events]
+        assert kinds[0] == "analysis" and kinds[-1] == "error"
+        assert "done" not in kinds
+        assert "provider connection reset" in events[-1][1]["error"]
+        database.flush_writes()
+        assert database.get_conversation_history("stream-error") == []
+
+    _with_temp_db(run)
+
+if __name__ == "__main__":
+    test_iter_sse_events()
+    test_stream_response_template_fallback()
+    test_analyze_stream_events()
+    test_analyze_stream_error()
+    print("\nAll streaming tests passed!")
@@ -0,0 +1,71 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import cv2
+import benchmark_face
+from benchmark_face import run_benchmark, summarize
+from models.emotion_face import analyze_face_frame, render_options
+
+def test_stage_timings():
+    print("Testing the analyze_face_frame timings hook...")
+    timings = {}
+    frame = np.random.default_rng(0).integers(60, 200, (120, 160, 3), dtype=np.uint8)
+    analyze_face_frame(frame, render_options({"render": "full"}), timings)
+    print(f"Timings: {timings}")
+    # No face: only the pre-screen, mesh, canvas and encode stages run
+    assert set(timings) == {"prescreen", "mesh", "render", "encode"}
+    assert all(seconds >= 0 for seconds in timings.values())
+
+def test_benchmark_on_images():
+    print("Testing the face benchmark on an image directory...")
+    workdir = tempfile.mkdtemp()
+    try:
+        for i in range(3):
+            frame = np.random.default_rng(i).integers(60, 200, (96, 128, 3), dtype=np.uint8)
+            cv2.imwrite(os.path.join(workdir, f"{i}.png"), frame)
+        with open(os.path.join(workdir, "notes.txt"), "w") as f:
+            f.write("not an image")
+
+        result = run_benchmark(workdir, {"render": "none"}, repeat=2, warmup=1)
+        print(f"Result: {result['frames']} frames, {result['fps']} fps, {result['peak_rss_mb']} MiB")
+        assert result["frames"] == 6 and result["faces"] == 0
+        assert {"decode", "mesh", "total"} <= set(result["stages_ms"])
+        assert result["stages_ms"]["total"]["p50"] >= result["stages_ms"]["mesh"]["p50"]
+        # None only where neither resource nor psutil is available
+        assert result["peak_rss_mb"] is None or result["peak_rss_mb"] > 0
+        json.dumps(result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def test_summarize():
+    stats = summarize([0.001, 0.002, 0.003, 0.004])
+    assert stats["p50"] == 2.5 and stats["max"] == 4.0
+    assert summarize([]) is None
+
+def test_peak_rss_without_resource():
+    print("Testing peak RSS without the resource module (Windows)...")
+    saved = benchmark_face.resource
+    benchmark_face.resource = None
+    try:
+        peak = benchmark_face.peak_rss_mb()
+        assert peak is None or peak > 0
+        result = {"input": "faces", "frames": 1, "faces": 0, "fps": 10.0, "peak_rss_mb": peak,
+                  "rss_after_load_mb": peak, "model_load_s": 1.0, "stages_ms": {}}
+        benchmark_face.print_report(result)
+    finally:
+        benchmark_face.resource = saved
+
+if __name__ == "__main__":
+    test_stage_timings()
+    test_benchmark_on_images()
+    test_summarize()
+    test_peak_rss_without_resource()
+    print("\nTest Complete.")
@@ -0,0 +1,74 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import cv2
+from models.camera_capture import CameraCapture
+
+def _write_clip(path, frames=30, size=(64, 48)):
+    """A short MJPG clip to stand in for the webcam."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 8 % 256, dtype=np.uint8))
+    writer.release()
+
+def test_camera_capture():
+    print("Testing background camera capture...")
+    workdir = tempfile.mkdtemp()
+    clip = os.path.join(workdir, "clip.avi")
+    _write_clip(clip)
+
+    capture = CameraCapture(source=clip, buffer_frames=3, idle_timeout=0.5, warmup_frames=2)
+    frame = capture.latest(timeout=5)
+    assert frame is not None and frame.shape == (48, 64, 3)
+    time.sleep(0.1)
+    stats = capture.stats()
+    print(f"Stats: {stats}")
+    assert stats["running"] and stats["buffered"] <= 3
+    # End of the clip counts as a dropped device: the thread reopens it
+    assert stats["reconnects"] >= 1 or stats["frames_read"] > 0
+
+    # Released after the idle timeout, restarted by the next request
+    time.sleep(1.0)
+    assert not capture.stats()["running"]
+    assert capture.latest(timeout=5) is not None
+    assert capture.stop()
+    assert not capture.stats()["opened"]
+    shutil.rmtree(workdir, ignore_errors=True)
+
+def test_collect_burst():
+    print("Testing a camera burst...")
+    workdir = tempfile.mkdtemp()
+    clip = os.path.join(workdir, "clip.avi")
+    _write_clip(clip, frames=60)
+
+    capture = CameraCapture(source=clip, buffer_frames=2, idle_timeout=5, warmup_frames=0)
+    burst = capture.collect(5, timeout=5)
+    assert len(burst) == 5
+    # New frames, oldest first
+    times = [t for t, _ in burst]
+    assert times == sorted(times) and len(set(times)) == 5
+    capture.stop()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+def test_missing_camera():
+    print("Testing an unavailable camera...")
+    capture = CameraCapture(source="/nonexistent/device.avi", reconnect_delay=0.05)
+    start = time.monotonic()
+    assert capture.latest(timeout=0.3) is None
+    assert time.monotonic() - start < 1.0
+    assert not capture.opened
+    capture.stop()
+
+if __name__ == "__main__":
+    test_camera_capture()
+    test_collect_burst()
+    test_missing_camera()
+    print("\nTest Complete.")
@@ -0,0 +1,160 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import backend.database as database
+from backend.write_behind import WriteBehindWriter
+
+_ORIGINAL_DB_PATH = database.DB_PATH
+
+def _use_temp_db():
+    """Point the database module at a fresh temporary file."""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    database.DB_PATH = path
+    database.init_db()
+    return path
+
+def _remove_temp_db(path):
+    """Undo _use_temp_db: restore DB_PATH and delete the temporary file."""
+    database.flush_writes()
+    database.set_synchronous_writes(False)
+    database.DB_PATH = _ORIGINAL_DB_PATH
+    conn = getattr(database._local, "conn", None)
+    if conn is not None:
+        conn.close()
+        database._local.conn = None
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
+
+def _count(path, table):
+    conn = sqlite3.connect(path)
+    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.close()
+    return count
+
+def test_write_behind_batching():
+    print("Testing batched writes from many threads...")
+    path = _use_temp_db()
+    try:
+        database.set_synchronous_writes(False)
+
+        def writer(i):
+            for _ in range(50):
+                database.save_conversation_turn(f"session-{i}", "hello", "hi there", "Happy")
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert database.flush_writes(), "Flush timed out"
+        rows = _count(path, "conversation_history")
+        print(f"Rows written: {rows}")
+        assert rows == 200
+    finally:
+        _remove_temp_db(path)
+
+def test_synchronous_mode():
+    print("Testing synchronous write mode...")
+    path = _use_temp_db()
+    try:
+        database.set_synchronous_writes(True)
+
+        database.save_feedback("session-1", "Sad", "Clair de Lune by Debussy (Classical)", 1)
+        # No flush needed: the row is committed before save_feedback returns
+        rows = _count(path, "feedback_history")
+        print(f"Rows written: {rows}")
+        assert rows == 1
+    finally:
+        _remove_temp_db(path)
+
+def test_connection_reuse_and_pragmas():
+    print("Testing per-thread connection manager...")
+    path = _use_temp_db()
+    try:
+        conn = database.get_connection()
+        assert database.get_connection() is conn, "Connection should be reused within a thread"
+
+        other = []
+        t = threading.Thread(target=lambda: other.append(database.get_connection()))
+        t.start()
+        t.join()
+        assert other[0] is not conn, "Each thread should get its own connection"
+
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        print(f"Journal mode: {journal_mode}")
+        assert journal_mode == "wal"
+    finally:
+        _remove_temp_db(path)
+
+def test_last_state_lookup():
+    print("Testing last emotional state lookup...")
+    path = _use_temp_db()
+    try:
+        database.set_synchronous_writes(True)
+
+        database.save_conversation_turn("session-a", "hello", "hi", "Sad")
+        database.save_conversation_turn("session-b", "hello", "hi", "Happy")
+        database.save_conversation_turn("session-a", "still here", "ok", "Angry")
+
+        # session-a wrote last, so session-b sees its latest emotion
+        state = database.get_previous_emotional_state("session-b")
+        print(f"Previous state for session-b: {state}")
+        assert state["emotion"] == "Angry"
+        assert database.get_previous_emotional_state("session-a")["emotion"] == "Happy"
+
+        plan = database.get_connection().execute(
+            "EXPLAIN QUERY PLAN SELECT timestamp, emotion, emotion_intensity FROM last_state "
+            "WHERE session_id != ? ORDER BY timestamp DESC, turn_id DESC LIMIT 1", ("x",)
+        ).fetchall()
+        detail = " ".join(row[-1] for row in plan)
+        print(f"Query plan: {detail}")
+        assert "idx_last_state_recent" in detail and "TEMP B-TREE" not in detail
+    finally:
+        _remove_temp_db(path)
+
+def test_writer_survives_errors():
+    print("Testing writer recovery after a connection error...")
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    attempts = []
+
+    def connect():
+        # The first connection attempt fails, as on a locked or missing DB
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE IF NOT EXISTS t (x INTEGER)")
+        return conn
+
+    writer = WriteBehindWriter(connect, flush_interval_ms=10)
+    try:
+        writer.execute("INSERT INTO t VALUES (?)", (1,))
+        assert writer.flush(2), "Flush must not hang after a writer error"
+        writer.execute("INSERT INTO t VALUES (?)", (2,))
+        assert writer.flush(2)
+        assert writer._thread.is_alive()
+        # The first batch was lost, the writer kept going
+        assert _count(path, "t") == 1
+    finally:
+        writer.close(2)
+        os.remove(path)
+
+if __name__ == "__main__":
+    test_connection_reuse_and_pragmas()
+    test_write_behind_batching()
+    test_synchronous_mode()
+    test_last_state_lookup()
+    test_writer_survives_errors()
+    print("\nTest Complete.")
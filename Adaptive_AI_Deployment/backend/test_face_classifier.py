@@ -0,0 +1,98 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.face_classifier import TFLiteClassifier, FERClassifier, EMOTION_LABELS, load_classifier
+from models.export_emotion_model import export_tflite, compare, NORMALIZATION, FER2013_CLASS_ORDER
+
+def _tiny_model():
+    """A small stand-in for the train_emotion_model.py CNN (same input and output)."""
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(0)
+    return tf.keras.Sequential([
+        tf.keras.layers.Input((48, 48, 1)),
+        tf.keras.layers.Conv2D(8, (3, 3), activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(7, activation="softmax"),
+    ])
+
+def test_tflite_export_and_classify():
+    print("Testing the int8 TFLite export and classifier...")
+    workdir = tempfile.mkdtemp()
+    try:
+        model = _tiny_model()
+        images = np.random.default_rng(0).integers(0, 256, (64, 48, 48), dtype=np.uint8)
+        path = os.path.join(workdir, "emotion_model.tflite")
+        metadata = export_tflite(model, images, NORMALIZATION["custom"], FER2013_CLASS_ORDER, path)
+        assert metadata["input_size"] == [48, 48]
+
+        classifier = TFLiteClassifier(path)
+        assert classifier.input_size == (48, 48)
+        # Output columns are reordered from the folder order to EMOTION_LABELS
+        assert [FER2013_CLASS_ORDER[i] for i in classifier.column_order] == list(EMOTION_LABELS)
+
+        for batch in (1, 5, 2):
+            scores = classifier.classify(images[:batch])
+            assert scores.shape == (batch, 7)
+            assert np.allclose(scores.sum(axis=1), 1.0, atol=0.05)
+
+        agreement = compare(model, classifier, images, NORMALIZATION["custom"])
+        print(f"Top-1 agreement: {agreement:.1%}")
+        assert agreement >= 0.9
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def test_missing_model_falls_back():
+    print("Testing the fallback to FER...")
+    classifier = load_classifier("tflite", "/nonexistent/emotion_model.tflite")
+    assert isinstance(classifier, FERClassifier)
+
+def test_missing_fer_is_reported():
+    print("Testing the error without fer / TensorFlow...")
+    saved = {name: sys.modules.get(name) for name in ("fer", "fer.fer")}
+    # None in sys.modules makes the import fail as if the package were not installed
+    sys.modules["fer"] = sys.modules["fer.fer"] = None
+    try:
+        load_classifier("tflite", "/nonexistent/emotion_model.tflite")
+    except RuntimeError as e:
+        assert "FACE_CLASSIFIER=tflite" in str(e)
+    else:
+        raise AssertionError("load_classifier should fail without fer")
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+def test_fer_classifier_batch():
+    print("Testing the FER classifier on crops...")
+    classifier = load_classifier("fer")
+    assert isinstance(classifier, FERClassifier)
+
+    def no_haar(*args, **kwargs):
+        raise AssertionError("FER's face detector should not run on crops")
+    classifier._detector.find_faces = no_haar
+
+    rng = np.random.default_rng(0)
+    crops = rng.integers(0, 256, (3,) + classifier.input_size, dtype=np.uint8)
+    scores = classifier.classify(crops)
+    assert scores.shape == (3, 7)
+    # FER rounds its scores to two decimals
+    assert np.allclose(scores.sum(axis=1), 1.0, atol=0.05)
+    # Tiling the batch gives the same scores as classifying each crop alone
+    for crop, row in zip(crops, scores):
+        assert np.allclose(classifier.classify(crop[None]), row, atol=0.011)
+
+if __name__ == "__main__":
+    test_tflite_export_and_classify()
+    test_missing_model_falls_back()
+    test_missing_fer_is_reported()
+    test_fer_classifier_batch()
+    print("\nTest Complete.")
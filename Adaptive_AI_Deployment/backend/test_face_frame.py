@@ -0,0 +1,165 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import cv2
+import base64
+import models.emotion_face as emotion_face
+from models.camera_capture import CameraCapture
+from models.emotion_face import analyze_face_frame, decode_frame, render_options, prescreen_frame, downscale_frame
+from models.face_classifier import crop_face
+from models.face_geometry import face_box
+
+def _scene(h, w, seed=0):
+    """A textured frame without a face (passes the pre-screen)."""
+    return np.random.default_rng(seed).integers(60, 200, (h, w, 3), dtype=np.uint8)
+
+def _encode(frame, ext=".jpg"):
+    ok, buffer = cv2.imencode(ext, frame)
+    assert ok
+    return buffer.tobytes()
+
+def test_decode_frame():
+    print("Testing frame decoding...")
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    frame[:, :32] = (0, 0, 255)
+    for ext in (".jpg", ".png"):
+        data = _encode(frame, ext)
+        # bytes, and a zero-copy view of a larger buffer
+        for payload in (data, memoryview(bytearray(data))):
+            decoded = decode_frame(payload)
+            assert decoded is not None and decoded.shape == frame.shape
+    assert decode_frame(b"not an image") is None
+    assert decode_frame(b"") is None
+
+def test_analyze_face_frame():
+    print("Testing face analysis without a face...")
+    frame = _scene(240, 320)
+    emotion, scores, processed_frame, features, description = analyze_face_frame(frame)
+    print(f"Result: {emotion}, {features}, '{description}'")
+    assert emotion == "Neutral" and scores == {} and features == {}
+    assert processed_frame is not None
+
+def test_face_box_and_crop():
+    print("Testing landmark face boxes and crops...")
+    points = np.array([[0.25, 0.5, 0.0], [0.75, 0.9, 0.0], [0.5, 1.2, 0.0]], dtype=np.float32)
+    # Clipped to the frame
+    assert face_box(points, 200, 100) == (50, 50, 100, 50)
+
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    frame[:, 100:] = 255
+    crop = crop_face(frame, (150, 60, 80, 60), (64, 64))
+    # Square, grayscale, and padded where the box leaves the frame
+    assert crop.shape == (64, 64) and crop.dtype == np.uint8
+    assert crop_face(frame, (400, 400, 10, 10), (64, 64)) is None
+
+def test_render_options():
+    print("Testing processed-frame rendering options...")
+    frame = _scene(240, 320)
+
+    for mode in ("none", "landmarks"):
+        processed_frame = analyze_face_frame(frame.copy(), render_options({"render": mode}))[2]
+        assert processed_frame is None
+
+    options = render_options({"render_scale": "0.5", "image_format": "webp", "image_quality": "60"})
+    assert options == {"mode": "full", "scale": 0.5, "format": "webp", "quality": 60}
+    processed_frame = analyze_face_frame(frame.copy(), options)[2]
+    image = decode_frame(base64.b64decode(processed_frame))
+    assert image.shape == (120, 160, 3)
+
+    # Invalid values fall back to the defaults
+    assert render_options({"render": "3d", "render_scale": "x", "image_format": "gif"}) == render_options()
+
+def test_prescreen():
+    print("Testing the frame pre-screen...")
+    assert prescreen_frame(np.full((240, 320, 3), 5, dtype=np.uint8))[1] == "too dark"
+    assert prescreen_frame(np.full((240, 320, 3), 250, dtype=np.uint8))[1] == "overexposed"
+    blurred = cv2.GaussianBlur(_scene(240, 320), (0, 0), 25)
+    assert prescreen_frame(blurred)[1] == "too blurry"
+    result = analyze_face_frame(np.zeros((240, 320, 3), dtype=np.uint8))
+    assert result == ("Neutral", {}, None, {}, "No usable frame (too dark).")
+
+    # Large frames are downscaled to the target short side, small ones kept as they are
+    frame, reason = prescreen_frame(_scene(1080, 1920))
+    assert reason is None and frame.shape == (480, 853, 3)
+    small = _scene(240, 320)
+    assert prescreen_frame(small)[0] is small
+    assert downscale_frame(small, 0) is small
+
+def test_camera_motion_reuse():
+    print("Testing result reuse for an unchanged camera picture...")
+    workdir = tempfile.mkdtemp()
+    clip = os.path.join(workdir, "still.avi")
+    writer = cv2.VideoWriter(clip, cv2.VideoWriter_fourcc(*"MJPG"), 30, (160, 120))
+    for _ in range(60):
+        writer.write(_scene(120, 160))
+    writer.release()
+
+    calls = []
+    def analyze(frame, render):
+        calls.append(frame.shape)
+        return "Happy", {}, None, {}, f"call {len(calls)}"
+
+    saved = emotion_face.camera, emotion_face.FACE_MIN_MOTION
+    emotion_face.camera = CameraCapture(source=clip, warmup_frames=0)
+    emotion_face.FACE_MIN_MOTION = 2.0
+    try:
+        first = emotion_face.detect_face_emotion(analyze=analyze)
+        second = emotion_face.detect_face_emotion(analyze=analyze)
+        assert first[4] == "call 1" and second is first and len(calls) == 1
+
+        # Request threads share the last result
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(emotion_face.detect_face_emotion(analyze=analyze)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 8 and all(result is first for result in results) and len(calls) == 1
+    finally:
+        emotion_face.camera.stop()
+        emotion_face.camera, emotion_face.FACE_MIN_MOTION = saved
+        emotion_face._last_camera = (None, None, None)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def test_concurrent_analysis():
+    print("Testing concurrent frame analysis...")
+    # Request threads share the process-wide FaceMesh and classifier (FACE_WORKERS=0)
+    frames = [_scene(240, 320, seed) for seed in range(4)]
+    crops = np.random.default_rng(0).integers(0, 256, (4,) + emotion_face.classifier.input_size, dtype=np.uint8)
+    expected_scores = [emotion_face.classifier.classify(crop[None]) for crop in crops]
+    errors = []
+
+    def worker(i):
+        try:
+            for _ in range(10):
+                emotion, scores, _, _, _ = analyze_face_frame(frames[i % len(frames)], render_options({"render": "none"}))
+                assert emotion == "Neutral" and scores == {}
+                assert np.allclose(emotion_face.classifier.classify(crops[i][None]), expected_scores[i])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors, errors
+
+if __name__ == "__main__":
+    test_decode_frame()
+    test_analyze_face_frame()
+    test_face_box_and_crop()
+    test_render_options()
+    test_prescreen()
+    test_camera_motion_reuse()
+    test_concurrent_analysis()
+    print("\nTest Complete.")
@@ -0,0 +1,65 @@
+import os
+import sys
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from mediapipe.framework.formats import landmark_pb2
+from models.face_geometry import landmarks_to_array, compute_face_features
+
+N_LANDMARKS = 478
+
+def _reference_features(points):
+    """The original per-landmark formulas."""
+    def dist(a, b):
+        return np.linalg.norm(points[a, :2] - points[b, :2])
+
+    def ear(i):
+        horizontal = dist(i[0], i[3])
+        return (dist(i[1], i[5]) + dist(i[2], i[4])) / (2.0 * horizontal) if horizontal else 0
+
+    left = ear([33, 160, 158, 133, 153, 144])
+    right = ear([362, 385, 387, 263, 373, 380])
+    return {
+        "ear": (left + right) / 2.0,
+        "mar": dist(13, 14) / dist(61, 291) if dist(61, 291) else 0,
+        "brow_ratio": dist(107, 336) / dist(133, 362) if dist(133, 362) else 0,
+    }
+
+def test_features_match_reference():
+    print("Testing vectorized features against the per-landmark formulas...")
+    rng = np.random.default_rng(0)
+    batch = rng.random((8, N_LANDMARKS, 3), dtype=np.float32)
+    batch_features = compute_face_features(batch)
+    for frame, points in enumerate(batch):
+        features = compute_face_features(points)
+        for name, expected in _reference_features(points).items():
+            assert abs(float(features[name]) - expected) < 1e-5
+            assert abs(float(batch_features[name][frame]) - expected) < 1e-5
+    assert batch_features["ear"].shape == (8,)
+
+def test_degenerate_landmarks():
+    print("Testing zero-width features...")
+    features = compute_face_features(np.zeros((N_LANDMARKS, 3), dtype=np.float32))
+    assert all(float(value) == 0 for value in features.values())
+
+def test_landmarks_to_array():
+    print("Testing landmark conversion...")
+    rng = np.random.default_rng(1)
+    expected = rng.random((N_LANDMARKS, 3), dtype=np.float32)
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in expected:
+        landmark_list.landmark.add(x=x, y=y, z=z)
+    assert np.array_equal(landmarks_to_array(landmark_list), expected)
+    # Other layouts (extra fields, plain objects) take the attribute path
+    landmark_list.landmark[5].visibility = 0.5
+    assert np.array_equal(landmarks_to_array(landmark_list), expected)
+    assert np.array_equal(landmarks_to_array(list(landmark_list.landmark)), expected)
+
+if __name__ == "__main__":
+    test_features_match_reference()
+    test_degenerate_landmarks()
+    test_landmarks_to_array()
+    print("\nTest Complete.")
@@ -0,0 +1,184 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import cv2
+import models.face_video as face_video
+from models.face_video import analyze_face_sequence, iter_clip, iter_frames
+
+# Stub landmarks: 478 points spread over the middle of the frame
+_POINTS = [SimpleNamespace(x=x, y=y, z=0.0)
+           for x, y in np.random.default_rng(0).uniform(0.3, 0.7, (478, 2)).tolist()]
+
+class _StubMesh:
+    """Finds a face in bright frames only."""
+
+    def process(self, rgb):
+        return SimpleNamespace(multi_face_landmarks=[_POINTS] if rgb.mean() > 100 else None)
+
+class _StubClassifier:
+    """Returns the given score rows in order and records the crops it saw."""
+    input_size = (64, 64)
+
+    def __init__(self, rows):
+        self.rows = np.asarray(rows, dtype=np.float32)
+        self.batches = []
+
+    def classify(self, crops):
+        self.batches.append(len(crops))
+        return self.rows[:len(crops)]
+
+def _one_hot(label):
+    return [1.0 if name == label else 0.0 for name in ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")]
+
+def _write_clip(path, frames=30, fps=30, size=(64, 48)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 8, dtype=np.uint8))
+    writer.release()
+
+def test_clip_sampling():
+    print("Testing clip frame sampling...")
+    workdir = tempfile.mkdtemp()
+    try:
+        clip = os.path.join(workdir, "clip.avi")
+        _write_clip(clip, frames=30, fps=30)
+        sampled = list(iter_clip(clip, fps=10))
+        times = [round(t, 2) for t, _ in sampled]
+        print(f"Timestamps: {times}")
+        assert len(sampled) == 10 and times[:3] == [0.0, 0.1, 0.2]
+        assert sampled[0][1].shape == (48, 64, 3)
+        assert len(list(iter_clip(clip, fps=10, max_frames=4))) == 4
+        assert list(iter_clip(os.path.join(workdir, "missing.avi"))) == []
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def test_sequence_without_face():
+    print("Testing a sequence without a face...")
+    frames = [np.random.default_rng(i).integers(60, 200, (120, 160, 3), dtype=np.uint8) for i in range(6)]
+    frames[1] = np.zeros_like(frames[1])
+    result = analyze_face_sequence(iter_frames(frames, fps=5), max_frames=4)
+    print(f"Result: {result['emotion']}, '{result['face_feature_desc']}'")
+    assert result["emotion"] == "Neutral" and result["emotions"] == {}
+    assert result["frames"] == 4 and result["faces"] == 0 and result["keyframes"] == 0
+    assert result["series"]["t"] == [0.0, 0.2, 0.4, 0.6]
+    assert result["series"]["ear"] == [None] * 4
+    # The black frame is dropped by the pre-screen
+    assert result["rejected"] == 1
+
+    empty = analyze_face_sequence(iter([]))
+    assert empty["frames"] == 0 and empty["face_feature_desc"] == "No frames to analyze."
+
+def test_keyframes_and_smoothing():
+    print("Testing keyframes and EMA smoothing...")
+    # Face in every frame but frame 4; the classifier sees happy twice, then sad
+    frames = [np.full((120, 160, 3), 50 if i == 4 else 150, dtype=np.uint8) for i in range(12)]
+    stub = _StubClassifier([_one_hot("happy")] * 2 + [_one_hot("sad")] * 3)
+    saved = face_video.get_tracking_mesh, face_video.classifier, face_video.FACE_PRESCREEN
+    face_video.get_tracking_mesh, face_video.classifier, face_video.FACE_PRESCREEN = _StubMesh, stub, False
+    try:
+        result = analyze_face_sequence(iter_frames(frames, fps=10), keyframe_interval=3, smoothing=0.5)
+    finally:
+        face_video.get_tracking_mesh, face_video.classifier, face_video.FACE_PRESCREEN = saved
+
+    # Every 3rd frame with a face, plus frame 5 where the lost face is re-acquired
+    times = [entry["t"] for entry in result["timeline"]]
+    print(f"Keyframes at {times}")
+    assert times == [0.0, 0.3, 0.5, 0.8, 1.1]
+    assert stub.batches == [5], "All keyframe crops go to the classifier in one batch"
+    assert result["frames"] == 12 and result["faces"] == 11 and result["keyframes"] == 5
+
+    # EMA with weight 0.5: happy, happy, 50/50 (tie goes to the first label), then sad
+    assert [entry["emotion"] for entry in result["timeline"]] == ["Happy", "Happy", "Happy", "Sad", "Sad"]
+    assert result["timeline"][2]["emotions"]["happy"] == 0.5 and result["timeline"][2]["emotions"]["sad"] == 0.5
+    assert result["emotion"] == "Sad"
+    assert result["emotions"]["sad"] == 0.88 and result["emotions"]["happy"] == 0.12
+    assert result["emotions"] == result["timeline"][-1]["emotions"]
+
+    # Per-frame series with a gap where no face was found
+    ear = result["series"]["ear"]
+    assert len(ear) == 12 and ear[4] is None and all(value is not None for i, value in enumerate(ear) if i != 4)
+    assert abs(result["face_features"]["ear"] - ear[0]) < 1e-3
+
+def test_keyframe_every_frame():
+    print("Testing keyframe_interval=1 without smoothing...")
+    frames = [np.full((120, 160, 3), 150, dtype=np.uint8) for _ in range(3)]
+    stub = _StubClassifier([_one_hot("happy"), _one_hot("angry"), _one_hot("sad")])
+    saved = face_video.get_tracking_mesh, face_video.classifier, face_video.FACE_PRESCREEN
+    face_video.get_tracking_mesh, face_video.classifier, face_video.FACE_PRESCREEN = _StubMesh, stub, False
+    try:
+        result = analyze_face_sequence(iter_frames(frames), keyframe_interval=1, smoothing=1.0)
+    finally:
+        face_video.get_tracking_mesh, face_video.classifier, face_video.FACE_PRESCREEN = saved
+    assert [entry["emotion"] for entry in result["timeline"]] == ["Happy", "Angry", "Sad"]
+
+def test_analyze_video_parameters():
+    print("Testing /analyze_video parameter validation...")
+    import backend.database as database
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    original_path = database.DB_PATH
+    database.DB_PATH = path
+    try:
+        from backend.app import app
+        client = app.test_client()
+    finally:
+        database.DB_PATH = original_path
+        os.remove(path)
+    for query in ("use_camera=true&frames=abc", "fps=fast", "keyframe_interval=x", "fps=0",
+                  "fps=nan", "fps=inf", "smoothing=nan", "smoothing=-inf", "use_camera=true&frames=-5"):
+        # With a clip attached, only the parameters can make this a 400
+        response = client.post(f"/analyze_video?{query}", data=b"not a clip", content_type="video/mp4")
+        assert response.status_code == 400, (query, response.status_code)
+    assert client.post("/analyze_video").status_code == 400
+
+def _post_chunked(app, size):
+    """Status code of a clip upload without Content-Length (Transfer-Encoding: chunked)."""
+    from werkzeug.test import EnvironBuilder, run_wsgi_app
+    environ = EnvironBuilder(path="/analyze_video", method="POST", data=b"\0" * size,
+                             content_type="video/mp4").get_environ()
+    # The test client would put Content-Length back, so the app is called directly
+    del environ["CONTENT_LENGTH"]
+    environ["HTTP_TRANSFER_ENCODING"] = "chunked"
+    environ["wsgi.input_terminated"] = True
+    app_iter, status, headers = run_wsgi_app(app, environ, buffered=True)
+    return int(status.split()[0])
+
+def test_chunked_upload_limit():
+    print("Testing the size limit on a chunked clip upload...")
+    import backend.database as database
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    original_path = database.DB_PATH
+    database.DB_PATH = path
+    try:
+        import backend.app as app_module
+    finally:
+        database.DB_PATH = original_path
+        os.remove(path)
+
+    original_limit = app_module.MAX_VIDEO_BYTES
+    app_module.MAX_VIDEO_BYTES = 1000
+    try:
+        # No Content-Length: the body is only limited while it is copied
+        assert _post_chunked(app_module.app, 5000) == 413
+        assert _post_chunked(app_module.app, 500) == 200
+    finally:
+        app_module.MAX_VIDEO_BYTES = original_limit
+
+if __name__ == "__main__":
+    test_clip_sampling()
+    test_sequence_without_face()
+    test_keyframes_and_smoothing()
+    test_keyframe_every_frame()
+    test_analyze_video_parameters()
+    test_chunked_upload_limit()
+    print("\nTest Complete.")
@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.face_workers import FaceWorkerPool
+
+def fake_analyze(frame, render):
+    """Stands in for analyze_face_frame in the workers (no models to load)."""
+    if render and render.get("sleep"):
+        time.sleep(render["sleep"])
+    if render and render.get("crash"):
+        os._exit(1)
+    return "Happy", {"mean": float(frame.mean())}, None, {"shape": list(frame.shape)}, f"pid {os.getpid()}"
+
+def _pool(**kwargs):
+    # Imported by name in the spawned workers (the test directory is on sys.path)
+    module = "test_face_workers" if __name__ == "__main__" else __name__
+    return FaceWorkerPool(analyze_path=f"{module}.fake_analyze", health_interval=0, **kwargs)
+
+def test_shared_memory_handoff():
+    print("Testing frame handoff through shared memory...")
+    pool = _pool(num_workers=2, queue_size=2, slot_bytes=120 * 160 * 3)
+    try:
+        frame = np.full((120, 160, 3), 7, dtype=np.uint8)
+        emotion, scores, _, features, _ = pool.analyze(frame)
+        assert emotion == "Happy" and scores["mean"] == 7.0
+        assert features["shape"] == [120, 160, 3]
+
+        # Larger than a slot: downscaled to fit
+        big = np.full((480, 640, 3), 3, dtype=np.uint8)
+        _, scores, _, features, _ = pool.analyze(big)
+        h, w, _ = features["shape"]
+        assert h * w * 3 <= 120 * 160 * 3 and scores["mean"] == 3.0
+        stats = pool.stats()
+        print(f"Stats: {stats}")
+        assert stats["completed"] == 2 and stats["ready"] == 2
+    finally:
+        pool.close()
+
+def test_timeout_and_replacement():
+    print("Testing hung and crashed workers...")
+    import models.face_workers as face_workers
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    pool = _pool(num_workers=1, queue_size=0)
+    old_timeout = face_workers.FACE_WORKER_TIMEOUT
+    face_workers.FACE_WORKER_TIMEOUT = 1.0
+    try:
+        pool.analyze(frame)
+        _, _, _, _, desc = pool.analyze(frame, {"sleep": 5})
+        assert desc == "Face analysis timed out."
+        _, _, _, _, desc = pool.analyze(frame, {"crash": True})
+        assert desc == "Face analysis timed out."
+        assert pool.stats()["restarts"] == 2
+        # The replacement works
+        assert pool.analyze(frame)[0] == "Happy"
+
+        # A dead idle worker is found by the health check
+        pool._workers[0].process.kill()
+        pool._workers[0].process.join()
+        assert pool.check_health() == 1
+        assert pool.analyze(frame)[0] == "Happy"
+    finally:
+        face_workers.FACE_WORKER_TIMEOUT = old_timeout
+        pool.close()
+
+def test_rejects_when_saturated():
+    print("Testing bounded dispatch...")
+    import threading
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    pool = _pool(num_workers=1, queue_size=0)
+    try:
+        pool.analyze(frame)  # wait for the worker to load
+        busy = threading.Thread(target=pool.analyze, args=(frame, {"sleep": 1}))
+        busy.start()
+        time.sleep(0.2)
+        start = time.monotonic()
+        _, _, _, _, desc = pool.analyze(frame)
+        assert desc == "Face analysis is busy, try again."
+        assert time.monotonic() - start < 0.1
+        busy.join()
+        assert pool.stats()["rejected"] == 1
+        assert pool.analyze(frame)[0] == "Happy"
+    finally:
+        pool.close()
+
+def test_concurrent_counters():
+    print("Testing pool counters under concurrency...")
+    import threading
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    pool = _pool(num_workers=2, queue_size=2)
+    try:
+        pool.analyze(frame)
+        threads = [threading.Thread(target=lambda: [pool.analyze(frame) for _ in range(20)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = pool.stats()
+        print(f"Stats: {stats}")
+        # Every request is counted exactly once
+        assert stats["completed"] + stats["rejected"] == 161
+        assert stats["failed"] == stats["timeouts"] == 0
+    finally:
+        pool.close()
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    test_shared_memory_handoff()
+    test_timeout_and_replacement()
+    test_rejects_when_saturated()
+    test_concurrent_counters()
+    print("\nTest Complete.")
@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.job_queue import JobQueue
+
+def test_retry_with_backoff():
+    print("Testing job retries...")
+    jobs = JobQueue("test-retry", max_retries=2, retry_backoff=0.05)
+    attempts = []
+    done = threading.Event()
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise RuntimeError("rate limited")
+        done.set()
+
+    assert jobs.submit(flaky)
+    assert done.wait(2)
+    assert len(attempts) == 3
+    # Backoff doubles: 0.05s, then 0.1s
+    gaps = [b - a for a, b in zip(attempts, attempts[1:])]
+    assert gaps[0] >= 0.045 and gaps[1] >= 0.095
+
+    # Gives up after max_retries extra attempts
+    failures = []
+    def broken():
+        failures.append(1)
+        raise RuntimeError("always down")
+    jobs.submit(broken)
+    assert jobs.drain(timeout=2)
+    assert len(failures) == 3
+
+def test_drop_when_full():
+    print("Testing a full queue...")
+    jobs = JobQueue("test-full", maxsize=2)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(2)
+
+    assert jobs.submit(blocker)
+    assert started.wait(2)
+    # The worker is busy: two jobs fit in the queue, the third is dropped
+    assert jobs.submit(lambda: None)
+    assert jobs.submit(lambda: None)
+    assert not jobs.submit(lambda: None)
+    assert jobs.pending() == 2
+    release.set()
+    assert jobs.drain(timeout=2)
+
+def test_drain_runs_queued_jobs():
+    print("Testing drain on shutdown...")
+    jobs = JobQueue("test-drain", num_workers=2)
+    results = []
+    for i in range(10):
+        jobs.submit(lambda i=i: (time.sleep(0.01), results.append(i)))
+    assert jobs.drain(timeout=5)
+    assert sorted(results) == list(range(10))
+    # No new jobs after shutdown
+    assert not jobs.submit(results.append, 99)
+    assert 99 not in results
+
+def test_restart_after_fork():
+    print("Testing worker restart after fork...")
+    jobs = JobQueue("test-fork")
+    ran = threading.Event()
+    assert jobs.submit(ran.set)
+    assert ran.wait(2)
+    parent_threads = list(jobs._threads)
+
+    if not hasattr(os, "fork"):
+        # Windows: simulate the pid change of a forked worker
+        jobs._pid = -1
+        child_ran = threading.Event()
+        assert jobs.submit(child_ran.set) and child_ran.wait(2)
+        assert jobs._threads and jobs._threads[0] is not parent_threads[0]
+        assert jobs.drain(timeout=2)
+        return
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: the parent's worker thread did not survive the fork
+        code = 1
+        try:
+            child_ran = threading.Event()
+            if jobs.submit(child_ran.set) and child_ran.wait(2) and jobs._threads[0] is not parent_threads[0]:
+                code = 0
+        finally:
+            os.write(write_end, bytes([code]))
+            os._exit(code)
+    os.close(write_end)
+    _, status = os.waitpid(pid, 0)
+    result = os.read(read_end, 1)
+    os.close(read_end)
+    assert result == b"\x00" and os.WEXITSTATUS(status) == 0
+    # The parent's workers are untouched
+    assert jobs._threads == parent_threads and jobs.drain(timeout=2)
+
+if __name__ == "__main__":
+    test_retry_with_backoff()
+    test_drop_when_full()
+    test_drain_runs_queued_jobs()
+    test_restart_after_fork()
+    print("\nAll job queue tests passed!")
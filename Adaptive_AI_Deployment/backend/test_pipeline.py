@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.pipeline import StageGraph
+
+def _sleep_then(value, seconds=0.2):
+    def stage(**_):
+        time.sleep(seconds)
+        return value
+    return stage
+
+def test_independent_stages_overlap():
+    print("Testing parallel stages...")
+    graph = StageGraph()
+    graph.add("text", _sleep_then("text"))
+    graph.add("face", _sleep_then("face"))
+    graph.add("history", _sleep_then("history"))
+    graph.add("fuse", lambda text, face: f"{text}+{face}", deps=("text", "face"))
+
+    start = time.perf_counter()
+    results = graph.run()
+    elapsed = time.perf_counter() - start
+    print(f"Three 0.2s stages in {elapsed:.2f}s")
+    # Critical path is one 0.2s stage, the sum would be 0.6s
+    assert elapsed < 0.45
+    assert results == {"text": "text", "face": "face", "history": "history", "fuse": "text+face"}
+    assert set(graph.timings) == set(results)
+
+def test_dependency_order():
+    print("Testing dependency order...")
+    order = []
+
+    def stage(name, value):
+        def fn(**deps):
+            order.append(name)
+            return value + sum(deps.values())
+        return fn
+
+    graph = StageGraph()
+    graph.add("a", stage("a", 1))
+    graph.add("b", stage("b", 10), deps=("a",))
+    graph.add("c", stage("c", 100), deps=("a", "b"))
+    results = graph.run()
+    assert order == ["a", "b", "c"]
+    assert results == {"a": 1, "b": 11, "c": 112}
+
+def test_invalid_stages():
+    print("Testing invalid stage definitions...")
+    graph = StageGraph()
+    graph.add("a", lambda: 1)
+    for name, deps in (("b", ("missing",)), ("loop", ("loop",)), ("a", ())):
+        try:
+            graph.add(name, lambda **_: None, deps=deps)
+        except ValueError as e:
+            print(f"Rejected: {e}")
+        else:
+            raise AssertionError(f"Stage {name!r} with deps {deps} was accepted")
+    # Stages can only depend on stages registered before them, so no cycle can be built
+    assert list(graph.stages) == ["a"]
+
+def test_failing_stage():
+    print("Testing a failing stage...")
+    ran = []
+
+    def broken():
+        raise RuntimeError("model crashed")
+
+    graph = StageGraph()
+    graph.add("broken", broken)
+    graph.add("slow", _sleep_then("slow", 0.1))
+    graph.add("after", lambda broken: ran.append("after"), deps=("broken",))
+    graph.add("later", lambda after: ran.append("later"), deps=("after",))
+    try:
+        graph.run()
+    except RuntimeError as e:
+        assert str(e) == "model crashed"
+    else:
+        raise AssertionError("The stage error was not raised")
+    time.sleep(0.2)
+    assert ran == []
+
+if __name__ == "__main__":
+    test_independent_stages_overlap()
+    test_dependency_order()
+    test_invalid_stages()
+    test_failing_stage()
+    print("\nAll pipeline tests passed!")
@@ -0,0 +1,143 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend import provider_clients, llm_service
+from backend.provider_router import ProviderRouter
+
+class _FakeProvider(BaseHTTPRequestHandler):
+    """OpenAI-style chat and transcription endpoints with HTTP/1.1 keep-alive."""
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        _FakeProvider.connections.add(self.client_address)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if ":streamGenerateContent" in self.path:
+            # Gemini's alt=sse stream has no [DONE]; the body just ends
+            events = "".join(
+                f"data: {json.dumps({'candidates': [{'content': {'parts': [{'text': word}]}}]})}\n\n"
+                for word in ("Hello", " world")
+            )
+            self._send("text/event-stream", events.encode())
+        elif self.path.endswith("/audio/transcriptions"):
+            assert b"distil-whisper" in body
+            self._send("application/json", json.dumps({"text": "hello there"}).encode())
+        elif json.loads(body).get("stream"):
+            events = "".join(
+                f"data: {json.dumps({'choices': [{'delta': {'content': word}}]})}\n\n" for word in ("Hi", " you")
+            ) + "data: [DONE]\n\n"
+            self._send("text/event-stream", events.encode())
+        else:
+            self._send("application/json", json.dumps({"choices": [{"message": {"content": "Hi you"}}]}).encode())
+
+    def _send(self, content_type, payload):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+class _ClosingProvider(BaseHTTPRequestHandler):
+    """Gemini-style SSE stream with no length and no [DONE]: it ends by closing the connection."""
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for word in ("Hello", " world"):
+            self.wfile.write(f"data: {json.dumps({'candidates': [{'content': {'parts': [{'text': word}]}}]})}\n\n".encode())
+            self.wfile.flush()
+
+def _start_server(handler=_FakeProvider):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_connection_reuse():
+    print("Testing pooled provider connections...")
+    server = _start_server()
+    _FakeProvider.connections.clear()
+    original_base = llm_service.GROQ_API_BASE
+    llm_service.GROQ_API_BASE = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    original_key = os.environ.get("GROQ_API_KEY")
+    os.environ["GROQ_API_KEY"] = original_key or "test-key"
+    handle, audio = tempfile.mkstemp(suffix=".wav")
+    os.close(handle)
+    try:
+        for _ in range(5):
+            assert llm_service._call_groq("key", "Hello", [], "Be kind.") == "Hi you"
+        assert "".join(llm_service._stream_groq("key", "Hello", [], None)) == "Hi you"
+        assert llm_service.transcribe_audio(audio) == "hello there"
+        # Seven requests, one TCP connection
+        print(f"Server saw {len(_FakeProvider.connections)} connection(s)")
+        assert len(_FakeProvider.connections) == 1
+    finally:
+        llm_service.GROQ_API_BASE = original_base
+        if original_key is None:
+            os.environ.pop("GROQ_API_KEY", None)
+        os.remove(audio)
+        server.shutdown()
+
+def test_stream_without_done():
+    print("Testing a stream that ends without [DONE]...")
+    server = _start_server()
+    original_base = llm_service.GEMINI_API_BASE
+    llm_service.GEMINI_API_BASE = f"http://127.0.0.1:{server.server_address[1]}/v1beta"
+    try:
+        for _ in range(2):
+            assert "".join(llm_service._stream_gemini("key", "Hello", [], None)) == "Hello world"
+    finally:
+        llm_service.GEMINI_API_BASE = original_base
+        server.shutdown()
+
+def test_routed_stream_closed_by_provider():
+    print("Testing a routed stream that ends when the provider closes the connection...")
+    server = _start_server(_ClosingProvider)
+    original_base = llm_service.GEMINI_API_BASE
+    llm_service.GEMINI_API_BASE = f"http://127.0.0.1:{server.server_address[1]}/v1beta"
+    try:
+        router = ProviderRouter()
+        stream = partial(llm_service._stream_gemini, "key", "Hello", [], None)
+        # A complete reply must not be reported as cut off part-way
+        assert "".join(router.stream([("gemini", stream)])) == "Hello world"
+        assert router.stats()["providers"]["gemini"]["stream"]["wins"] == 1
+    finally:
+        llm_service.GEMINI_API_BASE = original_base
+        server.shutdown()
+
+def test_openai_client_cache():
+    print("Testing the OpenAI client cache...")
+    client = provider_clients.openai_client("sk-test-a")
+    assert provider_clients.openai_client("sk-test-a") is client
+    assert provider_clients.openai_client("sk-test-b") is not client
+    # A hedged-away call must not hold a router thread for the SDK's 600 s
+    assert client.max_retries == 0 and client.timeout.read == provider_clients.OPENAI_TIMEOUT
+
+    # A forked worker must not reuse the parent's pooled clients
+    session = provider_clients.session()
+    provider_clients._pid = -1
+    assert provider_clients.session() is not session
+    assert provider_clients.openai_client("sk-test-a") is not client
+
+if __name__ == "__main__":
+    test_connection_reuse()
+    test_stream_without_done()
+    test_routed_stream_closed_by_provider()
+    test_openai_client_cache()
+    print("\nAll provider client tests passed!")
@@ -0,0 +1,197 @@
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend import provider_router
+from backend.provider_router import ProviderRouter, ProviderStats
+
+def _answer(text, delay=0.0):
+    def call():
+        time.sleep(delay)
+        return text
+    return call
+
+def _chunks(words, delay=0.0, gap=0.0, sent=None):
+    def stream():
+        time.sleep(delay)
+        for word in words:
+            if sent is not None:
+                sent.append(word)
+            yield word
+            time.sleep(gap)
+    return stream
+
+def _trained_router(name, latency, samples=25, mode="call"):
+    """A router that has seen `samples` calls of `name` taking `latency` seconds."""
+    router = ProviderRouter()
+    for _ in range(samples):
+        router.stats_for(name, mode).record(latency, True)
+    return router
+
+def test_provider_stats():
+    print("Testing rolling provider stats...")
+    stats = ProviderStats(window=10, max_age=60)
+    assert stats.latency_percentile(95) is None and stats.error_rate() is None
+    for seconds in (0.1, 0.2, 0.3, 0.4, 1.0):
+        stats.record(seconds, True)
+    stats.record(5.0, False)
+    assert stats.latency_percentile(50) == 0.3
+    assert stats.latency_percentile(95) == 1.0
+    assert abs(stats.error_rate() - 1 / 6) < 1e-9
+    # Until enough samples are in, the default hedge delay applies
+    assert stats.hedge_delay() == provider_router.LLM_HEDGE_DELAY
+
+    old = ProviderStats(window=10, max_age=0.05)
+    old.record(0.1, False)
+    time.sleep(0.1)
+    assert old.latency_percentile(50) is None and len(old._recent()) == 0
+
+def test_fast_primary_is_not_hedged():
+    print("Testing a fast primary...")
+    router = _trained_router("groq", 0.2)
+    backup_calls = []
+    result = router.call([("groq", _answer("from groq", 0.05)),
+                          ("openai", lambda: backup_calls.append(1) or "from openai")])
+    assert result == "from groq"
+    assert not backup_calls and router.hedges == 0
+
+def test_slow_primary_is_hedged():
+    print("Testing a hedged request...")
+    # groq usually answers in 0.3s; today it takes 2s
+    router = _trained_router("groq", 0.3)
+    start = time.perf_counter()
+    result = router.call([("groq", _answer("from groq", 2.0)), ("openai", _answer("from openai", 0.1))])
+    elapsed = time.perf_counter() - start
+    print(f"Answer in {elapsed:.2f}s: {result}")
+    assert result == "from openai"
+    assert elapsed < 1.0
+    assert router.hedges == 1
+    stats = router.stats()["providers"]
+    assert stats["groq"]["call"]["hedged"] == 1 and stats["openai"]["call"]["wins"] == 1
+
+def test_failover_and_demotion():
+    print("Testing failover...")
+    router = ProviderRouter()
+    for _ in range(5):
+        assert router.call([("groq", _answer(None)), ("gemini", _answer("from gemini"))]) == "from gemini"
+    assert router.failovers == 5
+    # groq now fails every call: it is asked last
+    assert router.stats_for("groq").unhealthy()
+    order = router.order([("groq", None), ("gemini", None)])
+    assert [name for name, _ in order] == ["gemini", "groq"]
+
+    assert router.call([("groq", _answer(None))]) is None
+    assert router.call([]) is None
+
+def test_deadline():
+    print("Testing the router deadline...")
+    router = ProviderRouter()
+    start = time.perf_counter()
+    assert router.call([("groq", _answer("late", 1.0))], deadline=0.2) is None
+    assert time.perf_counter() - start < 0.6
+
+def test_stream_hedge_cancels_loser():
+    print("Testing a hedged stream...")
+    router = _trained_router("groq", 0.1, mode="stream")
+    loser_sent = []
+    chunks = list(router.stream([
+        ("groq", _chunks(["slow", " groq", " reply"], delay=1.0, gap=0.05, sent=loser_sent)),
+        ("openai", _chunks(["Hi", " there"], delay=0.05)),
+    ]))
+    assert chunks == ["Hi", " there"]
+    assert router.hedges == 1
+    # The slow stream stopped after at most its first chunk
+    time.sleep(1.3)
+    assert len(loser_sent) <= 1
+    # ...and its latency still counts, or the hedge delay would keep shrinking
+    groq = router.stats_for("groq", "stream")
+    assert groq.calls == 26 and groq.latency_percentile(100) >= 1.0
+
+def test_stream_failover():
+    print("Testing stream failover...")
+    router = ProviderRouter()
+    chunks = list(router.stream([("groq", _chunks([])), ("gemini", _chunks(["Hello", "!"]))]))
+    assert chunks == ["Hello", "!"]
+    assert router.failovers == 1
+    assert list(router.stream([("groq", _chunks([]))])) == []
+
+def test_stream_client_disconnect():
+    print("Testing a closed stream...")
+    router = ProviderRouter()
+    sent = []
+    done = threading.Event()
+
+    def endless():
+        try:
+            for i in range(1000):
+                sent.append(i)
+                yield str(i)
+                time.sleep(0.01)
+        finally:
+            done.set()
+
+    stream = router.stream([("groq", endless)])
+    assert next(stream) == "0"
+    stream.close()
+    assert done.wait(2)
+    assert len(sent) < 1000
+
+def test_stream_fails_part_way():
+    print("Testing a stream that fails part-way...")
+    router = ProviderRouter()
+
+    def reset():
+        yield "That sounds "
+        raise ConnectionError("connection reset")
+
+    # Failing before the first chunk is a failover...
+    def broken():
+        raise ConnectionError("refused")
+        yield
+
+    assert list(router.stream([("groq", broken), ("gemini", _chunks(["Hi"]))])) == ["Hi"]
+
+    # ...failing after it must not look like a finished reply
+    received = []
+    try:
+        for chunk in router.stream([("groq", reset), ("gemini", _chunks(["Hi"]))]):
+            received.append(chunk)
+    except RuntimeError as e:
+        assert "connection reset" in str(e)
+    else:
+        raise AssertionError("a cut-off stream ended normally")
+    assert received == ["That sounds "]
+
+def test_concurrent_counters():
+    print("Testing router counters under concurrency...")
+    router = ProviderRouter()
+    threads = [
+        threading.Thread(target=lambda: [router.call([("groq", _answer(None)), ("gemini", _answer("ok"))])
+                                         for _ in range(25)])
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = router.stats()
+    assert stats["providers"]["gemini"]["call"]["wins"] == 200
+    # groq is demoted once it keeps failing; every call it did get failed over
+    assert stats["failovers"] == stats["providers"]["groq"]["call"]["calls"] > 0
+
+if __name__ == "__main__":
+    test_provider_stats()
+    test_fast_primary_is_not_hedged()
+    test_slow_primary_is_hedged()
+    test_failover_and_demotion()
+    test_deadline()
+    test_stream_hedge_cancels_loser()
+    test_stream_failover()
+    test_stream_client_disconnect()
+    test_stream_fails_part_way()
+    test_concurrent_counters()
+    print("\nAll provider router tests passed!")
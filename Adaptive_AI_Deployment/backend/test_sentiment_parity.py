@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.sentiment_lexicon import lexicon_polarity, textblob_polarity
+
+# Messages that miss the emotion keywords and reach the sentiment fallback
+SAMPLES = [
+    "I am having a good day",
+    "not good at all",
+    "This is really not good",
+    "I'm very happy!!",
+    "what a terrible, horrible day",
+    "I don't feel good",
+    "meh",
+    "the weather is nice today",
+    "I hate this",
+    "It's okay I guess",
+    "I feel kind of bad :(",
+    "Great job :)",
+    "Today was quite boring and dull",
+    "never been better",
+    "Nothing",
+    "my exam went fine",
+    "This is the worst",
+    "Not a bad idea",
+    "life is hard",
+    "it was an interesting experience",
+    "I feel awful and sick",
+    "Work was fine but my boss was rude",
+    "Honestly, it's been a pretty calm and pleasant week.",
+    "I got the job! Best news ever!",
+]
+
+def _label(polarity):
+    # Same buckets as detect_text_emotion's fallback
+    if polarity >= 0.3:
+        return "Happy"
+    elif polarity >= 0.05:
+        return "Positive"
+    elif polarity <= -0.3:
+        return "Sad"
+    elif polarity <= -0.05:
+        return "Negative"
+    return "Neutral"
+
+def test_label_parity():
+    print("Comparing built-in lexicon labels with TextBlob...")
+    mismatches = []
+    for text in SAMPLES:
+        ours, theirs = lexicon_polarity(text), textblob_polarity(text)
+        if _label(ours) != _label(theirs):
+            mismatches.append((text, ours, theirs))
+            print(f"MISMATCH '{text}': lexicon={ours:+.3f} textblob={theirs:+.3f}")
+
+    agreement = 1 - len(mismatches) / len(SAMPLES)
+    print(f"Label agreement: {agreement:.0%}")
+    assert agreement >= 0.95
+
+def test_latency():
+    print("Comparing latency...")
+    texts = SAMPLES * 20
+
+    start = time.perf_counter()
+    for text in texts:
+        lexicon_polarity(text)
+    lexicon_ms = (time.perf_counter() - start) * 1000 / len(texts)
+
+    start = time.perf_counter()
+    for text in texts:
+        textblob_polarity(text)
+    textblob_ms = (time.perf_counter() - start) * 1000 / len(texts)
+
+    print(f"Lexicon:  {lexicon_ms:.3f} ms/text")
+    print(f"TextBlob: {textblob_ms:.3f} ms/text ({textblob_ms / lexicon_ms:.1f}x slower)")
+    assert lexicon_ms < textblob_ms
+
+if __name__ == "__main__":
+    test_label_parity()
+    test_latency()
+    print("\nTest Complete.")
@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import models.emotion_text as emotion_text
+from models.emotion_text import detect_text_emotion, detect_text_emotion_batch
+from models.emotion_lexicon import LexiconWatcher, load_lexicon, LEXICON_SOURCE_PATH
+from models.result_cache import ResultCache, text_cache
+
+SAMPLES = [
+    "I feel so lonely and isolated.",
+    "I am furious, fed up and so angry",
+    "thank you so much, I'm blessed",
+    "a bit tired and worried about tomorrow",
+    "I’m at my wit’s end",
+    "the weather is nice today",
+    "Nothing",
+    "",
+]
+
+def test_word_boundaries():
+    print("Testing word-boundary matching...")
+    # "alone" must not match inside "lonely", "so" not inside "also"
+    result = detect_text_emotion("also lonely")[0]
+    print(f"Result: {result}")
+    assert result["label"] == "Lonely"
+    assert result["confidence"] == min(0.95, 0.7 + 0.1)
+    assert result["intensity"] == "moderate"
+
+def test_batch_matches_single():
+    print("Testing batch scoring against single-text scoring...")
+    batch = detect_text_emotion_batch(SAMPLES)
+    for text, results in zip(SAMPLES, batch):
+        print(f"'{text}' -> {results[0]['label']}")
+        assert results == detect_text_emotion(text)
+
+def test_result_cache():
+    print("Testing the LRU/TTL result cache...")
+    cache = ResultCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    stats = cache.stats()
+    print(f"Stats: {stats}")
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 1)
+
+    expired = ResultCache(maxsize=2, ttl=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None and expired.stats()["expirations"] == 1
+
+def test_text_emotion_cache():
+    print("Testing cached text emotion...")
+    text_cache.clear()
+    first = detect_text_emotion("I feel lonely")
+    hits = text_cache.stats()["hits"]
+    # Case and whitespace differences share an entry
+    second = detect_text_emotion("  i FEEL   lonely ")
+    assert second == first
+    assert text_cache.stats()["hits"] == hits + 1
+
+    # Mutating a returned result must not corrupt the cache
+    second[0]["label"] = "Changed"
+    assert detect_text_emotion("I feel lonely") == first
+
+    # Swapping the lexicon invalidates cached results
+    emotion_text.set_lexicon(emotion_text.CompiledLexicon(
+        {"Calm": {"keywords": ["lonely"], "phrases": []}}, [], []
+    ))
+    try:
+        assert detect_text_emotion("I feel lonely")[0]["label"] == "Calm"
+    finally:
+        emotion_text.set_lexicon(emotion_text.CompiledLexicon(
+            emotion_text.EMOTION_KEYWORDS, emotion_text.INTENSITY_HIGH, emotion_text.INTENSITY_LOW
+        ))
+    assert detect_text_emotion("I feel lonely") == first
+
+def test_ml_engine():
+    print("Testing the ML text emotion engine...")
+    from sklearn.linear_model import SGDClassifier
+    from models.text_emotion_ml import TextEmotionModel, make_vectorizer
+
+    examples = [(pattern, emotion)
+                for emotion, patterns in emotion_text.EMOTION_KEYWORDS.items()
+                for pattern in patterns["keywords"] + patterns["phrases"]]
+    texts, labels = zip(*examples)
+    classifier = SGDClassifier(loss="log_loss", random_state=42)
+    classifier.fit(make_vectorizer().transform(texts), labels)
+    model = TextEmotionModel.from_classifier(classifier)
+
+    # Artifact round trip
+    fd, path = tempfile.mkstemp(suffix=".npz")
+    os.close(fd)
+    model.save(path)
+    loaded = TextEmotionModel.load(path)
+    print(f"Artifact size: {os.path.getsize(path)} bytes")
+    assert loaded.predict(SAMPLES[:4]) == model.predict(SAMPLES[:4])
+
+    emotion_text._ML_MODEL = loaded
+    try:
+        batch = detect_text_emotion_batch(SAMPLES)
+        for text, results in zip(SAMPLES, batch):
+            print(f"'{text}' -> {results[0]['label']}")
+            assert results == detect_text_emotion(text)
+        assert detect_text_emotion("I feel so alone tonight")[0]["label"] == "Lonely"
+    finally:
+        emotion_text._ML_MODEL = None
+
+def test_lexicon_hot_reload():
+    print("Testing lexicon artifact build and hot reload...")
+    workdir = tempfile.mkdtemp()
+    source = os.path.join(workdir, "emotion_lexicon.json")
+    artifact = os.path.join(workdir, "emotion_lexicon.bin")
+    shutil.copy(LEXICON_SOURCE_PATH, source)
+
+    # The artifact is built on demand and memory-mapped
+    lexicon, stamp = load_lexicon(source, artifact)
+    assert os.path.exists(artifact) and stamp is not None
+    assert lexicon.version == emotion_text._LEXICON.version
+    for text in SAMPLES:
+        assert lexicon.score(text) == emotion_text._LEXICON.score(text)
+
+    swapped = []
+    watcher = LexiconWatcher(swapped.append, source, artifact, interval=0, artifact_stamp=stamp)
+    assert watcher.check() is None, "Nothing changed yet"
+
+    # Edit the JSON: the watcher rebuilds the artifact and hands over the new lexicon
+    with open(source, encoding="utf-8") as f:
+        data = json.load(f)
+    data["emotions"]["Lonely"]["keywords"].append("homesick")
+    with open(source, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.utime(source, ns=(stamp[0] + 10 ** 9, stamp[0] + 10 ** 9))
+
+    assert watcher.check() is not None
+    print(f"Reloaded version {swapped[-1].version}")
+    assert swapped[-1].version != lexicon.version
+    assert swapped[-1].score("I am homesick")[0] == {"Lonely": 1}
+    # The old lexicon keeps working for in-flight requests
+    assert lexicon.score("I am homesick")[0] == {}
+    shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    test_word_boundaries()
+    test_batch_matches_single()
+    test_result_cache()
+    test_text_emotion_cache()
+    test_ml_engine()
+    test_lexicon_hot_reload()
+    print("\nTest Complete.")
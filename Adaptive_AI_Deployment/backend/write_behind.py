@@ -0,0 +1,165 @@
+"""
+Write-behind batching for SQLite inserts.
+Request threads enqueue (sql, params) and return immediately. One writer
+thread groups them and commits each group in a single transaction, so N
+inserts cost one commit (and one fsync) instead of N.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+
+class _FlushMarker:
+    """Queue entry that is acknowledged once everything queued before it is committed."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class WriteBehindWriter:
+    """
+    Batches writes from all threads into periodic transactions.
+
+    A batch is committed when it reaches max_batch_rows or when flush_interval_ms
+    has passed since its first row. In synchronous mode (used by tests and
+    scripts) execute() writes and commits immediately in the calling thread.
+    """
+
+    def __init__(self, connect, flush_interval_ms=50, max_batch_rows=200, max_queue=10000, synchronous=False):
+        """
+        Args:
+            connect: Zero-argument callable returning a sqlite3 connection for
+                the calling thread (e.g. database.get_connection). The writer
+                commits on it but does not close it.
+            flush_interval_ms: Maximum time a row waits before being committed.
+            max_batch_rows: Maximum rows per transaction.
+            max_queue: Queue bound; execute() blocks when it is full.
+            synchronous: Write inline instead of in the background.
+        """
+        self.connect = connect
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self.max_queue = max_queue
+        self.synchronous = synchronous
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+        atexit.register(self.close)
+
+    # --- PUBLIC API ---
+
+    def execute(self, sql, params=()):
+        """Queue one write statement (or run it now in synchronous mode)."""
+        if self.synchronous:
+            self._write_now(sql, params)
+            return
+        self._ensure_started()
+        # Block rather than drop when the writer falls behind
+        self._queue.put((sql, params))
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is committed. Returns False on timeout."""
+        if self.synchronous or self._pid != os.getpid():
+            return True
+        marker = _FlushMarker()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flush pending writes and stop the writer thread."""
+        if self._pid != os.getpid():
+            return True
+        flushed = self.flush(timeout)
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._pid = None
+        return flushed
+
+    def set_synchronous(self, synchronous=True):
+        """Switch modes (tests). Pending background writes are flushed first."""
+        if synchronous:
+            self.flush()
+        self.synchronous = synchronous
+
+    # --- INTERNALS ---
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A writer thread inherited from a parent process is not running here
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _write_now(self, sql, params):
+        conn = self.connect()
+        try:
+            conn.execute(sql, params)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, markers = [], []
+            try:
+                item = self._queue.get()
+                deadline = time.monotonic() + self.flush_interval
+
+                # Collect until the batch is full, the interval expires, or a flush/stop arrives
+                while True:
+                    if item is None:
+                        stopping = True
+                        break
+                    if isinstance(item, _FlushMarker):
+                        markers.append(item)
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.max_batch_rows:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+
+                if batch:
+                    self._commit_batch(self.connect(), batch)
+            except Exception as e:
+                # e.g. connect() failing on a locked or missing database file.
+                # The thread must survive: flush() and execute() depend on it.
+                print(f"Database writer error, {len(batch)} queued writes lost: {e}")
+            finally:
+                for marker in markers:
+                    marker.done.set()
+
+    def _commit_batch(self, conn, batch):
+        try:
+            for sql, params in batch:
+                conn.execute(sql, params)
+            conn.commit()
+        except Exception as e:
+            # One bad row should not lose the rest of the batch; retry row by row
+            conn.rollback()
+            print(f"Database error in batched write ({len(batch)} rows), retrying individually: {e}")
+            for sql, params in batch:
+                try:
+                    conn.execute(sql, params)
+                    conn.commit()
+                except Exception as row_error:
+                    conn.rollback()
+                    print(f"Database error: {row_error}")
@@ -0,0 +1,44 @@
+"""
+Production WSGI entry point.
+
+Run with:
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+
+With PRELOAD_MODELS=1 (the default) gunicorn imports this module once in the
+master process (preload_app in gunicorn.conf.py), so the heavy imports and
+model weights are loaded before the workers are forked and their memory pages
+are shared copy-on-write. With PRELOAD_MODELS=0 every worker imports it (and
+loads its own copy of the models) after the fork.
+"""
+
+import gc
+import os
+import sys
+
+# Allow import from parent directory
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.app import app
+
+
+def preload_models():
+    """
+    Warm up the models in the master process and freeze the heap.
+    The face classifier, the mediapipe/TensorFlow modules and the sentiment
+    lexicon (models.sentiment_lexicon) are loaded by importing backend.app.
+    With TEXT_SENTIMENT_BACKEND=textblob, TextBlob and its lexicon are only
+    loaded on the first polarity() call, so make that call here.
+    """
+    try:
+        from models.sentiment_lexicon import polarity
+        polarity("warm up")
+    except Exception as e:
+        print(f"Sentiment preload failed: {e}")
+
+    # Move everything loaded so far into the permanent generation so the
+    # garbage collector does not write to (and un-share) those pages later.
+    gc.freeze()
+
+
+if os.environ.get("PRELOAD_MODELS", "1") == "1":
+    preload_models()
@@ -0,0 +1,244 @@
+"""
+Camera-free benchmark of the face pipeline.
+
+Feeds a directory of images, a single image or a video file through the same
+code path as /analyze_frame (decode, pre-screen, FaceMesh, landmarks,
+classifier, features, render, encode) and reports per-stage latency percentiles,
+frames/sec and peak RSS. Stage times come from analyze_face_frame's
+timings hook, so the production code is measured, not a copy of it.
+
+Usage (from Adaptive_AI_Deployment):
+    python benchmark_face.py path/to/faces/ --output bench.json
+    python benchmark_face.py clip.mp4 --repeat 3 --render none
+    python benchmark_face.py path/to/faces/ --compare bench.json
+
+The JSON result is meant to be kept per commit and diffed (--compare prints
+the p50/p95 change of every stage against an earlier result).
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), ".")))
+
+import cv2
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+STAGES = ("decode", "prescreen", "mesh", "landmarks", "classify", "features", "render", "encode", "total")
+PERCENTILES = (50, 90, 95, 99)
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far, in MiB. On Windows this
+    needs psutil (peak working set); None if it is not installed.
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+
+
+def _round(value, digits=1):
+    return round(value, digits) if value is not None else None
+
+
+def load_inputs(path, limit=None):
+    """
+    Encoded images to decode per frame: the files of a directory (sorted) or a
+    single image, read into memory up front so disk I/O is not measured.
+    Returns None if path is not an image or directory (i.e. a video).
+    """
+    if os.path.isdir(path):
+        names = sorted(n for n in os.listdir(path) if n.lower().endswith(IMAGE_EXTENSIONS))
+        files = [os.path.join(path, n) for n in names]
+    elif path.lower().endswith(IMAGE_EXTENSIONS):
+        files = [path]
+    else:
+        return None
+    inputs = []
+    for name in files[:limit]:
+        with open(name, "rb") as f:
+            inputs.append(f.read())
+    return inputs
+
+
+def iter_decoded(path, inputs, limit=None):
+    """(seconds spent decoding, BGR frame) per frame of the image set or video."""
+    if inputs is not None:
+        from models.emotion_face import decode_frame
+        for data in inputs:
+            start = time.perf_counter()
+            frame = decode_frame(data)
+            elapsed = time.perf_counter() - start
+            if frame is not None:
+                yield elapsed, frame
+        return
+
+    cap = cv2.VideoCapture(path)
+    try:
+        count = 0
+        while limit is None or count < limit:
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            elapsed = time.perf_counter() - start
+            if not ret:
+                break
+            count += 1
+            yield elapsed, frame
+    finally:
+        cap.release()
+
+
+def summarize(samples):
+    """Latency statistics in milliseconds for a list of seconds."""
+    if not samples:
+        return None
+    ms = np.asarray(samples) * 1000.0
+    stats = {f"p{p}": round(float(np.percentile(ms, p)), 3) for p in PERCENTILES}
+    stats["mean"] = round(float(ms.mean()), 3)
+    stats["max"] = round(float(ms.max()), 3)
+    return stats
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmark(path, render_params=None, repeat=1, warmup=3, limit=None):
+    """
+    Run every frame of path through analyze_face_frame repeat times.
+    Returns the result dict (see the module docstring).
+    """
+    start = time.perf_counter()
+    from models import emotion_face
+    load_seconds = time.perf_counter() - start
+    rss_after_load = peak_rss_mb()
+    render = emotion_face.render_options(render_params or {})
+
+    inputs = load_inputs(path, limit)
+    if inputs is not None and not inputs:
+        raise ValueError(f"No images found at {path}")
+
+    # Warm-up: graph initialization and the first classifier call are not measured
+    for i, (_, frame) in enumerate(iter_decoded(path, inputs, limit)):
+        if i >= warmup:
+            break
+        emotion_face.analyze_face_frame(frame, render)
+
+    samples = {stage: [] for stage in STAGES}
+    frames = faces = 0
+    emotions = {}
+    wall_start = time.perf_counter()
+    for _ in range(repeat):
+        for decode_seconds, frame in iter_decoded(path, inputs, limit):
+            timings = {"decode": decode_seconds}
+            frame_start = time.perf_counter()
+            emotion, scores, _, _, _ = emotion_face.analyze_face_frame(frame, render, timings)
+            timings["total"] = decode_seconds + time.perf_counter() - frame_start
+            for stage, seconds in timings.items():
+                samples[stage].append(seconds)
+            frames += 1
+            faces += bool(scores)
+            emotions[emotion] = emotions.get(emotion, 0) + 1
+    wall_seconds = time.perf_counter() - wall_start
+    if not frames:
+        raise ValueError(f"No decodable frames in {path}")
+
+    return {
+        "input": os.path.abspath(path),
+        "frames": frames,
+        "faces": faces,
+        "emotions": emotions,
+        "repeat": repeat,
+        "render": render,
+        "fps": round(frames / wall_seconds, 2),
+        # Stages that did not run on a frame (no face, render=none) have fewer samples
+        "stages_ms": {stage: summarize(samples[stage]) for stage in STAGES if samples[stage]},
+        "model_load_s": round(load_seconds, 3),
+        "rss_after_load_mb": _round(rss_after_load),
+        "peak_rss_mb": _round(peak_rss_mb()),
+        "environment": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "cpu_count": os.cpu_count(),
+            "machine": platform.machine(),
+            "face_classifier": emotion_face.FACE_CLASSIFIER,
+        },
+    }
+
+
+def print_report(result, baseline=None):
+    print(f"\n{result['frames']} frames ({result['faces']} with a face) from {result['input']}")
+    if result["peak_rss_mb"] is None:
+        memory = "peak RSS unknown (pip install psutil)"
+    else:
+        memory = f"peak RSS {result['peak_rss_mb']} MiB (after model load {result['rss_after_load_mb']} MiB)"
+    print(f"Throughput: {result['fps']} frames/s | {memory} | model load {result['model_load_s']} s")
+    header = f"{'stage':<10}" + "".join(f"{name:>10}" for name in ("p50", "p90", "p95", "p99", "mean"))
+    if baseline:
+        header += f"{'p50 diff':>12}{'p95 diff':>12}"
+    print(header)
+    for stage, stats in result["stages_ms"].items():
+        line = f"{stage:<10}" + "".join(f"{stats[key]:>10.2f}" for key in ("p50", "p90", "p95", "p99", "mean"))
+        before = (baseline or {}).get("stages_ms", {}).get(stage)
+        if before:
+            for key in ("p50", "p95"):
+                change = (stats[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                line += f"{change:>+11.1f}%"
+        print(line)
+    if baseline:
+        print(f"Baseline: commit {baseline.get('environment', {}).get('commit')}, {baseline.get('fps')} frames/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the face pipeline on images or a video.")
+    parser.add_argument("path", help="Directory of images, an image, or a video file")
+    parser.add_argument("--repeat", type=int, default=1, help="Passes over the input")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured frames before the run")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many frames")
+    parser.add_argument("--render", default=None, help="full | landmarks | none (default FACE_RENDER)")
+    parser.add_argument("--render-scale", default=None)
+    parser.add_argument("--image-format", default=None, help="jpeg | webp")
+    parser.add_argument("--output", help="Write the JSON result here")
+    parser.add_argument("--compare", help="Earlier JSON result to compare against")
+    args = parser.parse_args()
+
+    render_params = {"render": args.render, "render_scale": args.render_scale, "image_format": args.image_format}
+    result = run_benchmark(args.path, render_params, args.repeat, args.warmup, args.limit)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved {args.output}")
@@ -0,0 +1,22 @@
+"""
+Compiles models/data/emotion_lexicon.json into the binary matcher artifact
+(models/data/emotion_lexicon.bin) that the backend workers memory-map.
+
+The backend also builds the artifact on demand when it is missing or older
+than the JSON, so running this is optional. Run from Adaptive_AI_Deployment:
+    python models/build_emotion_lexicon.py
+Running workers pick up the new artifact within LEXICON_WATCH_INTERVAL seconds.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.emotion_lexicon import build_artifact, load_artifact, LEXICON_SOURCE_PATH, LEXICON_ARTIFACT_PATH
+
+if __name__ == "__main__":
+    path = build_artifact(LEXICON_SOURCE_PATH, LEXICON_ARTIFACT_PATH)
+    lexicon = load_artifact(path)
+    print(f"Compiled {len(lexicon.matcher)} patterns for {len(lexicon.emotions)} emotions "
+          f"into {path} ({os.path.getsize(path)} bytes, version {lexicon.version})")
@@ -0,0 +1,46 @@
+"""
+Builds models/data/sentiment_lexicon.tsv, the lexicon used by
+models/sentiment_lexicon.py, from the English subjectivity lexicon that
+ships with TextBlob (pattern's en-sentiment.xml, PDDL licensed).
+
+Only needed when refreshing the data file; the app itself does not import
+TextBlob. Run from Adaptive_AI_Deployment:
+    python models/build_sentiment_lexicon.py
+"""
+
+import os
+
+OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "data", "sentiment_lexicon.tsv")
+
+
+def build_lexicon():
+    from textblob.en import sentiment
+    from textblob._text import EMOTICONS
+
+    sentiment.load()
+
+    rows = {}
+    for word, senses in dict.items(sentiment):
+        # Multi-word forms and contractions can never match a single token
+        if " " in word or "'" in word:
+            continue
+        polarity, _, intensity = senses[None]
+        modifier = 1 if "RB" in senses else 0
+        rows[word] = (polarity, intensity, modifier)
+
+    for (_, polarity), emoticons in EMOTICONS.items():
+        for emoticon in emoticons:
+            rows.setdefault(emoticon.lower(), (polarity, 1.0, 0))
+
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, "w", encoding="utf-8", newline="\n") as f:
+        f.write("# Derived from pattern's en-sentiment.xml (PDDL) via models/build_sentiment_lexicon.py\n")
+        f.write("# word\tpolarity\tintensity\tmodifier\n")
+        for word, (polarity, intensity, modifier) in sorted(rows.items()):
+            f.write(f"{word}\t{polarity:.4g}\t{intensity:.4g}\t{modifier}\n")
+
+    print(f"Wrote {len(rows)} entries to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    build_lexicon()
@@ -0,0 +1,214 @@
+"""
+Background camera capture for the server-side webcam.
+
+Opening a V4L2 device takes hundreds of milliseconds and the first frames
+after opening are often dark while auto-exposure settles, so the device is
+not opened per request. A daemon thread keeps it open, reads continuously
+and keeps the newest frames in a small ring buffer; callers take the newest
+frame without waiting on the device.
+
+The thread is started lazily on the first request (and again after a fork,
+like JobQueue), reconnects when the device drops out, and releases the
+device after CAMERA_IDLE_TIMEOUT seconds without a request.
+Only one process can usually hold a webcam, so this is meant for local runs
+with a single backend worker; production clients upload frames instead.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+
+# Device index (e.g. 0) or a video file / stream URL
+CAMERA_SOURCE = os.environ.get("CAMERA_SOURCE", "0")
+CAMERA_BUFFER_FRAMES = int(os.environ.get("CAMERA_BUFFER_FRAMES", 4))
+# Seconds without a request before the device is released
+CAMERA_IDLE_TIMEOUT = float(os.environ.get("CAMERA_IDLE_TIMEOUT", 30))
+# Frames discarded after opening while exposure settles
+CAMERA_WARMUP_FRAMES = int(os.environ.get("CAMERA_WARMUP_FRAMES", 5))
+# How long the first request after a (re)start waits for a frame
+CAMERA_FIRST_FRAME_TIMEOUT = float(os.environ.get("CAMERA_FIRST_FRAME_TIMEOUT", 2.0))
+# Frames older than this are not returned (the device has stalled)
+CAMERA_MAX_FRAME_AGE = float(os.environ.get("CAMERA_MAX_FRAME_AGE", 1.0))
+CAMERA_RECONNECT_DELAY = float(os.environ.get("CAMERA_RECONNECT_DELAY", 0.5))
+CAMERA_MAX_RECONNECT_DELAY = 5.0
+
+
+def _parse_source(source):
+    return int(source) if isinstance(source, str) and source.isdigit() else source
+
+
+class CameraCapture:
+    """
+    Keeps a capture device open in a daemon thread and buffers its newest frames.
+    Frames are BGR arrays as returned by cv2.VideoCapture.read(); each read
+    allocates a new array, so callers may use a returned frame freely but
+    must not draw on it in place.
+    """
+
+    def __init__(self, source=CAMERA_SOURCE, buffer_frames=CAMERA_BUFFER_FRAMES,
+                 idle_timeout=CAMERA_IDLE_TIMEOUT, warmup_frames=CAMERA_WARMUP_FRAMES,
+                 reconnect_delay=CAMERA_RECONNECT_DELAY):
+        """
+        Args:
+            source: Device index or video path/URL (digit strings are indexes).
+            buffer_frames: Size of the ring buffer of recent frames.
+            idle_timeout: Seconds without a request before the device is released.
+            warmup_frames: Frames dropped after each (re)open.
+            reconnect_delay: Seconds before the first reconnect attempt (doubles up to 5s).
+        """
+        self.source = _parse_source(source)
+        self.idle_timeout = idle_timeout
+        self.warmup_frames = warmup_frames
+        self.reconnect_delay = reconnect_delay
+
+        self._frames = deque(maxlen=max(1, buffer_frames))  # (timestamp, frame)
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._thread = None
+        self._pid = None
+        self._last_request = 0.0
+        self._stop = threading.Event()
+
+        self.opened = False
+        self.frames_read = 0
+        self.reconnects = 0
+
+    def _ensure_started(self):
+        """Start the capture thread for this process if it is not running."""
+        with self._lock:
+            self._last_request = time.monotonic()
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            # A thread from a parent process does not survive fork; start fresh.
+            self._frames.clear()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _open(self):
+        cam = cv2.VideoCapture(self.source)
+        if not cam.isOpened():
+            cam.release()
+            return None
+        # Keep the driver queue short so reads return current frames
+        cam.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        for _ in range(self.warmup_frames):
+            cam.grab()
+        return cam
+
+    def _run(self):
+        cam = None
+        delay = self.reconnect_delay
+        try:
+            while not self._stop.is_set():
+                with self._lock:
+                    if time.monotonic() - self._last_request > self.idle_timeout:
+                        # Checked under the lock so a concurrent request starts a new thread
+                        self._thread = None
+                        self._frames.clear()
+                        break
+
+                if cam is None:
+                    cam = self._open()
+                    if cam is None:
+                        print(f"Warning: Camera {self.source!r} could not be opened, retrying in {delay:.1f}s.")
+                        self._stop.wait(delay)
+                        delay = min(delay * 2, CAMERA_MAX_RECONNECT_DELAY)
+                        continue
+                    self.opened = True
+                    delay = self.reconnect_delay
+
+                ret, frame = cam.read()
+                if not ret or frame is None:
+                    print(f"Warning: Camera read failed, reconnecting in {delay:.1f}s.")
+                    cam.release()
+                    cam = None
+                    self.opened = False
+                    self.reconnects += 1
+                    self._stop.wait(delay)
+                    continue
+
+                with self._new_frame:
+                    self._frames.append((time.monotonic(), frame))
+                    self.frames_read += 1
+                    self._new_frame.notify_all()
+        except Exception as e:
+            print(f"Camera capture error: {e}")
+        finally:
+            if cam is not None:
+                cam.release()
+            self.opened = False
+
+    def latest(self, timeout=CAMERA_FIRST_FRAME_TIMEOUT, max_age=CAMERA_MAX_FRAME_AGE):
+        """
+        Return the newest frame, or None if the camera has none to give.
+        Only waits (up to timeout) when no recent frame is buffered, i.e. on
+        the first request after the device was opened.
+        """
+        self._ensure_started()
+        deadline = time.monotonic() + timeout
+        with self._new_frame:
+            while True:
+                if self._frames:
+                    timestamp, frame = self._frames[-1]
+                    if time.monotonic() - timestamp <= max_age:
+                        return frame
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._new_frame.wait(remaining)
+
+    def collect(self, count, timeout=5.0):
+        """
+        Wait for the next count frames read from the device and return them as
+        (timestamp, frame) pairs, oldest first. Returns fewer if the device
+        does not deliver them within timeout.
+        """
+        self._ensure_started()
+        deadline = time.monotonic() + timeout
+        frames = []
+        with self._new_frame:
+            seen = self.frames_read
+            while len(frames) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._new_frame.wait(remaining)
+                if self.frames_read != seen and self._frames:
+                    seen = self.frames_read
+                    frames.append(self._frames[-1])
+                self._last_request = time.monotonic()
+        return frames
+
+    def recent(self, count=None):
+        """The buffered frames, oldest first (at most count)."""
+        with self._lock:
+            frames = [frame for _, frame in self._frames]
+        return frames[-count:] if count else frames
+
+    def stop(self, timeout=2.0):
+        """Stop the thread and release the device (shutdown hook)."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and self._pid == os.getpid():
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def stats(self):
+        return {
+            "source": self.source,
+            "running": self._pid == os.getpid() and self._thread is not None and self._thread.is_alive(),
+            "opened": self.opened,
+            "buffered": len(self._frames),
+            "frames_read": self.frames_read,
+            "reconnects": self.reconnects,
+        }
+
+
+# Shared capture service used by detect_face_emotion
+camera = CameraCapture()
@@ -1,41 +1,97 @@
+import os
+import threading
+import time
 import cv2
 import mediapipe as mp
 import base64
 import numpy as np
-from fer.fer import FER
 
-# Initialize the detector once outside the function for better performance
-detector = FER(mtcnn=False) 
+from models.camera_capture import camera
+from models.face_geometry import landmarks_to_array, compute_face_features, overlay_pixels, face_box
+from models.face_classifier import load_classifier, crop_face, scores_to_dict, TFLITE_MODEL_PATH
+
+# "fer" (FER's Keras model) or "tflite" (int8 export, models/export_emotion_model.py)
+FACE_CLASSIFIER = os.environ.get("FACE_CLASSIFIER", "fer")
+FACE_CLASSIFIER_MODEL = os.environ.get("FACE_CLASSIFIER_MODEL", TFLITE_MODEL_PATH)
+FACE_CLASSIFIER_THREADS = int(os.environ.get("FACE_CLASSIFIER_THREADS", 1))
+
+# Initialize the classifier once outside the function for better performance.
+# Under gunicorn (preload_app) this runs in the master, so the model weights are
+# shared copy-on-write by every forked worker.
+# FaceMesh finds the face; its crop goes straight to the classifier,
+# so FER's own Haar-cascade detector is not run per frame.
+classifier = load_classifier(FACE_CLASSIFIER, FACE_CLASSIFIER_MODEL, FACE_CLASSIFIER_THREADS)
 
 # Initialize MediaPipe Face Mesh
 mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(
-    static_image_mode=False,
-    max_num_faces=1,
-    refine_landmarks=True,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
-)
 mp_drawing = mp.solutions.drawing_utils
 mp_drawing_styles = mp.solutions.drawing_styles
 
-def calculate_ear(landmarks, indices):
-    """Calculates Eye Aspect Ratio (EAR) for a given eye."""
-    # Vertical distances
-    A = np.linalg.norm(np.array([landmarks[indices[1]].x, landmarks[indices[1]].y]) - 
-                       np.array([landmarks[indices[5]].x, landmarks[indices[5]].y]))
-    B = np.linalg.norm(np.array([landmarks[indices[2]].x, landmarks[indices[2]].y]) - 
-                       np.array([landmarks[indices[4]].x, landmarks[indices[4]].y]))
-    # Horizontal distance
-    C = np.linalg.norm(np.array([landmarks[indices[0]].x, landmarks[indices[0]].y]) - 
-                       np.array([landmarks[indices[3]].x, landmarks[indices[3]].y]))
-    
-    if C == 0:
-        return 0
-    return (A + B) / (2.0 * C)
+# --- RENDERING OPTIONS ---
+# What to send back with each analysis (per request via render_options):
+#   full      - the frame with the mesh/golden-ratio overlay, encoded and base64'd
+#   landmarks - only the normalized landmark coordinates; the client draws them
+#   none      - nothing (the cheapest; for clients that never show the frame)
+RENDER_MODES = ("full", "landmarks", "none")
+IMAGE_FORMATS = {"jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY), "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY)}
+FACE_RENDER = os.environ.get("FACE_RENDER", "full")
+# Size of the rendered frame relative to the analyzed frame (0.1 - 1.0)
+FACE_RENDER_SCALE = float(os.environ.get("FACE_RENDER_SCALE", 1.0))
+FACE_IMAGE_FORMAT = os.environ.get("FACE_IMAGE_FORMAT", "jpeg")
+FACE_IMAGE_QUALITY = int(os.environ.get("FACE_IMAGE_QUALITY", 95))
+
+# --- PRE-SCREEN ---
+# Cheap checks before FaceMesh and the classifier: frames that could never give
+# a label (black, blown out, blurred beyond recognition) are rejected at once,
+# and large frames are downscaled, since FaceMesh resizes its input to a few
+# hundred pixels anyway. The checks run on a ~120px grayscale thumbnail.
+FACE_PRESCREEN = os.environ.get("FACE_PRESCREEN", "1").lower() in ("1", "true", "yes", "on")
+# Mean luminance (0-255) of a usable frame
+FACE_MIN_BRIGHTNESS = float(os.environ.get("FACE_MIN_BRIGHTNESS", 25))
+FACE_MAX_BRIGHTNESS = float(os.environ.get("FACE_MAX_BRIGHTNESS", 235))
+# Laplacian variance of the thumbnail; sharp webcam frames score in the hundreds or more
+FACE_MIN_SHARPNESS = float(os.environ.get("FACE_MIN_SHARPNESS", 30))
+# Server camera only: mean absolute thumbnail change (0-255) below which the
+# previous result is reused instead of analyzing again (0 = off)
+FACE_MIN_MOTION = float(os.environ.get("FACE_MIN_MOTION", 0))
+# Frames are downscaled to this short side before detection (0 = off)
+FACE_TARGET_SHORT_SIDE = int(os.environ.get("FACE_TARGET_SHORT_SIDE", 480))
+THUMBNAIL_SHORT_SIDE = 120
 
-def draw_golden_ratio_lines(image, landmarks):
-    """Draws aesthetic golden ratio lines on the face."""
+# The FaceMesh graph starts its own calculator threads, which do not survive a
+# fork. It is therefore created lazily and rebuilt once per process.
+# Single frames come from unrelated requests, so this mesh runs in static image
+# mode (detection on every frame); tracking between consecutive frames is done
+# per sequence in models/face_video.py.
+# A MediaPipe graph is not thread-safe (concurrent process() calls mix up its
+# packet timestamps and can crash the process), and request threads share this
+# mesh, so calls go through run_face_mesh(), which serializes them. Parallel
+# analysis across cores is the job of the face worker pool (FACE_WORKERS).
+_face_mesh = None
+_face_mesh_pid = None
+_face_mesh_lock = threading.Lock()
+
+def get_face_mesh():
+    """Return the FaceMesh instance for the current process (use it under _face_mesh_lock)."""
+    global _face_mesh, _face_mesh_pid
+    if _face_mesh is None or _face_mesh_pid != os.getpid():
+        _face_mesh = mp_face_mesh.FaceMesh(
+            static_image_mode=True,
+            max_num_faces=1,
+            refine_landmarks=True,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        _face_mesh_pid = os.getpid()
+    return _face_mesh
+
+def run_face_mesh(rgb_image):
+    """Run the process-wide FaceMesh on an RGB frame, one thread at a time."""
+    with _face_mesh_lock:
+        return get_face_mesh().process(rgb_image)
+
+def draw_golden_ratio_lines(image, landmark_points):
+    """Draws aesthetic golden ratio lines on the face (landmark_points: (N, 3) array)."""
     h, w, c = image.shape
     
     # Key landmarks for Golden Ratio (approximate indices)
@@ -44,11 +100,8 @@ def draw_golden_ratio_lines(image, landmarks):
     # Left Eye Center: 468
     # Right Eye Center: 473
     # Forehead Center: 10
-    
-    points = {}
-    for idx in [1, 152, 468, 473, 10, 234, 454]: # 234: Left cheek, 454: Right cheek
-        lm = landmarks[idx]
-        points[idx] = (int(lm.x * w), int(lm.y * h))
+    # 234: Left cheek, 454: Right cheek
+    points = overlay_pixels(landmark_points, w, h)
 
     # Color: Gold (BGR) -> (0, 215, 255) in BGR is Gold-ish
     gold_color = (0, 215, 255)
@@ -72,134 +125,273 @@ def draw_golden_ratio_lines(image, landmarks):
     for idx in points:
         cv2.circle(image, points[idx], 3, (0, 255, 0), -1) # Green dots for key points
 
-def detect_face_emotion():
+def draw_face_overlay(image, face_landmarks, points):
+    """Draws the mesh contours and golden ratio lines for one face."""
+    # Define custom styles for "High-Tech" look (Cyan: BGR 255, 255, 0)
+    # Connections: Thin cyan lines
+    connection_spec = mp_drawing.DrawingSpec(color=(255, 255, 0), thickness=1, circle_radius=1)
+    # Landmarks: Small cyan dots
+    landmark_spec = mp_drawing.DrawingSpec(color=(255, 255, 0), thickness=1, circle_radius=1)
+
+    # Draw Contours (Cleaner look than Tessellation)
+    mp_drawing.draw_landmarks(
+        image=image,
+        landmark_list=face_landmarks,
+        connections=mp_face_mesh.FACEMESH_CONTOURS,
+        landmark_drawing_spec=landmark_spec,
+        connection_drawing_spec=connection_spec
+    )
+    
+    # Draw Golden Ratio lines
+    draw_golden_ratio_lines(image, points)
+
+def render_options(params=None):
+    """
+    Rendering options from request parameters (any mapping: JSON body, form,
+    query args) over the FACE_RENDER* / FACE_IMAGE_* defaults.
+    Recognized keys: render, render_scale, image_format, image_quality.
+    Invalid values fall back to the defaults.
+    """
+    params = params or {}
+    mode = str(params.get("render") or FACE_RENDER).lower()
+    image_format = str(params.get("image_format") or FACE_IMAGE_FORMAT).lower()
+    try:
+        scale = float(params.get("render_scale") or FACE_RENDER_SCALE)
+    except (TypeError, ValueError):
+        scale = FACE_RENDER_SCALE
+    try:
+        quality = int(params.get("image_quality") or FACE_IMAGE_QUALITY)
+    except (TypeError, ValueError):
+        quality = FACE_IMAGE_QUALITY
+    return {
+        "mode": mode if mode in RENDER_MODES else FACE_RENDER,
+        "scale": min(max(scale, 0.1), 1.0),
+        "format": image_format if image_format in IMAGE_FORMATS else FACE_IMAGE_FORMAT,
+        "quality": min(max(quality, 1), 100),
+    }
+
+def encode_frame(image, image_format="jpeg", quality=FACE_IMAGE_QUALITY):
+    """Encodes a BGR image as base64 JPEG or WebP."""
+    extension, quality_flag = IMAGE_FORMATS[image_format]
+    ok, buffer = cv2.imencode(extension, image, [quality_flag, quality])
+    return base64.b64encode(buffer).decode('utf-8') if ok else None
+
+def classify_face(frame, points):
+    """Emotion scores for the face at the given landmarks ({} if it cannot be cropped)."""
+    h, w = frame.shape[:2]
+    crop = crop_face(frame, face_box(points, w, h), classifier.input_size)
+    if crop is None:
+        return {}
+    return scores_to_dict(classifier.classify(crop[None])[0])
+
+def describe_face_features(ear, mar, brow_ratio):
+    """Plain-language notes on the geometric features (a list of sentences)."""
+    parts = []
+
+    # EAR (Eye Aspect Ratio) - Drowsiness / Alertness
+    if ear < 0.2:
+        parts.append("Eyes appear tired or closed.")
+    elif ear > 0.35:
+        parts.append("Eyes are wide open (alert/surprise).")
+
+    # MAR (Mouth Aspect Ratio) - Smiling / Yawning
+    if mar > 0.5:
+        parts.append("Mouth is wide open (yawning/surprise).")
+    elif mar < 0.1:
+        parts.append("Mouth is tightly closed (tension).")
+
+    # Brow Ratio (Stress/Frowning)
+    if brow_ratio < 0.6: # Approximate threshold
+        parts.append("Brows are furrowed (stress/focus).")
+    return parts
+
+def _shrink(frame, factor):
+    """Integer-factor INTER_AREA downscale (OpenCV's fast path needs an exact ratio, so edge pixels are cropped)."""
+    h, w = frame.shape[:2]
+    h, w = h - h % factor, w - w % factor
+    return cv2.resize(frame[:h, :w], (w // factor, h // factor), interpolation=cv2.INTER_AREA)
+
+def downscale_frame(frame, short_side):
+    """Shrinks frame so its short side is at most short_side (returns frame itself if already small)."""
+    h, w = frame.shape[:2]
+    scale = short_side / float(min(h, w))
+    if short_side <= 0 or scale >= 1.0:
+        return frame
+    # INTER_AREA is only fast for integer factors: take those with it, the rest bilinearly
+    factor = int(1.0 / scale)
+    if factor >= 2:
+        frame = _shrink(frame, factor)
+    return cv2.resize(frame, (max(int(round(w * scale)), 1), max(int(round(h * scale)), 1)),
+                      interpolation=cv2.INTER_LINEAR)
+
+def frame_thumbnail(frame):
+    """Small grayscale copy for the pre-screen checks (short side 120-240px)."""
+    h, w = frame.shape[:2]
+    factor = max(min(h, w) // THUMBNAIL_SHORT_SIDE, 1)
+    if factor > 1:
+        frame = _shrink(frame, factor)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+def prescreen_frame(frame):
+    """
+    Returns (frame to analyze, None), downscaled to FACE_TARGET_SHORT_SIDE, or
+    (None, reason) if the frame is too dark, overexposed or too blurry to use.
+    """
+    frame = downscale_frame(frame, FACE_TARGET_SHORT_SIDE)
+    thumbnail = frame_thumbnail(frame)
+    brightness = float(thumbnail.mean())
+    if brightness < FACE_MIN_BRIGHTNESS:
+        return None, "too dark"
+    if brightness > FACE_MAX_BRIGHTNESS:
+        return None, "overexposed"
+    if FACE_MIN_SHARPNESS > 0 and float(cv2.Laplacian(thumbnail, cv2.CV_32F).var()) < FACE_MIN_SHARPNESS:
+        return None, "too blurry"
+    return frame, None
+
+def decode_frame(data):
+    """
+    Decodes uploaded JPEG/PNG bytes into a BGR frame.
+    np.frombuffer wraps the request buffer without copying it, so the only
+    allocation is the decoded image. Returns None if the bytes are not an image.
+    """
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def detect_face_emotion(render=None, analyze=None):
     """
     Real-world face emotion detection using FER library.
     Returns the dominant emotion and the processed frame (base64).
+    render: options from render_options() (defaults if None).
+    analyze: function run on the frame, e.g. face_workers.analyze_face
+        (analyze_face_frame in this thread if None).
+    The frame is the newest one from the background capture thread
+    (models/camera_capture.py), so the device is not reopened per call.
+    With FACE_MIN_MOTION > 0 a frame that barely differs from the last analyzed
+    one is not rejected: the last result is returned again (same overlay, same
+    label) without running the analysis.
     """
-    cam = None
-    processed_frame_b64 = None
-    
+    global _last_camera
     try:
-        # Open camera (index 0 is usually the default)
-        cam = cv2.VideoCapture(0)
+        frame = camera.latest()
 
-        if not cam.isOpened():
-            print("Warning: Camera could not be opened.")
-            return "Neutral", {}, None, {}, "Camera not opened"
-
-        # Capture a single frame
-        ret, frame = cam.read()
-        
-        if not ret or frame is None:
+        if frame is None:
+            if not camera.opened:
+                print("Warning: Camera could not be opened.")
+                return "Neutral", {}, None, {}, "Camera not opened"
             print("Warning: Failed to capture image from camera.")
             return "Neutral", {}, None, {}, "Frame capture failed"
-            
-        # Flip frame horizontally for a mirror effect
-        frame = cv2.flip(frame, 1)
 
-        # 1. Detect Emotions first (FER)
-        results = detector.detect_emotions(frame)
-        dominant_emotion = "Neutral"
-        emotions_score = {}
+    except Exception as e:
+        print("Camera capture error:", e)
+        return "Neutral", {}, None, {}, "Frame capture failed"
+
+    # The camera sees the same scene between most requests: reuse the last
+    # result while the picture has not changed (FACE_MIN_MOTION > 0)
+    thumbnail = None
+    if FACE_PRESCREEN and FACE_MIN_MOTION > 0:
+        thumbnail = frame_thumbnail(frame)
+        with _last_camera_lock:
+            last_thumbnail, last_render, last_result = _last_camera
+        if (last_thumbnail is not None and last_thumbnail.shape == thumbnail.shape and last_render == render
+                and float(cv2.absdiff(thumbnail, last_thumbnail).mean()) < FACE_MIN_MOTION):
+            return last_result
 
-        if results:
-            emotions_score = results[0]["emotions"]
-            dominant_emotion = max(emotions_score, key=emotions_score.get).capitalize()
+    # Flip frame horizontally for a mirror effect
+    result = (analyze or analyze_face_frame)(cv2.flip(frame, 1), render)
+    if thumbnail is not None:
+        with _last_camera_lock:
+            _last_camera = (thumbnail, render, result)
+    return result
+
+# (thumbnail, render options, result) of the last analyzed camera frame,
+# read and replaced by concurrent request threads under _last_camera_lock
+_last_camera = (None, None, None)
+_last_camera_lock = threading.Lock()
+
+def _lap(timings, stage, start):
+    """Adds the seconds since start to timings[stage] (if timings is a dict); returns now."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + now - start
+    return now
+
+def analyze_face_frame(frame, render=None, timings=None):
+    """
+    Face emotion analysis of one BGR frame, from the camera or uploaded by a client.
+    render: options from render_options() (defaults if None). In "full" mode at
+    scale 1 the overlay is drawn onto the frame in place (unless the pre-screen
+    downscaled it). In "landmarks" mode
+    face_features["landmarks"] holds the normalized [x, y] of every landmark.
+    timings: optional dict that receives the seconds spent per stage
+    (prescreen, mesh, landmarks, classify, features, render, encode), for benchmark_face.py.
+    Frames rejected by the pre-screen return at once with a "No usable frame" description.
+    Returns the same tuple as detect_face_emotion().
+    """
+    processed_frame_b64 = None
+    render = render or render_options()
+    
+    try:
+        lap = time.perf_counter()
+        if FACE_PRESCREEN:
+            frame, reason = prescreen_frame(frame)
+            lap = _lap(timings, "prescreen", lap)
+            if frame is None:
+                return "Neutral", {}, None, {}, f"No usable frame ({reason})."
 
-        # 2. Process Face Mesh (MediaPipe)
+        # 1. Process Face Mesh (MediaPipe) - the only face detector per frame
         # Convert the BGR image to RGB
         rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results_mesh = face_mesh.process(rgb_image)
+        results_mesh = run_face_mesh(rgb_image)
+        lap = _lap(timings, "mesh", lap)
 
+        dominant_emotion = "Neutral"
+        emotions_score = {}
         face_features = {}
         feature_desc_parts = []
 
+        # The overlay is drawn on a (possibly downscaled) canvas, only if it is sent back
+        canvas = None
+        if render["mode"] == "full":
+            canvas = frame
+            if render["scale"] < 1.0:
+                canvas = cv2.resize(frame, None, fx=render["scale"], fy=render["scale"], interpolation=cv2.INTER_AREA)
+            lap = _lap(timings, "render", lap)
+
         # Draw mesh and golden ratio lines, and calculate features
         if results_mesh.multi_face_landmarks:
             for face_landmarks in results_mesh.multi_face_landmarks:
-                landmarks = face_landmarks.landmark
-                
-                # Define custom styles for "High-Tech" look (Cyan: BGR 255, 255, 0)
-                # Connections: Thin cyan lines
-                connection_spec = mp_drawing.DrawingSpec(color=(255, 255, 0), thickness=1, circle_radius=1)
-                # Landmarks: Small cyan dots
-                landmark_spec = mp_drawing.DrawingSpec(color=(255, 255, 0), thickness=1, circle_radius=1)
-
-                # Draw Contours (Cleaner look than Tessellation)
-                mp_drawing.draw_landmarks(
-                    image=frame,
-                    landmark_list=face_landmarks,
-                    connections=mp_face_mesh.FACEMESH_CONTOURS,
-                    landmark_drawing_spec=landmark_spec,
-                    connection_drawing_spec=connection_spec
-                )
-                
-                # Draw Golden Ratio lines
-                draw_golden_ratio_lines(frame, landmarks)
-                
-                # Calculate Geometric Features
-                
-                # EAR (Eye Aspect Ratio) - Drowsiness / Alertness
-                # Left Eye indices: 33, 160, 158, 133, 153, 144
-                # Right Eye indices: 362, 385, 387, 263, 373, 380
-                left_ear = calculate_ear(landmarks, [33, 160, 158, 133, 153, 144])
-                right_ear = calculate_ear(landmarks, [362, 385, 387, 263, 373, 380])
-                avg_ear = (left_ear + right_ear) / 2.0
-                face_features['ear'] = avg_ear
+                # One (N, 3) array per face; all geometry below indexes into it
+                points = landmarks_to_array(face_landmarks)
+                lap = _lap(timings, "landmarks", lap)
                 
-                if avg_ear < 0.2:
-                    feature_desc_parts.append("Eyes appear tired or closed.")
-                elif avg_ear > 0.35:
-                     feature_desc_parts.append("Eyes are wide open (alert/surprise).")
-                     
-                # MAR (Mouth Aspect Ratio) - Smiling / Yawning
-                # Mouth indices: 78, 81, 13, 311, 308, 402, 14, 178
-                # We can use a simplified version: (upper_lip_top, lower_lip_bottom, left_corner, right_corner)
-                # Vertical: 13 (upper), 14 (lower). Horizontal: 61 (left corner), 291 (right corner).
-                # Actually, let's use a robust set:
-                # Top: 13, Bottom: 14, Left: 61, Right: 291
-                # Vertical dist = dist(13, 14)
-                # Horizontal dist = dist(61, 291)
+                # 2. Detect Emotions (FER classifier) on the landmark box,
+                # before anything is drawn onto the frame
+                if not emotions_score:
+                    emotions_score = classify_face(frame, points)
+                    if emotions_score:
+                        dominant_emotion = max(emotions_score, key=emotions_score.get).capitalize()
+                    lap = _lap(timings, "classify", lap)
                 
-                top_lip = landmarks[13]
-                bottom_lip = landmarks[14]
-                left_corner = landmarks[61]
-                right_corner = landmarks[291]
+                if canvas is not None:
+                    draw_face_overlay(canvas, face_landmarks, points)
+                elif render["mode"] == "landmarks" and "landmarks" not in face_features:
+                    face_features["landmarks"] = points[:, :2].astype(np.float64).round(4).tolist()
+                lap = _lap(timings, "render", lap)
                 
-                mar_vertical = np.linalg.norm(np.array([top_lip.x, top_lip.y]) - np.array([bottom_lip.x, bottom_lip.y]))
-                mar_horizontal = np.linalg.norm(np.array([left_corner.x, left_corner.y]) - np.array([right_corner.x, right_corner.y]))
-                
-                mar = mar_vertical / mar_horizontal if mar_horizontal > 0 else 0
+                # Calculate Geometric Features (see models/face_geometry.py)
+                features = compute_face_features(points)
+                ear, mar, brow_ratio = float(features["ear"]), float(features["mar"]), float(features["brow_ratio"])
+                face_features['ear'] = ear
                 face_features['mar'] = mar
-                
-                if mar > 0.5:
-                    feature_desc_parts.append("Mouth is wide open (yawning/surprise).")
-                elif mar < 0.1:
-                    feature_desc_parts.append("Mouth is tightly closed (tension).")
-                    
-                # Brow Ratio (Stress/Frowning)
-                # Distance between brows vs face width? or just distance between brow centers.
-                # Left brow inner: 107. Right brow inner: 336.
-                # Normalize by inner eye distance (dist 133 to 362) to be scale invariant.
-                
-                brow_inner_L = landmarks[107]
-                brow_inner_R = landmarks[336]
-                eye_inner_L = landmarks[133]
-                eye_inner_R = landmarks[362]
-                
-                brow_dist = np.linalg.norm(np.array([brow_inner_L.x, brow_inner_L.y]) - np.array([brow_inner_R.x, brow_inner_R.y]))
-                eye_dist = np.linalg.norm(np.array([eye_inner_L.x, eye_inner_L.y]) - np.array([eye_inner_R.x, eye_inner_R.y]))
-                
-                brow_ratio = brow_dist / eye_dist if eye_dist > 0 else 0
                 face_features['brow_ratio'] = brow_ratio
-                
-                if brow_ratio < 0.6: # Approximate threshold
-                     feature_desc_parts.append("Brows are furrowed (stress/focus).")
+                feature_desc_parts.extend(describe_face_features(ear, mar, brow_ratio))
+                lap = _lap(timings, "features", lap)
 
         # 3. Encode Frame to Base64
-        _, buffer = cv2.imencode('.jpg', frame)
-        processed_frame_b64 = base64.b64encode(buffer).decode('utf-8')
+        if canvas is not None:
+            processed_frame_b64 = encode_frame(canvas, render["format"], render["quality"])
+            lap = _lap(timings, "encode", lap)
         
         # Construct description
         feature_desc = " ".join(feature_desc_parts) if feature_desc_parts else "Neutral facial expression."
@@ -209,10 +401,6 @@ def detect_face_emotion():
     except Exception as e:
         print("Face emotion analysis error:", e)
         return "Neutral", {}, None, {}, "Error in analysis."
-    
-    finally:
-        if cam is not None:
-            cam.release()
 
 if __name__ == "__main__":
     # Test script
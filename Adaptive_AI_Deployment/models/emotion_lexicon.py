@@ -0,0 +1,217 @@
+"""
+The emotion lexicon: source data, compiled form and hot reloading.
+
+The keyword lists live in models/data/emotion_lexicon.json so they can be
+tuned without a code change. A build step compiles them into a binary
+matcher artifact (models/data/emotion_lexicon.bin, see text_matcher.py)
+that each worker memory-maps. LexiconWatcher polls both files and swaps in
+a freshly compiled lexicon when either changes, without a restart.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from scipy import sparse
+
+from models.text_matcher import TokenMatcher, MappedTokenMatcher, save_matcher
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+LEXICON_SOURCE_PATH = os.environ.get("EMOTION_LEXICON_PATH", os.path.join(DATA_DIR, "emotion_lexicon.json"))
+LEXICON_ARTIFACT_PATH = os.environ.get("EMOTION_LEXICON_ARTIFACT", os.path.join(DATA_DIR, "emotion_lexicon.bin"))
+# Seconds between file checks; 0 disables the watcher
+LEXICON_WATCH_INTERVAL = float(os.environ.get("LEXICON_WATCH_INTERVAL", 5))
+
+# Score contributed by each distinct match
+KEYWORD_WEIGHT = 1
+PHRASE_WEIGHT = 2
+
+
+def load_source(path=LEXICON_SOURCE_PATH):
+    """Read the lexicon JSON. Returns (emotion_keywords, intensity_high, intensity_low)."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["emotions"], data.get("intensity_high", []), data.get("intensity_low", [])
+
+
+def lexicon_version(emotion_keywords, intensity_high, intensity_low):
+    """Content hash; part of every cache key so results never outlive their lexicon."""
+    source = json.dumps([emotion_keywords, intensity_high, intensity_low], sort_keys=True)
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+
+
+def lexicon_entries(emotion_keywords, intensity_high, intensity_low):
+    """(pattern, payload) pairs for the matcher."""
+    entries = []
+    for emotion, patterns in emotion_keywords.items():
+        for keyword in patterns["keywords"]:
+            entries.append((keyword, ("emotion", emotion, KEYWORD_WEIGHT)))
+        for phrase in patterns.get("phrases", []):
+            entries.append((phrase, ("emotion", emotion, PHRASE_WEIGHT)))
+    for intensifier in intensity_high:
+        entries.append((intensifier, ("intensity", "high", 0)))
+    for reducer in intensity_low:
+        entries.append((reducer, ("intensity", "low", 0)))
+    return entries
+
+
+class CompiledLexicon:
+    """
+    The emotion lexicon compiled into a single matcher.
+    Payloads are ("emotion", label, weight) or ("intensity", level, 0).
+    Built once at import; replaced as a whole (never mutated) when the
+    lexicon changes, so concurrent readers always see a consistent version.
+    """
+
+    def __init__(self, emotion_keywords, intensity_high, intensity_low, matcher=None):
+        """
+        Args:
+            matcher: A prebuilt (e.g. memory-mapped) matcher for these lists.
+                Compiled in memory when omitted.
+        """
+        self.emotions = list(emotion_keywords)
+        self.version = lexicon_version(emotion_keywords, intensity_high, intensity_low)
+        self.matcher = matcher or TokenMatcher(lexicon_entries(emotion_keywords, intensity_high, intensity_low))
+
+        # Matrix form of the payloads for batch scoring:
+        # emotion_weights[p, e] = weight pattern p adds to emotion e
+        # intensity_flags[p, 0/1] = pattern p is a high/low intensifier
+        emotion_index = {emotion: i for i, emotion in enumerate(self.emotions)}
+        weights = sparse.lil_matrix((len(self.matcher), len(self.emotions)))
+        flags = sparse.lil_matrix((len(self.matcher), 2))
+        for pattern_id, payloads in enumerate(self.matcher.payloads):
+            for kind, value, weight in payloads:
+                if kind == "emotion":
+                    weights[pattern_id, emotion_index[value]] += weight
+                else:
+                    flags[pattern_id, 0 if value == "high" else 1] = 1
+        self.emotion_weights = weights.tocsr()
+        self.intensity_flags = flags.tocsr()
+
+    def score(self, text):
+        """
+        Scan text once and return ({emotion: score}, intensity).
+        Each distinct keyword or phrase counts once, as before.
+        """
+        scores = {}
+        has_high = has_low = False
+        for pattern_id in self.matcher.match(text):
+            for kind, value, weight in self.matcher.payloads[pattern_id]:
+                if kind == "emotion":
+                    scores[value] = scores.get(value, 0) + weight
+                elif value == "high":
+                    has_high = True
+                else:
+                    has_low = True
+
+        intensity = "high" if has_high else "low" if has_low else "moderate"
+        return scores, intensity
+
+
+# --- ARTIFACT ---
+
+def build_artifact(source_path=LEXICON_SOURCE_PATH, artifact_path=LEXICON_ARTIFACT_PATH):
+    """Compile the JSON lexicon into the binary matcher artifact (atomic replace)."""
+    emotion_keywords, intensity_high, intensity_low = load_source(source_path)
+    matcher = TokenMatcher(lexicon_entries(emotion_keywords, intensity_high, intensity_low))
+    save_matcher(matcher, artifact_path, metadata={
+        "lexicon": {
+            "emotions": emotion_keywords,
+            "intensity_high": intensity_high,
+            "intensity_low": intensity_low,
+        },
+        "version": lexicon_version(emotion_keywords, intensity_high, intensity_low),
+    })
+    return artifact_path
+
+
+def load_artifact(artifact_path=LEXICON_ARTIFACT_PATH):
+    """Memory-map a built artifact as a CompiledLexicon."""
+    matcher = MappedTokenMatcher(artifact_path)
+    lexicon = matcher.metadata["lexicon"]
+    return CompiledLexicon(
+        lexicon["emotions"], lexicon["intensity_high"], lexicon["intensity_low"], matcher=matcher
+    )
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    except OSError:
+        return None
+
+
+def load_lexicon(source_path=LEXICON_SOURCE_PATH, artifact_path=LEXICON_ARTIFACT_PATH):
+    """
+    Return (CompiledLexicon, artifact stamp). Builds the artifact first if it
+    is missing or older than the JSON. If the artifact cannot be written or
+    mapped (e.g. read-only filesystem) the lexicon is compiled in memory.
+    """
+    try:
+        source_stamp, artifact_stamp = _file_stamp(source_path), _file_stamp(artifact_path)
+        if artifact_stamp is None or (source_stamp and source_stamp[0] > artifact_stamp[0]):
+            build_artifact(source_path, artifact_path)
+        stamp = _file_stamp(artifact_path)
+        return load_artifact(artifact_path), stamp
+    except Exception as e:
+        print(f"Lexicon artifact unavailable ({e}); compiling in memory.")
+        return CompiledLexicon(*load_source(source_path)), None
+
+
+class LexiconWatcher:
+    """
+    Polls the lexicon JSON and artifact and calls on_change(CompiledLexicon)
+    when either changes. An edited JSON is rebuilt into the artifact; other
+    workers then pick up the new artifact on their next poll.
+    The thread is started lazily (and again after a fork), like JobQueue.
+    """
+
+    def __init__(self, on_change, source_path=LEXICON_SOURCE_PATH, artifact_path=LEXICON_ARTIFACT_PATH,
+                 interval=LEXICON_WATCH_INTERVAL, artifact_stamp=None):
+        self.on_change = on_change
+        self.source_path = source_path
+        self.artifact_path = artifact_path
+        self.interval = interval
+        self._artifact_stamp = artifact_stamp
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def ensure_started(self):
+        if self.interval <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name="lexicon-watcher", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Lexicon reload failed: {e}")
+
+    def check(self, force=False):
+        """
+        Reload if the files changed (or always, with force).
+        Returns the new CompiledLexicon, or None if nothing changed.
+        """
+        with self._lock:
+            source_stamp, artifact_stamp = _file_stamp(self.source_path), _file_stamp(self.artifact_path)
+            stale = artifact_stamp is None or (source_stamp and source_stamp[0] > artifact_stamp[0])
+            if not (force or stale or artifact_stamp != self._artifact_stamp):
+                return None
+
+            if force or stale:
+                build_artifact(self.source_path, self.artifact_path)
+            self._artifact_stamp = _file_stamp(self.artifact_path)
+            lexicon = load_artifact(self.artifact_path)
+
+        self.on_change(lexicon)
+        print(f"Emotion lexicon reloaded (version {lexicon.version}).")
+        return lexicon
@@ -1,4 +1,57 @@
-from textblob import TextBlob
+import os
+
+import numpy as np
+from scipy import sparse
+
+from models.emotion_lexicon import CompiledLexicon, LexiconWatcher, load_lexicon, load_source
+from models.result_cache import text_cache, normalize_text, TEXT_CACHE_MAX_CHARS
+from models.sentiment_lexicon import polarity as sentiment_polarity
+
+# "keyword" (models/emotion_lexicon.py) or "ml" (models/text_emotion_ml.py, needs a trained artifact)
+TEXT_EMOTION_ENGINE = os.environ.get("TEXT_EMOTION_ENGINE", "keyword")
+# ML predictions below this probability defer to the keyword engine
+TEXT_ML_MIN_CONFIDENCE = float(os.environ.get("TEXT_ML_MIN_CONFIDENCE", 0.5))
+
+# Keyword lists as shipped in models/data/emotion_lexicon.json (read at import;
+# the live lexicon used for scoring is _LEXICON, which may be hot-reloaded)
+EMOTION_KEYWORDS, INTENSITY_HIGH, INTENSITY_LOW = load_source()
+
+_LEXICON, _artifact_stamp = load_lexicon()
+
+
+def _load_ml_model():
+    if TEXT_EMOTION_ENGINE != "ml":
+        return None
+    # Imported lazily so the keyword engine does not pull in scikit-learn
+    from models.text_emotion_ml import load_model
+    model = load_model()
+    if model is None:
+        print("Falling back to the keyword text emotion engine.")
+    return model
+
+
+_ML_MODEL = _load_ml_model()
+
+
+def set_lexicon(lexicon):
+    """Swap in a new CompiledLexicon and drop results cached under the old one."""
+    global _LEXICON
+    _LEXICON = lexicon
+    text_cache.clear()
+
+
+# Picks up edits to the lexicon JSON / artifact without a restart
+_watcher = LexiconWatcher(set_lexicon, artifact_stamp=_artifact_stamp)
+
+
+def reload_lexicon(force=True):
+    """
+    Rebuild and reload the lexicon now (admin trigger). With force=False only
+    reloads if the files changed. Returns the active lexicon version.
+    """
+    _watcher.check(force=force)
+    return _LEXICON.version
+
 
 def detect_text_emotion(text):
     """
@@ -7,90 +60,39 @@ def detect_text_emotion(text):
     Now detects granular emotions: Lonely, Anxious, Stressed, Sad, Happy, Angry, etc.
     """
 
+    _watcher.ensure_started()
     if not text:
         return [{"label": "Neutral", "confidence": 1.0}]
 
-    text_lower = text.lower()
-    
-    # Enhanced keyword-based emotion detection with intensity awareness
-    emotion_keywords = {
-        "Lonely": {
-            "keywords": ["lonely", "alone", "isolated", "nobody", "no one", "by myself", "solitude", "abandoned"],
-            "phrases": ["nobody cares", "feel invisible", "all by myself", "no friends", 
-                       "everyone left", "feel disconnected", "nobody understands", 
-                       "completely alone", "feel empty", "no one to talk to",
-                       "sitting alone", "eating alone", "always alone"]
-        },
-        "Anxious": {
-            "keywords": ["anxious", "worried", "nervous", "anxiety", "panic", "fear", "scared", "terrified", "afraid", "uneasy", "tense", "restless", "butterflies"],
-            "phrases": ["can't stop worrying", "feel panicked", "heart racing", "can't breathe", "on edge", "something bad might happen"]
-        },
-        "Stressed": {
-            "keywords": ["stressed", "overwhelmed", "pressure", "burden", "exhausted", "tired", "drained", "burnout", "hectic"],
-            "phrases": ["too much", "can't handle", "breaking point", "burned out", "too much to do", "running on fumes", "at my wit's end"]
-        },
-        "Sad": {
-            "keywords": ["sad", "depressed", "down", "unhappy", "miserable", "hopeless", "crying", "tears", "empty", "gloomy", "melancholy", "despair", "grief", "heartbroken"],
-            "phrases": ["feel like crying", "want to cry", "so sad", "really down", "feel empty", "lost hope", "don't want to do anything", "hard to get out of bed"]
-        },
-        "Angry": {
-            "keywords": ["angry", "mad", "furious", "irritated", "annoyed", "frustrated", "rage", "livid", "resentful", "bitter"],
-            "phrases": ["so angry", "pissed off", "fed up", "had enough", "can't stand it", "drives me crazy", "losing my temper"]
-        },
-        "Happy": {
-            "keywords": ["happy", "joy", "excited", "great", "wonderful", "amazing", "fantastic", "love", "blessed", "cheerful", "delighted", "optimistic"],
-            "phrases": ["feel great", "so happy", "best day", "feeling good", "on top of the world", "can't wait"]
-        },
-        "Grateful": {
-            "keywords": ["grateful", "thankful", "appreciate", "blessed", "fortunate", "lucky"],
-            "phrases": ["thank you", "so grateful", "appreciate it", "means a lot"]
-        },
-        "Worthless": {  # New Category for severe self-esteem issues
-            "keywords": ["worthless", "useless", "failure", "stupid", "idiot", "burden", "invisible"],
-            "phrases": ["hate myself", "can't do anything right", "waste of space", "nobody needs me", "better off without me"]
+    # Repeated short inputs are served from the shared result cache
+    normalized = normalize_text(text)
+    lexicon, model = _LEXICON, _ML_MODEL
+    if len(normalized) > TEXT_CACHE_MAX_CHARS:
+        return _score_text(normalized, lexicon, model)
+
+    version = (lexicon.version, model.version if model else None)
+    key = ("text_emotion", version, normalized)
+    result = text_cache.get_or_compute(key, lambda: _score_text(normalized, lexicon, model))
+    # Callers get their own copies of the cached dicts
+    return [dict(r) for r in result]
+
+
+def _score_text(text, lexicon, model=None):
+    """Uncached scoring behind detect_text_emotion."""
+    if model is not None:
+        return _score_texts_ml([text], lexicon, model)[0]
+
+    scores, intensity = lexicon.score(text)
+
+    # Keep lexicon order so ties resolve the same way as before
+    detected_emotions = [
+        {
+            "label": emotion,
+            "confidence": min(0.95, 0.7 + (scores[emotion] * 0.1)),
+            "intensity": intensity
         }
-    }
-    
-    # Intensity indicators
-    intensity_high = ["very", "so", "extremely", "really", "incredibly", "completely", "totally", "absolutely"]
-    intensity_low = ["a bit", "a little", "somewhat", "kind of", "sort of", "slightly"]
-    
-    detected_emotions = []
-    
-    # Check for specific emotion keywords and phrases
-    for emotion, patterns in emotion_keywords.items():
-        emotion_score = 0
-        
-        # Check keywords
-        for keyword in patterns["keywords"]:
-            if keyword in text_lower:
-                emotion_score += 1
-        
-        # Check phrases (weighted higher)
-        if "phrases" in patterns:
-            for phrase in patterns["phrases"]:
-                if phrase in text_lower:
-                    emotion_score += 2
-        
-        if emotion_score > 0:
-            # Determine intensity
-            intensity = "moderate"
-            for intensifier in intensity_high:
-                if intensifier in text_lower:
-                    intensity = "high"
-                    break
-            
-            if intensity == "moderate":
-                for reducer in intensity_low:
-                    if reducer in text_lower:
-                        intensity = "low"
-                        break
-            
-            detected_emotions.append({
-                "label": emotion,
-                "confidence": min(0.95, 0.7 + (emotion_score * 0.1)),
-                "intensity": intensity
-            })
+        for emotion in lexicon.emotions if emotion in scores
+    ]
     
     # If multiple emotions detected, return the strongest or prioritize loneliness
     if detected_emotions:
@@ -103,9 +105,106 @@ def detect_text_emotion(text):
         detected_emotions.sort(key=lambda x: x["confidence"], reverse=True)
         return [detected_emotions[0]]
 
-    
-    # Fallback to sentiment polarity
-    polarity = TextBlob(text).sentiment.polarity
+    return _sentiment_fallback(text)
+
+
+def detect_text_emotion_batch(texts):
+    """
+    Score many texts at once (re-scoring stored messages, evaluation runs).
+    Returns one result list per text, the same as detect_text_emotion(text).
+
+    Each text is scanned once to build a sparse document x pattern hit matrix;
+    scores, confidences and intensities for the whole batch are then computed
+    with matrix products. The sentiment fallback only runs for texts with no
+    lexicon hits.
+    """
+    _watcher.ensure_started()
+    lexicon, model = _LEXICON, _ML_MODEL
+    texts = list(texts)
+    if model is not None:
+        return _score_texts_ml(texts, lexicon, model)
+    return _score_texts_keyword(texts, lexicon)
+
+
+def _score_texts_keyword(texts, lexicon):
+    """Vectorized keyword engine behind detect_text_emotion_batch."""
+    hits = _hit_matrix(texts, lexicon)
+    scores = (hits @ lexicon.emotion_weights).toarray()
+    flags = (hits @ lexicon.intensity_flags).toarray() > 0
+    confidence = np.where(scores > 0, np.minimum(0.95, 0.7 + scores * 0.1), 0.0)
+
+    # Lonely takes priority; otherwise the first emotion (lexicon order) with
+    # the highest confidence, matching the stable sort in detect_text_emotion
+    best = confidence.argmax(axis=1)
+    if "Lonely" in lexicon.emotions:
+        lonely = lexicon.emotions.index("Lonely")
+        best = np.where(scores[:, lonely] > 0, lonely, best)
+
+    matched = scores.max(axis=1) > 0
+    best_confidence = confidence[np.arange(len(texts)), best]
+    intensity = np.where(flags[:, 0], "high", np.where(flags[:, 1], "low", "moderate"))
+
+    results = []
+    for i, text in enumerate(texts):
+        if not text:
+            results.append([{"label": "Neutral", "confidence": 1.0}])
+        elif matched[i]:
+            results.append([{
+                "label": lexicon.emotions[best[i]],
+                "confidence": float(best_confidence[i]),
+                "intensity": str(intensity[i])
+            }])
+        else:
+            results.append(_sentiment_fallback(text))
+    return results
+
+
+def _hit_matrix(texts, lexicon):
+    """Sparse (texts x patterns) matrix with a 1 for every pattern a text contains."""
+    rows, cols = [], []
+    for i, text in enumerate(texts):
+        if text:
+            pattern_ids = lexicon.matcher.match(text)
+            rows.extend([i] * len(pattern_ids))
+            cols.extend(pattern_ids)
+    return sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)),
+        shape=(len(texts), len(lexicon.matcher))
+    )
+
+
+def _score_texts_ml(texts, lexicon, model):
+    """
+    Label texts with the ML engine; intensity still comes from the lexicon's
+    intensifiers. Texts the model is unsure about (e.g. "hi", which shares no
+    features with the training data) get the keyword engine's answer instead.
+    """
+    # Empty texts keep the Neutral default
+    results = [[{"label": "Neutral", "confidence": 1.0}] for _ in texts]
+    indices = [i for i, text in enumerate(texts) if text]
+    if not indices:
+        return results
+
+    batch = [texts[i] for i in indices]
+    flags = (_hit_matrix(batch, lexicon) @ lexicon.intensity_flags).toarray() > 0
+    uncertain = []
+    for row, (i, (label, confidence)) in enumerate(zip(indices, model.predict(batch))):
+        if confidence < TEXT_ML_MIN_CONFIDENCE:
+            uncertain.append(i)
+            continue
+        intensity = "high" if flags[row, 0] else "low" if flags[row, 1] else "moderate"
+        results[i] = [{"label": label, "confidence": confidence, "intensity": intensity}]
+
+    if uncertain:
+        keyword_results = _score_texts_keyword([texts[i] for i in uncertain], lexicon)
+        for i, result in zip(uncertain, keyword_results):
+            results[i] = result
+    return results
+
+
+def _sentiment_fallback(text):
+    """Label a text with no lexicon hits by sentiment polarity."""
+    polarity = sentiment_polarity(text)
 
     if polarity >= 0.3:
         label = "Happy"
@@ -1,7 +1,7 @@
 import random
 from typing import Dict, Optional
 from datetime import datetime
-from backend.llm_service import generate_llm_response
+from backend.llm_service import generate_llm_response, stream_llm_response
 
 class EmpathicResponder:
     """
@@ -41,6 +41,67 @@ class EmpathicResponder:
         conversation_history = conversation_history or []
         
         # Custom handling for short inputs (e.g., "hey", "hi")
+        greeting = self._get_greeting_response(emotion_lower, user_text, conversation_history)
+        if greeting:
+            return greeting
+
+        # ---------------------------------------------------------
+        # LLM INTEGRATION START
+        # ---------------------------------------------------------
+        # Try to generate response using LLM first
+        system_prompt = self._build_system_prompt(final_emotion, user_text)
+        formatted_history = self._format_history(conversation_history)
+        
+        llm_response = generate_llm_response(user_text, formatted_history, system_prompt)
+        
+        if llm_response:
+            return {
+                "conversational_response": llm_response,
+                "follow_up_suggestions": [] # LLM responses don't need hardcoded suggestions
+            }
+        # ---------------------------------------------------------
+        # LLM INTEGRATION END (Fallback to templates below)
+        # ---------------------------------------------------------
+
+        return self._get_template_response(emotion_lower, final_emotion, user_text, historical_context)
+
+    def stream_response(self, text_emotion, face_emotion, final_emotion, user_text, recommendations, context: Optional[Dict] = None, historical_context: Optional[Dict] = None, conversation_history: Optional[list] = None):
+        """
+        Streaming variant of generate_response.
+        
+        Yields ("token", text) events while the LLM generates, followed by a single
+        ("done", response_dict) event with the same shape generate_response returns.
+        Greeting and template responses are sent as one token.
+        """
+        emotion_lower = final_emotion.lower()
+        self.conversation_context = context or {}
+        conversation_history = conversation_history or []
+
+        response = self._get_greeting_response(emotion_lower, user_text, conversation_history)
+
+        if response is None:
+            system_prompt = self._build_system_prompt(final_emotion, user_text)
+            formatted_history = self._format_history(conversation_history)
+
+            chunks = []
+            for chunk in stream_llm_response(user_text, formatted_history, system_prompt):
+                chunks.append(chunk)
+                yield "token", chunk
+
+            if chunks:
+                yield "done", {
+                    "conversational_response": "".join(chunks),
+                    "follow_up_suggestions": []
+                }
+                return
+
+            response = self._get_template_response(emotion_lower, final_emotion, user_text, historical_context)
+
+        yield "token", response["conversational_response"]
+        yield "done", response
+
+    def _get_greeting_response(self, emotion_lower, user_text, conversation_history):
+        """Quick reply for short opening messages (e.g., "hey", "hi"), else None."""
         if len(user_text.split()) <= 3 and emotion_lower == "neutral" and not conversation_history:
              return {
                 "conversational_response": random.choice([
@@ -50,12 +111,11 @@ class EmpathicResponder:
                 ]),
                 "follow_up_suggestions": self._get_follow_up_suggestions(emotion_lower)
             }
+        return None
 
-        # ---------------------------------------------------------
-        # LLM INTEGRATION START
-        # ---------------------------------------------------------
-        # Try to generate response using LLM first
-        system_prompt = f"""
+    def _build_system_prompt(self, final_emotion, user_text):
+        """System prompt for the LLM."""
+        return f"""
         You are a warm, empathetic, and supportive friend (not a therapist or a robot).
         Your name is "Adaptive AI".
         
@@ -75,25 +135,20 @@ class EmpathicResponder:
         7. **SAFETY**: If the user mentions self-harm or severe distress, gently suggest professional help, but remain supportive.
         8. **STAY ON TOPIC**: Respond directly to what the user just said.
         """
-        
-        # Format history for LLM service (LLM service expects dicts with 'role' and 'content')
-        # ConversationMemory returns dicts with 'user_text' and 'ai_response'
+
+    def _format_history(self, conversation_history):
+        """
+        Format history for LLM service (LLM service expects dicts with 'role' and 'content').
+        ConversationMemory returns dicts with 'user_text' and 'ai_response'.
+        """
         formatted_history = []
         for exchange in conversation_history:
             formatted_history.append({"role": "user", "content": exchange.get("user_text", "")})
             formatted_history.append({"role": "assistant", "content": exchange.get("ai_response", "")})
-        
-        llm_response = generate_llm_response(user_text, formatted_history, system_prompt)
-        
-        if llm_response:
-            return {
-                "conversational_response": llm_response,
-                "follow_up_suggestions": [] # LLM responses don't need hardcoded suggestions
-            }
-        # ---------------------------------------------------------
-        # LLM INTEGRATION END (Fallback to templates below)
-        # ---------------------------------------------------------
+        return formatted_history
 
+    def _get_template_response(self, emotion_lower, final_emotion, user_text, historical_context):
+        """Template-based response used when no LLM is available."""
         # Build the response in stages: acknowledge → empathize → support → humor → recommend
         acknowledgment = self._get_acknowledgment(emotion_lower, user_text)
         
@@ -411,3 +466,20 @@ def generate_empathetic_response(text_emotion, face_emotion, final_emotion, user
         historical_context=historical_context,
         conversation_history=conversation_history
     )
+
+def stream_empathetic_response(text_emotion, face_emotion, final_emotion, user_text, recommendations, context: Optional[Dict] = None, historical_context: Optional[Dict] = None, conversation_history: Optional[list] = None):
+    """
+    Convenience function for streaming responses.
+    Yields ("token", text) events and a final ("done", response_dict) event.
+    """
+    responder = EmpathicResponder(conversation_context=context)
+    return responder.stream_response(
+        text_emotion=text_emotion,
+        face_emotion=face_emotion,
+        final_emotion=final_emotion,
+        user_text=user_text,
+        recommendations=recommendations,
+        context=context,
+        historical_context=historical_context,
+        conversation_history=conversation_history
+    )
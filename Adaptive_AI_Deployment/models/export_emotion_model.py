@@ -0,0 +1,160 @@
+"""
+Exports a facial emotion CNN to an int8 TensorFlow Lite model for
+FACE_CLASSIFIER=tflite (models/face_classifier.py).
+
+Sources:
+  - custom: the CNN trained by models/train_emotion_model.py (models/emotion_model.h5, 48x48 input)
+  - fer:    FER's bundled mini-Xception (64x64 input), for deployments without a trained model
+
+Post-training quantization calibrates the int8 ranges on real face crops:
+the class folders of the training data (data/test by default, as in
+train_emotion_model.py). Without them random images are used, which gives
+much worse accuracy, and a warning is printed.
+
+Next to the .tflite file a .json file records what the model does not:
+the label of each output column and the input normalization.
+
+Run from Adaptive_AI_Deployment:
+    python models/export_emotion_model.py
+    python models/export_emotion_model.py --source fer --data data/test
+Then start the backend with FACE_CLASSIFIER=tflite.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.face_classifier import EMOTION_LABELS, TFLITE_MODEL_PATH
+
+KERAS_MODEL_PATH = os.path.join(os.path.dirname(__file__), "emotion_model.h5")
+DATA_DIR = "data/test"
+CALIBRATION_SAMPLES = 300
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# flow_from_directory numbers the classes in sorted folder order, so this is
+# the output order of a model trained on the FER-2013 folders (not the
+# EMOTION_LABELS list in train_emotion_model.py).
+FER2013_CLASS_ORDER = ["angry", "disgust", "fear", "happy", "neutral", "sad", "surprise"]
+
+# x -> x * scale + offset, applied to uint8 pixels before the network
+NORMALIZATION = {
+    "custom": {"scale": 1.0 / 255.0, "offset": 0.0},   # ImageDataGenerator(rescale=1./255)
+    "fer": {"scale": 2.0 / 255.0, "offset": -1.0},     # FER's [-1, 1] preprocessing
+}
+
+
+def load_source_model(source, path=KERAS_MODEL_PATH):
+    """The Keras model to export and the labels of its output columns."""
+    from tensorflow.keras.models import load_model
+    if source == "fer":
+        import fer
+        path = os.path.join(os.path.dirname(fer.__file__), "data", "emotion_model.hdf5")
+        return load_model(path, compile=False), list(EMOTION_LABELS)
+    return load_model(path, compile=False), None
+
+
+def calibration_images(data_dir, size, samples=CALIBRATION_SAMPLES, seed=0):
+    """
+    Up to samples grayscale face images of the given (width, height) from the
+    class folders under data_dir, plus the sorted class names. (None, None)
+    if the directory has no images.
+    """
+    if not data_dir or not os.path.isdir(data_dir):
+        return None, None
+    classes = sorted(d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d)))
+    paths = [
+        os.path.join(data_dir, label, name)
+        for label in classes
+        for name in sorted(os.listdir(os.path.join(data_dir, label)))
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+    if not paths:
+        return None, None
+    rng = np.random.default_rng(seed)
+    images = []
+    for path in rng.permutation(paths)[:samples]:
+        image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        if image is not None:
+            images.append(cv2.resize(image, size, interpolation=cv2.INTER_AREA))
+    return (np.stack(images), [c.lower() for c in classes]) if images else (None, None)
+
+
+def export_tflite(model, calibration, normalization, labels, out_path=TFLITE_MODEL_PATH):
+    """
+    Convert a Keras model with (H, W, 1) input to a fully int8 TFLite model
+    (int8 input and output) and write it plus its .json metadata.
+    calibration: (N, H, W) uint8 images for the representative dataset.
+    Returns the metadata dict.
+    """
+    import tensorflow as tf
+
+    def representative_dataset():
+        for image in calibration:
+            x = image.astype(np.float32) * normalization["scale"] + normalization["offset"]
+            yield [x[None, :, :, None]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    tflite_model = converter.convert()
+
+    with open(out_path, "wb") as f:
+        f.write(tflite_model)
+    metadata = {
+        "labels": [label.lower() for label in labels],
+        "input_size": [int(model.input_shape[2]), int(model.input_shape[1])],
+        "normalization": normalization,
+        "quantization": "int8",
+    }
+    with open(os.path.splitext(out_path)[0] + ".json", "w") as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+
+def compare(model, classifier, images, normalization):
+    """Top-1 agreement between the Keras model and the exported classifier on images."""
+    x = images.astype(np.float32) * normalization["scale"] + normalization["offset"]
+    reference = model.predict(x[..., None], verbose=0)
+    # Keras columns in the classifier's (EMOTION_LABELS) order
+    reference = reference[:, classifier.column_order]
+    return float((reference.argmax(axis=1) == classifier.classify(images).argmax(axis=1)).mean())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export an emotion CNN to int8 TFLite.")
+    parser.add_argument("--source", choices=("custom", "fer"), default="custom")
+    parser.add_argument("--model", default=KERAS_MODEL_PATH, help="Keras model (--source custom)")
+    parser.add_argument("--data", default=DATA_DIR, help="Class folders of face images for calibration")
+    parser.add_argument("--out", default=TFLITE_MODEL_PATH)
+    parser.add_argument("--samples", type=int, default=CALIBRATION_SAMPLES)
+    args = parser.parse_args()
+
+    if args.source == "custom" and not os.path.exists(args.model):
+        print(f"[!] {args.model} not found; train it with models/train_emotion_model.py or use --source fer.")
+        sys.exit(1)
+
+    model, labels = load_source_model(args.source, args.model)
+    size = (int(model.input_shape[2]), int(model.input_shape[1]))
+    images, classes = calibration_images(args.data, size, args.samples)
+    if images is None:
+        print(f"[!] No calibration images under {args.data}; using random images (expect lower accuracy).")
+        images = np.random.default_rng(0).integers(0, 256, (args.samples,) + size[::-1], dtype=np.uint8)
+    labels = labels or classes or FER2013_CLASS_ORDER
+
+    normalization = NORMALIZATION[args.source]
+    print(f"Exporting {args.source} model ({size[0]}x{size[1]}, labels {labels}) with {len(images)} calibration images...")
+    export_tflite(model, images, normalization, labels, args.out)
+    print(f"Saved {args.out} ({os.path.getsize(args.out) / 1024:.1f} KiB)")
+
+    from models.face_classifier import TFLiteClassifier
+    agreement = compare(model, TFLiteClassifier(args.out), images[:100], normalization)
+    print(f"Top-1 agreement with the Keras model: {agreement:.1%}")
@@ -0,0 +1,199 @@
+"""
+Facial emotion classifier stage.
+
+Face detection is done once per frame by MediaPipe FaceMesh: the face box
+comes from the landmarks (face_geometry.face_box), the face is cropped and
+resized once to the classifier's grayscale input, and the crop goes straight
+into the classifier. FER's own detector (a Haar cascade, by far the most
+expensive step per frame) is not run.
+
+Two engines share the classify(crops) interface (FACE_CLASSIFIER):
+  - fer:    FER's pretrained mini-Xception in Keras (needs TensorFlow)
+  - tflite: an int8 TFLite export (models/export_emotion_model.py), run by
+            the small tflite-runtime / ai-edge-litert interpreter if installed
+"""
+
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+EMOTION_LABELS = ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")
+
+TFLITE_MODEL_PATH = os.path.join(os.path.dirname(__file__), "emotion_model.tflite")
+
+# Extra margin around the square face box, as a fraction of its side
+# (FER adds 10px around its ~100px Haar boxes)
+CROP_MARGIN = 0.1
+
+
+def crop_face(frame, box, size, margin=CROP_MARGIN):
+    """
+    Cut a square grayscale face crop of the given (width, height) out of a BGR frame.
+    box is (x, y, w, h) in pixels. The box is made square around its center
+    and widened by margin; parts outside the frame are filled by edge
+    replication. Only the face region is converted to grayscale.
+    """
+    x, y, w, h = box
+    side = max(w, h) * (1 + 2 * margin)
+    cx, cy = x + w / 2.0, y + h / 2.0
+    x1, y1 = int(round(cx - side / 2)), int(round(cy - side / 2))
+    x2, y2 = int(round(cx + side / 2)), int(round(cy + side / 2))
+
+    frame_h, frame_w = frame.shape[:2]
+    region = frame[max(y1, 0):min(y2, frame_h), max(x1, 0):min(x2, frame_w)]
+    if region.size == 0:
+        return None
+    gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) if region.ndim == 3 else region
+    pad = (max(-y1, 0), max(y2 - frame_h, 0), max(-x1, 0), max(x2 - frame_w, 0))
+    if any(pad):
+        gray = cv2.copyMakeBorder(gray, *pad, borderType=cv2.BORDER_REPLICATE)
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+
+def scores_to_dict(scores):
+    """One row of classifier output as {label: score}, rounded like FER's output."""
+    return {label: round(float(score), 2) for label, score in zip(EMOTION_LABELS, scores)}
+
+
+class FERClassifier:
+    """
+    FER's pretrained mini-Xception, called on face crops instead of whole frames.
+    Uses only FER's public detect_emotions(): the crops are tiled into one
+    image and passed with their rectangles, so FER's Haar detector is skipped
+    and the whole batch is one model call. The detector keeps per-call state
+    and its TFLite interpreter is not thread-safe, so calls are serialized.
+    """
+
+    # FER's model input (mini-Xception, 64x64 grayscale); FER resizes to it anyway
+    input_size = (64, 64)
+
+    def __init__(self, detector):
+        """detector: a fer.FER built with offsets=(0, 0), so each rectangle is used as given."""
+        self._detector = detector
+        self._lock = threading.Lock()
+
+    def classify(self, crops):
+        """
+        crops: (B, H, W) uint8 grayscale faces of input_size.
+        Returns a (B, 7) float array of scores in EMOTION_LABELS order.
+        """
+        crops = np.asarray(crops, dtype=np.uint8)
+        count, h, w = crops.shape
+        # Side by side: crop i is the rectangle (i * w, 0, w, h)
+        tile = np.ascontiguousarray(crops.transpose(1, 0, 2).reshape(h, count * w))
+        rectangles = [(i * w, 0, w, h) for i in range(count)]
+        image = cv2.cvtColor(tile, cv2.COLOR_GRAY2BGR)
+        with self._lock:
+            faces = self._detector.detect_emotions(image, face_rectangles=rectangles)
+
+        scores = np.zeros((count, len(EMOTION_LABELS)), dtype=np.float32)
+        for face in faces:
+            row = int(face["box"][0]) // w
+            scores[row] = [face["emotions"].get(label, 0.0) for label in EMOTION_LABELS]
+        return scores
+
+
+def _interpreter_class():
+    """The lightest TFLite interpreter available (full TensorFlow as a last resort)."""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteClassifier:
+    """
+    An int8 TFLite emotion model with its .json metadata (labels, normalization).
+    The model file is read once; the interpreter (which owns a thread pool)
+    is created per process, and calls into it are serialized.
+    """
+
+    def __init__(self, model_path=TFLITE_MODEL_PATH, num_threads=1):
+        with open(os.path.splitext(model_path)[0] + ".json") as f:
+            metadata = json.load(f)
+        with open(model_path, "rb") as f:
+            self._model = f.read()
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.input_size = tuple(metadata["input_size"])
+        self._scale = float(metadata["normalization"]["scale"])
+        self._offset = float(metadata["normalization"]["offset"])
+        # Model output column for each of EMOTION_LABELS
+        labels = [label.lower() for label in metadata["labels"]]
+        self.column_order = np.array([labels.index(label) for label in EMOTION_LABELS], dtype=np.intp)
+
+        self._lock = threading.Lock()
+        self._interpreter = None
+        self._pid = None
+        self._batch = None
+        self._get_interpreter()
+
+    def _get_interpreter(self):
+        if self._interpreter is None or self._pid != os.getpid():
+            interpreter = _interpreter_class()(model_content=self._model, num_threads=self.num_threads)
+            interpreter.allocate_tensors()
+            self._input = interpreter.get_input_details()[0]
+            self._output = interpreter.get_output_details()[0]
+            self._interpreter, self._pid, self._batch = interpreter, os.getpid(), 1
+        return self._interpreter
+
+    def classify(self, crops):
+        """
+        crops: (B, H, W) uint8 grayscale faces of input_size.
+        Returns a (B, 7) float array of scores in EMOTION_LABELS order.
+        """
+        crops = np.asarray(crops)
+        # Normalize and quantize in one step: q = x * scale / in_scale + in_zero
+        in_scale, in_zero = self._input["quantization"]
+        q = np.rint(crops.astype(np.float32) * (self._scale / in_scale) + (self._offset / in_scale + in_zero))
+        q = np.clip(q, -128, 127).astype(self._input["dtype"])[..., None]
+
+        with self._lock:
+            interpreter = self._get_interpreter()
+            if self._batch != len(q):
+                interpreter.resize_tensor_input(self._input["index"], q.shape)
+                interpreter.allocate_tensors()
+                self._input = interpreter.get_input_details()[0]
+                self._output = interpreter.get_output_details()[0]
+                self._batch = len(q)
+            interpreter.set_tensor(self._input["index"], q)
+            interpreter.invoke()
+            out = interpreter.get_tensor(self._output["index"])
+
+        out_scale, out_zero = self._output["quantization"]
+        scores = (out.astype(np.float32) - out_zero) * out_scale
+        return scores[:, self.column_order]
+
+
+def load_classifier(engine="fer", model_path=TFLITE_MODEL_PATH, num_threads=1):
+    """
+    The classifier for FACE_CLASSIFIER: a TFLiteClassifier for "tflite" (if
+    the exported model loads), otherwise FER's model.
+    Raises RuntimeError if FER's model is needed but fer / TensorFlow are not installed.
+    """
+    if engine == "tflite":
+        if not os.path.exists(model_path):
+            print(f"Face classifier model not found at {model_path}; run models/export_emotion_model.py")
+        else:
+            try:
+                return TFLiteClassifier(model_path, num_threads)
+            except Exception as e:
+                print(f"Failed to load TFLite face classifier: {e}")
+        print("Falling back to the FER face classifier.")
+    # Imported lazily so the TFLite engine does not pull in TensorFlow
+    try:
+        from fer.fer import FER
+    except ImportError as e:
+        raise RuntimeError(
+            f"The fer face classifier needs the fer package and TensorFlow ({e}). Install them, "
+            "or set FACE_CLASSIFIER=tflite with a model exported by models/export_emotion_model.py"
+        ) from e
+    return FERClassifier(FER(mtcnn=False, offsets=(0, 0)))
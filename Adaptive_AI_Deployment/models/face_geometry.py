@@ -0,0 +1,135 @@
+"""
+Geometric face features from MediaPipe FaceMesh landmarks.
+
+The landmarks are converted once per frame into an (N, 3) float32 array
+(N = 478 with refine_landmarks). Every feature is a ratio of distances
+between landmark pairs, so all distances are computed in one fancy-indexed
+NumPy expression over a fixed table of pairs. The same code works on a
+batch of frames, (F, N, 3), for video mode.
+Distances use x/y only (normalized image coordinates), as before.
+"""
+
+import numpy as np
+
+# Landmark pairs whose 2D distances the features are built from.
+# Eye order follows the usual EAR layout p1..p6: (p2,p6), (p3,p5) vertical, (p1,p4) horizontal.
+DISTANCE_PAIRS = {
+    "left_eye_v1": (160, 144),
+    "left_eye_v2": (158, 153),
+    "left_eye_h": (33, 133),
+    "right_eye_v1": (385, 380),
+    "right_eye_v2": (387, 373),
+    "right_eye_h": (362, 263),
+    "mouth_v": (13, 14),        # upper / lower lip
+    "mouth_h": (61, 291),       # mouth corners
+    "brow_inner": (107, 336),   # inner brow ends
+    "eye_inner": (133, 362),    # inner eye corners (scale reference)
+}
+
+_PAIR_NAMES = list(DISTANCE_PAIRS)
+_PAIRS = np.array([DISTANCE_PAIRS[name] for name in _PAIR_NAMES], dtype=np.intp)
+
+# Every ratio feature is (weighted sum of distances) / (weighted sum of distances).
+# Stored as two (pairs x ratios) matrices so a whole batch is two matmuls and one divide.
+RATIOS = {
+    # Eye Aspect Ratio: (|p2-p6| + |p3-p5|) / (2 |p1-p4|)
+    "ear_left": ({"left_eye_v1": 1, "left_eye_v2": 1}, {"left_eye_h": 2}),
+    "ear_right": ({"right_eye_v1": 1, "right_eye_v2": 1}, {"right_eye_h": 2}),
+    # Mouth Aspect Ratio: lip gap over mouth width
+    "mar": ({"mouth_v": 1}, {"mouth_h": 1}),
+    # Inner brow distance normalized by inner eye distance (scale invariant)
+    "brow_ratio": ({"brow_inner": 1}, {"eye_inner": 1}),
+}
+_RATIO_NAMES = list(RATIOS)
+
+
+def _ratio_matrices():
+    numerators = np.zeros((len(_PAIR_NAMES), len(_RATIO_NAMES)), dtype=np.float32)
+    denominators = np.zeros_like(numerators)
+    for col, name in enumerate(_RATIO_NAMES):
+        for matrix, terms in zip((numerators, denominators), RATIOS[name]):
+            for pair, weight in terms.items():
+                matrix[_PAIR_NAMES.index(pair), col] = weight
+    return numerators, denominators
+
+
+_NUMERATORS, _DENOMINATORS = _ratio_matrices()
+
+FEATURE_NAMES = tuple(RATIOS) + ("ear",)
+
+# Golden-ratio overlay points: nose tip, chin, eye centers (iris), forehead, cheeks
+OVERLAY_POINTS = np.array([1, 152, 468, 473, 10, 234, 454], dtype=np.intp)
+
+
+# Wire format of a NormalizedLandmarkList whose landmarks carry exactly x, y, z:
+# per landmark, field 1 (length-delimited, 15 bytes) holding three fixed32 floats.
+_LANDMARK_RECORD = np.dtype([
+    ("tag", "u1"), ("size", "u1"),
+    ("x_tag", "u1"), ("x", "<f4"),
+    ("y_tag", "u1"), ("y", "<f4"),
+    ("z_tag", "u1"), ("z", "<f4"),
+])
+# Byte offsets within a record and the values they must hold
+_TAG_OFFSETS = np.array([0, 1, 2, 7, 12], dtype=np.intp)
+_TAG_VALUES = np.array([0x0A, 15, 0x0D, 0x15, 0x1D], dtype=np.uint8)
+
+
+def landmarks_to_array(landmark_list):
+    """
+    Convert a FaceMesh NormalizedLandmarkList (or any sequence of objects with
+    x/y/z) into an (N, 3) float32 array.
+    Reading 478 x 3 protobuf attributes from Python costs ~0.4 ms per face, so
+    FaceMesh output is serialized and viewed as a record array instead (~10x
+    faster). Lists in any other layout fall back to attribute access.
+    """
+    serialize = getattr(landmark_list, "SerializeToString", None)
+    if serialize is not None:
+        data = serialize()
+        if len(data) % _LANDMARK_RECORD.itemsize == 0:
+            raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, _LANDMARK_RECORD.itemsize)
+            if (raw[:, _TAG_OFFSETS] == _TAG_VALUES).all():
+                records = np.frombuffer(data, dtype=_LANDMARK_RECORD)
+                points = np.empty((len(records), 3), dtype=np.float32)
+                points[:, 0], points[:, 1], points[:, 2] = records["x"], records["y"], records["z"]
+                return points
+        landmark_list = landmark_list.landmark
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmark_list], dtype=np.float32)
+
+
+def pair_distances(points):
+    """
+    2D distances for every DISTANCE_PAIRS entry.
+    points: (..., N, 3) or (..., N, 2). Returns (..., len(DISTANCE_PAIRS)).
+    """
+    diff = points[..., _PAIRS[:, 0], :2] - points[..., _PAIRS[:, 1], :2]
+    return np.sqrt((diff * diff).sum(axis=-1))
+
+
+def compute_face_features(points):
+    """
+    All geometric features for one face (N, 3) or a batch (F, N, 3).
+    Returns {name: value}, where each value is a float32 scalar array for
+    one face or an (F,) array for a batch. Ratios with a zero denominator
+    (degenerate landmarks) are 0.
+    """
+    d = pair_distances(np.asarray(points, dtype=np.float32))
+    numerators, denominators = d @ _NUMERATORS, d @ _DENOMINATORS
+    ratios = np.divide(numerators, denominators, out=np.zeros_like(numerators), where=denominators > 0)
+
+    features = {name: ratios[..., i] for i, name in enumerate(_RATIO_NAMES)}
+    features["ear"] = (features["ear_left"] + features["ear_right"]) / 2.0
+    return features
+
+
+def overlay_pixels(points, width, height):
+    """Pixel coordinates of OVERLAY_POINTS as {landmark index: (x, y)}."""
+    xy = (points[OVERLAY_POINTS, :2] * (width, height)).astype(int)
+    return {int(idx): (int(x), int(y)) for idx, (x, y) in zip(OVERLAY_POINTS, xy)}
+
+
+def face_box(points, width, height):
+    """Pixel bounding box (x, y, w, h) around all landmarks, clipped to the frame."""
+    xy = points[:, :2] * (width, height)
+    x1, y1 = np.maximum(np.floor(xy.min(axis=0)), 0)
+    x2, y2 = np.minimum(np.ceil(xy.max(axis=0)), (width, height))
+    return int(x1), int(y1), int(max(x2 - x1, 0)), int(max(y2 - y1, 0))
@@ -0,0 +1,254 @@
+"""
+Burst / video mode for face emotion analysis.
+
+A single frame gives a noisy label: a blink or a half-finished expression
+decides the result. Here a short sequence (a clip, a list of frames, or a
+burst from the server camera) is analyzed as a whole:
+
+- One FaceMesh in tracking mode follows the face from frame to frame, so
+  its face detector only runs when the track is lost.
+- The FER classifier runs on keyframes only: the first frame with a face,
+  every k-th frame after it, and the first frame after the face is lost.
+  All keyframe crops are classified in one batch at the end.
+- The keyframe scores are smoothed with an exponential moving average, and
+  the EAR/MAR/brow features of every frame are computed in one batched call.
+
+Sequences are analyzed in the request thread (not in the face worker pool).
+"""
+
+import os
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+from models.camera_capture import camera
+from models.emotion_face import mp_face_mesh, classifier, describe_face_features, prescreen_frame, FACE_PRESCREEN
+from models.face_classifier import EMOTION_LABELS, crop_face
+from models.face_geometry import landmarks_to_array, compute_face_features, face_box
+
+# Run the classifier on every k-th frame with a face (1 = every frame)
+FACE_VIDEO_KEYFRAME_INTERVAL = int(os.environ.get("FACE_VIDEO_KEYFRAME_INTERVAL", 5))
+# EMA weight of the newest keyframe's scores (1 = no smoothing)
+FACE_VIDEO_SMOOTHING = float(os.environ.get("FACE_VIDEO_SMOOTHING", 0.3))
+# Frames per second sampled from uploaded clips, and the most frames analyzed
+FACE_VIDEO_FPS = float(os.environ.get("FACE_VIDEO_FPS", 10))
+FACE_VIDEO_MAX_FRAMES = int(os.environ.get("FACE_VIDEO_MAX_FRAMES", 90))
+
+_SERIES_NAMES = ("ear", "mar", "brow_ratio")
+_COPY_CHUNK_BYTES = 64 * 1024
+
+# One tracking FaceMesh per request thread, reset at the start of every sequence
+# (building the graph costs far more than resetting it).
+_local = threading.local()
+
+
+def get_tracking_mesh():
+    """Return this thread's tracking FaceMesh, reset for a new sequence."""
+    mesh = getattr(_local, "mesh", None)
+    if mesh is None or _local.pid != os.getpid():
+        mesh = mp_face_mesh.FaceMesh(
+            static_image_mode=False,
+            max_num_faces=1,
+            refine_landmarks=True,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        _local.mesh, _local.pid = mesh, os.getpid()
+    else:
+        mesh.reset()
+    return mesh
+
+
+def iter_frames(frames, fps=FACE_VIDEO_FPS):
+    """(timestamp, frame) pairs for a list of frames taken fps apart."""
+    for i, frame in enumerate(frames):
+        yield i / fps, frame
+
+
+def iter_clip(path, fps=FACE_VIDEO_FPS, max_frames=FACE_VIDEO_MAX_FRAMES):
+    """
+    Decode a video file lazily as (timestamp, frame) pairs, sampled at fps.
+    Skipped frames are only grabbed, not converted to BGR arrays.
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        native_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        step = 1.0 / fps if fps > 0 else 0.0
+        next_t, index, count = 0.0, -1, 0
+        while count < max_frames and cap.grab():
+            index += 1
+            t = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 or index / native_fps
+            if t + 1e-6 < next_t:
+                continue
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            next_t = t + step
+            count += 1
+            yield t, frame
+    finally:
+        cap.release()
+
+
+def analyze_face_sequence(frames, keyframe_interval=FACE_VIDEO_KEYFRAME_INTERVAL,
+                          smoothing=FACE_VIDEO_SMOOTHING, max_frames=FACE_VIDEO_MAX_FRAMES):
+    """
+    Analyze a sequence of BGR frames given as (timestamp_seconds, frame) pairs.
+    Frames are consumed one at a time, so a generator (iter_clip) is never
+    held in memory as a whole.
+
+    Returns a dict:
+        emotion          - dominant label of the smoothed distribution
+        emotions         - smoothed {label: score}, or {} if no face was seen
+        timeline         - [{"t", "emotion", "emotions"}] per keyframe, smoothed so far
+        series           - {"t": [...], "ear": [...], "mar": [...], "brow_ratio": [...]}
+                           per frame (None where no face was found)
+        face_features    - mean ear / mar / brow_ratio over the frames with a face
+        face_feature_desc, frames, faces, keyframes
+        rejected         - frames dropped by the pre-screen (dark / overexposed / blurry)
+    """
+    keyframe_interval = max(int(keyframe_interval), 1)
+    smoothing = min(max(float(smoothing), 0.01), 1.0)
+    mesh = get_tracking_mesh()
+
+    times, points, face_rows = [], [], []
+    crops, keyframe_times = [], []
+    since_keyframe = keyframe_interval
+    had_face = False
+    rejected = 0
+
+    for t, frame in frames:
+        if len(times) >= max_frames:
+            break
+        row = len(times)
+        times.append(round(float(t), 3))
+        if FACE_PRESCREEN:
+            frame, _ = prescreen_frame(frame)
+            if frame is None:
+                rejected += 1
+                had_face = False
+                continue
+        results = mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if not results.multi_face_landmarks:
+            had_face = False
+            continue
+
+        face_points = landmarks_to_array(results.multi_face_landmarks[0])
+        points.append(face_points)
+        face_rows.append(row)
+
+        # A face that was just (re)acquired is always a keyframe
+        if since_keyframe >= keyframe_interval or not had_face:
+            h, w = frame.shape[:2]
+            crop = crop_face(frame, face_box(face_points, w, h), classifier.input_size)
+            if crop is not None:
+                crops.append(crop)
+                keyframe_times.append(times[-1])
+                since_keyframe = 0
+        since_keyframe += 1
+        had_face = True
+
+    # Emotion distribution: one classifier batch, then the EMA over keyframes
+    timeline = []
+    smoothed = None
+    if crops:
+        for t, scores in zip(keyframe_times, classifier.classify(np.stack(crops))):
+            smoothed = scores if smoothed is None else smoothing * scores + (1 - smoothing) * smoothed
+            timeline.append({
+                "t": t,
+                "emotion": EMOTION_LABELS[int(np.argmax(smoothed))].capitalize(),
+                "emotions": {label: round(float(s), 2) for label, s in zip(EMOTION_LABELS, smoothed)},
+            })
+
+    # Geometric features of every frame with a face, in one batch
+    series = {"t": times}
+    face_features = {}
+    feature_desc_parts = []
+    if points:
+        features = compute_face_features(np.stack(points))
+        for name in _SERIES_NAMES:
+            values = [None] * len(times)
+            for row, value in zip(face_rows, features[name].astype(np.float64).round(4).tolist()):
+                values[row] = value
+            series[name] = values
+            face_features[name] = float(features[name].mean())
+        feature_desc_parts = describe_face_features(*(face_features[name] for name in _SERIES_NAMES))
+    else:
+        for name in _SERIES_NAMES:
+            series[name] = [None] * len(times)
+
+    if not times:
+        feature_desc = "No frames to analyze."
+    elif not points:
+        feature_desc = "No face found in the sequence."
+    else:
+        feature_desc = " ".join(feature_desc_parts) if feature_desc_parts else "Neutral facial expression."
+
+    return {
+        "emotion": timeline[-1]["emotion"] if timeline else "Neutral",
+        "emotions": timeline[-1]["emotions"] if timeline else {},
+        "timeline": timeline,
+        "series": series,
+        "face_features": face_features,
+        "face_feature_desc": feature_desc,
+        "frames": len(times),
+        "faces": len(points),
+        "keyframes": len(timeline),
+        "rejected": rejected,
+    }
+
+
+class ClipTooLarge(ValueError):
+    """The clip passed to analyze_face_clip is larger than its max_bytes."""
+
+
+def _copy_limited(source, target, max_bytes):
+    """Copy a file object to target, raising ClipTooLarge past max_bytes (None = no limit)."""
+    copied = 0
+    while True:
+        chunk = source.read(_COPY_CHUNK_BYTES)
+        if not chunk:
+            return
+        copied += len(chunk)
+        if max_bytes is not None and copied > max_bytes:
+            raise ClipTooLarge(f"Clip larger than {max_bytes} bytes")
+        target.write(chunk)
+
+
+def analyze_face_clip(data, fps=FACE_VIDEO_FPS, max_bytes=None, **kwargs):
+    """
+    Analyze an uploaded clip (bytes, an uploaded file, or a file object with read()).
+    OpenCV can only decode from a path, so the clip is written to a temp file.
+    Copying stops with ClipTooLarge after max_bytes: a chunked request body has
+    no Content-Length to check up front.
+    """
+    handle, path = tempfile.mkstemp(suffix=".video")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            if hasattr(data, "save"):
+                # An uploaded FileStorage: copy its stream so the limit applies too
+                data = data.stream
+            if hasattr(data, "read"):
+                _copy_limited(data, f, max_bytes)
+            else:
+                if max_bytes is not None and len(data) > max_bytes:
+                    raise ClipTooLarge(f"Clip larger than {max_bytes} bytes")
+                f.write(data)
+        return analyze_face_sequence(iter_clip(path, fps, kwargs.get("max_frames", FACE_VIDEO_MAX_FRAMES)), **kwargs)
+    finally:
+        os.remove(path)
+
+
+def detect_face_emotion_sequence(count=None, timeout=5.0, **kwargs):
+    """
+    Burst mode for the server camera: analyze the next count frames
+    (mirrored, like detect_face_emotion). count defaults to FACE_VIDEO_MAX_FRAMES.
+    """
+    count = min(count or FACE_VIDEO_MAX_FRAMES, FACE_VIDEO_MAX_FRAMES)
+    frames = camera.collect(count, timeout)
+    if not frames:
+        print("Warning: Failed to capture a burst from the camera.")
+    start = frames[0][0] if frames else 0.0
+    return analyze_face_sequence(((t - start, cv2.flip(frame, 1)) for t, frame in frames), **kwargs)
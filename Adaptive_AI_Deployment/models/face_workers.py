@@ -0,0 +1,362 @@
+"""
+Process pool for face analysis.
+
+The FER classifier and the FaceMesh graph are not thread-safe, and the GIL
+serializes their Python parts, so face throughput does not grow with request
+threads. With FACE_WORKERS > 0 each backend process starts that many face
+worker processes (spawned, not forked, so they get clean TensorFlow and
+MediaPipe state), and every worker loads its own models.
+
+Frames are handed over through one multiprocessing.shared_memory slot per
+worker: the caller copies the frame into the slot once and sends only its
+shape over a pipe, instead of pickling the pixels. Dispatch is bounded
+(FACE_QUEUE_SIZE callers may wait for a free worker, more are rejected),
+replies are subject to a timeout, and hung or dead workers are replaced.
+
+FACE_WORKERS=0 (the default) analyzes frames in the request thread, as before.
+"""
+
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+FACE_WORKERS = int(os.environ.get("FACE_WORKERS", 0))
+# Callers allowed to wait for a busy pool; further requests are rejected at once
+FACE_QUEUE_SIZE = int(os.environ.get("FACE_QUEUE_SIZE", 8))
+# Seconds a caller waits for a free worker / for a worker's reply
+FACE_DISPATCH_TIMEOUT = float(os.environ.get("FACE_DISPATCH_TIMEOUT", 5))
+FACE_WORKER_TIMEOUT = float(os.environ.get("FACE_WORKER_TIMEOUT", 10))
+# Loading TensorFlow and the models in a new worker takes a while
+FACE_WORKER_START_TIMEOUT = float(os.environ.get("FACE_WORKER_START_TIMEOUT", 120))
+# Size of each shared-memory frame slot; larger frames are downscaled to fit
+FACE_MAX_FRAME_BYTES = int(os.environ.get("FACE_MAX_FRAME_BYTES", 1920 * 1080 * 3))
+# Intra-op threads per worker (1 avoids oversubscribing cores across workers)
+FACE_WORKER_THREADS = int(os.environ.get("FACE_WORKER_THREADS", 1))
+# Seconds between pings of idle workers; 0 disables the health monitor
+FACE_HEALTH_INTERVAL = float(os.environ.get("FACE_HEALTH_INTERVAL", 15))
+
+
+def _error_result(message):
+    return "Neutral", {}, None, {}, message
+
+
+# --- WORKER PROCESS ---
+
+def _limit_threads(num_threads):
+    """Cap the numeric libraries' thread pools; must run before TensorFlow is imported."""
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        os.environ[var] = str(num_threads)
+    cv2.setNumThreads(num_threads)
+
+
+def _worker_main(conn, shm_name, num_threads, analyze_path):
+    """
+    Entry point of a face worker process.
+    Messages in:  ("analyze", shape, render) | ("ping",) | None (stop)
+    Messages out: ("ready", pid) | ("ok", result) | ("pong", pid) | ("error", message)
+    """
+    _limit_threads(num_threads)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        module_name, func_name = analyze_path.rsplit(".", 1)
+        analyze = getattr(__import__(module_name, fromlist=[func_name]), func_name)
+        conn.send(("ready", os.getpid()))
+
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                return
+            if message is None:
+                return
+            if message[0] == "ping":
+                conn.send(("pong", os.getpid()))
+                continue
+
+            _, shape, render = message
+            # A view of the slot, not a copy; analysis may draw on it in place
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            try:
+                result = analyze(frame, render)
+                conn.send(("ok", result))
+            except Exception as e:
+                conn.send(("error", str(e)))
+            finally:
+                del frame
+    finally:
+        shm.close()
+
+
+# --- POOL ---
+
+class _FaceWorker:
+    """Parent-side handle of one worker process and its frame slot."""
+
+    def __init__(self, context, slot_bytes, num_threads, analyze_path):
+        self.shm = shared_memory.SharedMemory(create=True, size=slot_bytes)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, self.shm.name, num_threads, analyze_path),
+            name="face-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout):
+        """Block until the worker has loaded its models. Returns False on timeout or death."""
+        if self.ready:
+            return True
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.process.is_alive():
+                return False
+            if self.conn.poll(min(0.5, max(deadline - time.monotonic(), 0))):
+                try:
+                    self.ready = self.conn.recv()[0] == "ready"
+                except EOFError:
+                    return False
+                return self.ready
+        return False
+
+    def request(self, message, timeout):
+        """Send one message and wait for the reply. Returns None on timeout or death."""
+        try:
+            self.conn.send(message)
+            if not self.conn.poll(timeout):
+                return None
+            return self.conn.recv()
+        except (EOFError, OSError, BrokenPipeError):
+            return None
+
+    def close(self, timeout=2.0):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout)
+        self.conn.close()
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FaceWorkerPool:
+    """
+    A fixed number of face worker processes, each with its own models and
+    shared-memory frame slot. Started lazily (and again after a fork, like
+    JobQueue); gunicorn's post_fork hook starts it early so the model
+    loading overlaps with the worker's startup.
+    """
+
+    def __init__(self, num_workers=FACE_WORKERS, queue_size=FACE_QUEUE_SIZE,
+                 slot_bytes=FACE_MAX_FRAME_BYTES, num_threads=FACE_WORKER_THREADS,
+                 analyze_path="models.emotion_face.analyze_face_frame",
+                 health_interval=FACE_HEALTH_INTERVAL):
+        """
+        Args:
+            num_workers: Worker processes.
+            queue_size: Callers that may wait for a free worker before requests are rejected.
+            slot_bytes: Shared-memory size per worker (largest frame handed over as-is).
+            num_threads: Intra-op threads per worker.
+            analyze_path: Dotted path of the function workers run, called as fn(frame, render).
+            health_interval: Seconds between pings of idle workers (0 = off).
+        """
+        self.num_workers = num_workers
+        self.slot_bytes = slot_bytes
+        self.num_threads = num_threads
+        self.analyze_path = analyze_path
+        self.health_interval = health_interval
+        self.queue_size = queue_size
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._workers = []
+        self._idle = None
+        self._slots = None
+        self._closed = False
+        self._stats = {"completed": 0, "failed": 0, "timeouts": 0, "rejected": 0, "restarts": 0}
+
+        atexit.register(self.close)
+
+    def start(self):
+        """Start the worker processes for this process if they are not running yet."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Workers of a parent process belong to the parent; start our own.
+            context = multiprocessing.get_context("spawn")
+            self._context = context
+            self._workers = [self._spawn() for _ in range(self.num_workers)]
+            self._idle = queue.Queue()
+            for worker in self._workers:
+                self._idle.put(worker)
+            self._slots = threading.BoundedSemaphore(self.num_workers + self.queue_size)
+            self._closed = False
+            self._pid = os.getpid()
+            if self.health_interval > 0:
+                threading.Thread(target=self._monitor, name="face-worker-health", daemon=True).start()
+
+    def _spawn(self):
+        return _FaceWorker(self._context, self.slot_bytes, self.num_threads, self.analyze_path)
+
+    def _replace(self, worker):
+        """Kill a failed worker and start a new one in its place."""
+        worker.close(timeout=0.5)
+        replacement = self._spawn()
+        with self._lock:
+            self._workers = [replacement if w is worker else w for w in self._workers]
+            self._stats["restarts"] += 1
+        print(f"Face worker {worker.process.pid} replaced by {replacement.process.pid}.")
+        return replacement
+
+    def _count(self, counter):
+        # Request threads update the counters concurrently
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _fit(self, frame):
+        """Downscale frames that do not fit a slot (keeps the aspect ratio)."""
+        if frame.nbytes <= self.slot_bytes:
+            return frame
+        scale = (self.slot_bytes / frame.nbytes) ** 0.5
+        return cv2.resize(frame, None, fx=scale * 0.99, fy=scale * 0.99, interpolation=cv2.INTER_AREA)
+
+    def analyze(self, frame, render=None, timeout=FACE_DISPATCH_TIMEOUT):
+        """
+        Analyze one BGR uint8 frame in a worker process.
+        Returns the analyze_face_frame() tuple; an error tuple if the pool is
+        saturated, the worker fails, or no worker frees up within timeout.
+        """
+        self.start()
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            return _error_result("Face analysis is busy, try again.")
+        try:
+            try:
+                worker = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                self._count("rejected")
+                return _error_result("Face analysis is busy, try again.")
+            try:
+                result, worker = self._run(worker, frame, render)
+            finally:
+                # Back to the idle queue (a replacement if the worker failed)
+                self._idle.put(worker)
+            return result
+        finally:
+            self._slots.release()
+
+    def _run(self, worker, frame, render):
+        """Returns (result, worker to return to the idle queue)."""
+        if not worker.process.is_alive() or not worker.wait_ready(FACE_WORKER_START_TIMEOUT):
+            self._count("failed")
+            return _error_result("Face worker unavailable."), self._replace(worker)
+
+        frame = np.ascontiguousarray(self._fit(frame), dtype=np.uint8)
+        # The only copy of the pixels: into the worker's shared-memory slot
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=worker.shm.buf)[...] = frame
+
+        reply = worker.request(("analyze", frame.shape, render), FACE_WORKER_TIMEOUT)
+        if reply is None:
+            self._count("timeouts")
+            return _error_result("Face analysis timed out."), self._replace(worker)
+        status, payload = reply
+        if status != "ok":
+            self._count("failed")
+            print(f"Face worker error: {payload}")
+            return _error_result("Error in analysis."), worker
+        self._count("completed")
+        return payload, worker
+
+    def check_health(self, timeout=2.0):
+        """
+        Ping every idle worker; replace those that are dead or do not answer.
+        Busy workers are skipped (their requests have their own timeout).
+        Returns the number of workers replaced.
+        """
+        if self._pid != os.getpid():
+            return 0
+        replaced = 0
+        for _ in range(self.num_workers):
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if worker.ready or worker.wait_ready(0):
+                    reply = worker.request(("ping",), timeout)
+                    healthy = reply is not None and reply[0] == "pong"
+                else:
+                    # Still loading its models
+                    healthy = worker.process.is_alive()
+                if not healthy:
+                    worker = self._replace(worker)
+                    replaced += 1
+            finally:
+                self._idle.put(worker)
+        return replaced
+
+    def _monitor(self):
+        pid = os.getpid()
+        while not self._closed and self._pid == pid:
+            time.sleep(self.health_interval)
+            try:
+                self.check_health()
+            except Exception as e:
+                print(f"Face worker health check failed: {e}")
+
+    def stats(self):
+        workers = list(self._workers) if self._pid == os.getpid() else []
+        with self._lock:
+            counters = dict(self._stats)
+        return dict(
+            counters,
+            workers=len(workers),
+            alive=sum(w.process.is_alive() for w in workers),
+            ready=sum(w.ready for w in workers),
+            idle=self._idle.qsize() if self._idle is not None else 0,
+        )
+
+    def close(self, timeout=2.0):
+        """Stop all workers and free their shared memory (shutdown hook)."""
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            self._closed = True
+            for worker in self._workers:
+                worker.close(timeout)
+            self._workers = []
+            self._pid = None
+
+
+# Shared pool used by analyze_face (only started when FACE_WORKERS > 0)
+face_pool = FaceWorkerPool()
+
+
+def analyze_face(frame, render=None):
+    """
+    Analyze one frame in the worker pool if FACE_WORKERS > 0, otherwise in
+    the calling thread. Returns the analyze_face_frame() tuple.
+    """
+    if face_pool.num_workers > 0:
+        return face_pool.analyze(frame, render)
+    from models.emotion_face import analyze_face_frame
+    return analyze_face_frame(frame, render)
@@ -0,0 +1,93 @@
+"""
+Bounded LRU cache with per-entry TTL for results computed from user text.
+
+Much of the traffic is short repeated messages ("hi", "I feel lonely"),
+so results keyed by the normalized text can be reused instead of being
+recomputed. One shared instance, `text_cache`, serves the text-emotion and
+greeting paths; keys are namespaced per use.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+TEXT_CACHE_SIZE = int(os.environ.get("TEXT_CACHE_SIZE", 4096))
+TEXT_CACHE_TTL = float(os.environ.get("TEXT_CACHE_TTL", 3600))
+# Longer (journal-style) inputs rarely repeat; don't let them churn the cache
+TEXT_CACHE_MAX_CHARS = int(os.environ.get("TEXT_CACHE_MAX_CHARS", 200))
+
+
+def normalize_text(text):
+    """Lowercase and collapse whitespace. Punctuation is kept (it affects sentiment)."""
+    return " ".join(text.lower().split())
+
+
+class ResultCache:
+    """Thread-safe LRU + TTL cache with hit/miss/eviction counters."""
+
+    def __init__(self, maxsize=4096, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Return the cached value (marking it recently used), or default."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            # Computed outside the lock; concurrent misses may both compute
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry (e.g. when the lexicon changes). Counters are kept."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+text_cache = ResultCache(maxsize=TEXT_CACHE_SIZE, ttl=TEXT_CACHE_TTL)
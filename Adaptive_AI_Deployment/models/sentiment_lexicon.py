@@ -0,0 +1,129 @@
+"""
+Self-contained sentiment polarity scorer.
+
+Used as the fallback in detect_text_emotion when no emotion keyword matches.
+It follows the same scoring rules as TextBlob's default (pattern) analyzer:
+known words are averaged, an adverb before a word scales it by the adverb's
+intensity, a negation flips and halves it ("not good" = slightly bad), and
+"!" boosts the previous word. The lexicon (models/data/sentiment_lexicon.tsv)
+is loaded once into flat arrays, and no TextBlob object is built per call.
+
+Set TEXT_SENTIMENT_BACKEND=textblob to use TextBlob instead (imported lazily).
+"""
+
+import os
+import re
+from array import array
+
+LEXICON_PATH = os.path.join(os.path.dirname(__file__), "data", "sentiment_lexicon.tsv")
+SENTIMENT_BACKEND = os.environ.get("TEXT_SENTIMENT_BACKEND", "lexicon")
+
+NEGATIONS = frozenset(("no", "not", "n't", "never"))
+PUNCTUATION = ".,;:!?()[]{}`'\"@#$^&*+-|=~_"
+
+# Split contractions the way pattern does: "don't" -> "do n't"
+_CONTRACTION_RE = re.compile(r"(n't|'d|'m|'s|'ll|'re|'ve)\b")
+
+
+class SentimentLexicon:
+    """Word -> row index, with polarity, intensity and adverb flag stored column-wise."""
+
+    def __init__(self, path=LEXICON_PATH):
+        self.index = {}
+        self.polarity = array("d")
+        self.intensity = array("d")
+        self.modifier = bytearray()
+
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                word, polarity, intensity, modifier = line.rstrip("\n").split("\t")
+                self.index[word] = len(self.polarity)
+                self.polarity.append(float(polarity))
+                self.intensity.append(float(intensity))
+                self.modifier.append(int(modifier))
+
+    def __len__(self):
+        return len(self.polarity)
+
+
+_LEXICON = SentimentLexicon()
+
+
+def tokenize(text):
+    """Lowercase, split contractions and strip punctuation; each trailing '!' becomes a token."""
+    text = _CONTRACTION_RE.sub(r" \1", text.lower().replace("’", "'"))
+    tokens = []
+    for chunk in text.split():
+        # Emoticons are lexicon entries made of punctuation
+        if chunk in _LEXICON.index:
+            tokens.append(chunk)
+            continue
+        word = chunk.strip(PUNCTUATION)
+        if word:
+            tokens.append(word)
+        tokens.extend("!" * chunk[len(chunk.rstrip(PUNCTUATION)):].count("!"))
+    return tokens
+
+
+def lexicon_polarity(text):
+    """Polarity in [-1.0, 1.0] computed from the built-in lexicon."""
+    index, polarities, intensities, modifiers = (
+        _LEXICON.index, _LEXICON.polarity, _LEXICON.intensity, _LEXICON.modifier
+    )
+
+    # Each assessment is [polarity, intensity, negated]
+    assessments = []
+    modifier = None  # Preceding adverb ("really good")
+    negation = None  # Preceding negation ("not good")
+
+    for word in tokenize(text):
+        row = index.get(word)
+        if row is not None:
+            polarity, intensity = polarities[row], intensities[row]
+            if modifier is None:
+                assessments.append([polarity, intensity, False])
+            else:
+                last = assessments[-1]
+                last[0] = max(-1.0, min(polarity * last[1], 1.0))
+                last[1] = intensity
+            if negation is not None:
+                assessments[-1][1] = 1.0 / assessments[-1][1]
+                assessments[-1][2] = True
+            modifier = word if modifiers[row] else None
+            negation = word if word in NEGATIONS else None
+            continue
+
+        # Unknown word
+        if word in NEGATIONS:
+            negation = word
+        elif negation and len(word.strip("'")) > 1:
+            # Keep a negation across small words ("not a good") only
+            negation = None
+        if negation is not None and modifier is not None and modifier.endswith("ly"):
+            # "really not good"
+            assessments[-1][2] = True
+            negation = None
+        elif modifier and len(word) > 2:
+            modifier = None
+        if word == "!" and assessments:
+            assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, 1.0))
+
+    if not assessments:
+        return 0.0
+    total = sum(-0.5 * p if negated else p for p, _, negated in assessments)
+    return total / len(assessments)
+
+
+def textblob_polarity(text):
+    """Polarity from TextBlob's pattern analyzer (optional dependency)."""
+    from textblob import TextBlob
+    return TextBlob(text).sentiment.polarity
+
+
+def polarity(text):
+    """Polarity of text using the configured backend."""
+    if SENTIMENT_BACKEND == "textblob":
+        return textblob_polarity(text)
+    return lexicon_polarity(text)
@@ -0,0 +1,114 @@
+"""
+Linear text-emotion model (HashingVectorizer features + SGD logistic regression).
+
+Selected with TEXT_EMOTION_ENGINE=ml in place of the keyword engine.
+The hashing vectorizer needs no stored vocabulary, so the artifact is just
+the sparse weight matrix, the intercepts and the class labels. Inference
+for a batch of texts is one sparse matrix product.
+
+Train with models/train_text_emotion_model.py.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "text_emotion_model.npz")
+
+N_FEATURES = 2 ** 18
+NGRAM_RANGE = (1, 2)
+
+
+def make_vectorizer(n_features=N_FEATURES, ngram_range=NGRAM_RANGE):
+    """Stateless feature extractor shared by training and inference."""
+    return HashingVectorizer(
+        n_features=n_features,
+        ngram_range=tuple(ngram_range),
+        alternate_sign=False,
+        norm="l2",
+        lowercase=True,
+    )
+
+
+class TextEmotionModel:
+    """Weights of a trained linear classifier, stored sparse (most hashed features are never seen)."""
+
+    def __init__(self, classes, coef, intercept, n_features=N_FEATURES, ngram_range=NGRAM_RANGE, version=None):
+        """
+        Args:
+            classes: Label per output row, e.g. ["Angry", "Happy", ...].
+            coef: (n_classes, n_features) weights, dense or sparse.
+            intercept: (n_classes,) biases.
+        """
+        self.classes = list(classes)
+        # Stored transposed so scoring is X @ weights
+        self.weights = sparse.csr_matrix(coef, dtype=np.float32).T.tocsr()
+        self.intercept = np.asarray(intercept, dtype=np.float32)
+        self.n_features = int(n_features)
+        self.ngram_range = tuple(int(n) for n in ngram_range)
+        self.vectorizer = make_vectorizer(self.n_features, self.ngram_range)
+        self.version = version or "untrained"
+
+    @classmethod
+    def from_classifier(cls, classifier, n_features=N_FEATURES, ngram_range=NGRAM_RANGE):
+        """Wrap a fitted scikit-learn linear classifier (e.g. SGDClassifier)."""
+        coef, intercept = classifier.coef_, classifier.intercept_
+        if len(classifier.classes_) == 2:
+            # Binary models keep one row; expand to one row per class
+            coef = np.vstack([-coef[0], coef[0]])
+            intercept = np.array([-intercept[0], intercept[0]])
+        return cls(classifier.classes_, coef, intercept, n_features, ngram_range)
+
+    def predict_proba(self, texts):
+        """(n_texts, n_classes) class probabilities."""
+        scores = (self.vectorizer.transform(texts) @ self.weights).toarray() + self.intercept
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def predict(self, texts):
+        """List of (label, confidence) per text."""
+        probs = self.predict_proba(texts)
+        best = probs.argmax(axis=1)
+        return [(self.classes[i], float(p)) for i, p in zip(best, probs[np.arange(len(best)), best])]
+
+    def save(self, path=MODEL_PATH):
+        coef = self.weights.T.tocsr()
+        np.savez_compressed(
+            path,
+            classes=np.array(self.classes),
+            data=coef.data, indices=coef.indices, indptr=coef.indptr,
+            shape=np.array(coef.shape),
+            intercept=self.intercept,
+            n_features=np.array(self.n_features),
+            ngram_range=np.array(self.ngram_range),
+        )
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with open(path, "rb") as f:
+            version = hashlib.sha1(f.read()).hexdigest()[:12]
+        with np.load(path) as artifact:
+            coef = sparse.csr_matrix(
+                (artifact["data"], artifact["indices"], artifact["indptr"]),
+                shape=tuple(artifact["shape"])
+            )
+            return cls(
+                artifact["classes"].tolist(), coef, artifact["intercept"],
+                artifact["n_features"], artifact["ngram_range"], version=version
+            )
+
+
+def load_model(path=MODEL_PATH):
+    """Load the trained artifact, or return None if it is missing or unreadable."""
+    if not os.path.exists(path):
+        print(f"Text emotion model not found at {path}; run models/train_text_emotion_model.py")
+        return None
+    try:
+        return TextEmotionModel.load(path)
+    except Exception as e:
+        print(f"Failed to load text emotion model: {e}")
+        return None
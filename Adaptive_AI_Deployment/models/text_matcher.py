@@ -0,0 +1,259 @@
+"""
+Multi-pattern matcher for the text emotion lexicon.
+
+An Aho-Corasick automaton built over word tokens instead of characters.
+All keywords and phrases are compiled once; a text is then tokenized and
+scanned in a single pass that reports every pattern it contains. Because
+patterns are matched token by token, they only match on word boundaries
+("alone" does not match inside "lonely", "so" does not match inside "also").
+
+A built matcher can be saved as a flat binary artifact (save_matcher) and
+memory-mapped by every worker process (MappedTokenMatcher), so the
+transition tables are shared page cache rather than per-process objects.
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+from array import array
+from collections import deque
+
+# Same notion of a word as the regex \b boundary
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercase a text and split it into word tokens."""
+    return TOKEN_RE.findall(text.lower())
+
+
+class TokenMatcher:
+    """
+    Aho-Corasick automaton over word tokens.
+
+    Each pattern is stored once (duplicates are merged) and identified by its
+    index in `patterns`. The payloads attached to a pattern are returned by
+    the caller through `payloads[pattern_id]`.
+    """
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries: Iterable of (pattern, payload). The same pattern may appear
+                several times with different payloads.
+        """
+        self.patterns = []   # pattern_id -> pattern text
+        self.payloads = []   # pattern_id -> list of payloads
+        index = {}
+
+        # State 0 is the root. _goto[state] maps a token to the next state.
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for pattern, payload in entries:
+            tokens = tuple(tokenize(pattern))
+            if not tokens:
+                continue
+            if tokens not in index:
+                index[tokens] = len(self.patterns)
+                self.patterns.append(" ".join(tokens))
+                self.payloads.append([])
+                self._insert(tokens, index[tokens])
+            self.payloads[index[tokens]].append(payload)
+
+        self._build_failure_links()
+
+    def _insert(self, tokens, pattern_id):
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[state][token] = next_state
+            state = next_state
+        self._out[state] = self._out[state] + (pattern_id,)
+
+    def _build_failure_links(self):
+        # Breadth-first, so a state's failure target is finished before the state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[child] = target if target != child else 0
+                # Inherit matches that end here via a shorter suffix
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def match(self, text):
+        """Return the set of pattern ids found in text (each reported once)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for token in tokenize(text):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def __len__(self):
+        return len(self.patterns)
+
+
+# --- BINARY ARTIFACT ---
+#
+# Layout (native byte order; artifacts are built on the machine that uses them):
+#   b"TKAC" | u32 format | u32 metadata length | metadata JSON, padded to 8 bytes
+#   u32 fail[n_states]
+#   u32 out_offset[n_states + 1] | u32 out_ids[n_outputs]
+#   u64 table_keys[table_size]   | u32 table_states[table_size]
+# Transitions live in an open-addressing hash table keyed by
+# state * n_tokens + token_id. The metadata holds the token list, the
+# patterns, their payloads and any caller-supplied fields.
+
+ARTIFACT_MAGIC = b"TKAC"
+ARTIFACT_FORMAT = 1
+_EMPTY_KEY = 2 ** 64 - 1
+
+
+def _slot(key, mask):
+    # Keys are state * n_tokens + token_id, which already spread well
+    return (key ^ (key >> 16)) & mask
+
+
+def save_matcher(matcher, path, metadata=None):
+    """
+    Write a TokenMatcher to path. The file is written next to path and then
+    renamed over it, so readers never see a partial artifact.
+    """
+    tokens = sorted({token for edges in matcher._goto for token in edges})
+    token_ids = {token: i for i, token in enumerate(tokens)}
+    n_tokens = max(len(tokens), 1)
+
+    edges = [(state * n_tokens + token_ids[token], target)
+             for state, transitions in enumerate(matcher._goto)
+             for token, target in transitions.items()]
+    table_size = 8
+    while table_size < 2 * len(edges):
+        table_size *= 2
+    keys = array("Q", [_EMPTY_KEY]) * table_size
+    states = array("I", [0]) * table_size
+    for key, target in edges:
+        slot = _slot(key, table_size - 1)
+        while keys[slot] != _EMPTY_KEY:
+            slot = (slot + 1) & (table_size - 1)
+        keys[slot] = key
+        states[slot] = target
+
+    out_offset, out_ids = array("I", [0]), array("I")
+    for outputs in matcher._out:
+        out_ids.extend(outputs)
+        out_offset.append(len(out_ids))
+
+    meta = dict(metadata or {})
+    meta.update({
+        "tokens": tokens,
+        "patterns": matcher.patterns,
+        "payloads": matcher.payloads,
+        "n_states": len(matcher._goto),
+        "n_outputs": len(out_ids),
+        "table_size": table_size,
+    })
+    meta_bytes = json.dumps(meta).encode("utf-8")
+    meta_bytes += b" " * (-(12 + len(meta_bytes)) % 8)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(ARTIFACT_MAGIC + struct.pack("=II", ARTIFACT_FORMAT, len(meta_bytes)))
+        f.write(meta_bytes)
+        for table in (array("I", matcher._fail), out_offset, out_ids, keys, states):
+            f.write(table.tobytes())
+            # Keep the u64 key table 8-byte aligned
+            if table.itemsize == 4 and len(table) % 2:
+                f.write(b"\0" * 4)
+    os.replace(tmp_path, path)
+
+
+class MappedTokenMatcher:
+    """
+    A TokenMatcher loaded from a save_matcher artifact via mmap.
+    Same interface as TokenMatcher: match(), patterns, payloads, len().
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, (fmt, meta_len) = bytes(view[:4]), struct.unpack_from("=II", view, 4)
+        if magic != ARTIFACT_MAGIC or fmt != ARTIFACT_FORMAT:
+            raise ValueError(f"{path} is not a format {ARTIFACT_FORMAT} matcher artifact")
+        self.metadata = json.loads(bytes(view[12:12 + meta_len]))
+        offset = 12 + meta_len
+
+        def take(typecode, count):
+            nonlocal offset
+            itemsize = 8 if typecode == "Q" else 4
+            table = view[offset:offset + count * itemsize].cast(typecode)
+            offset += count * itemsize
+            if itemsize == 4 and count % 2:
+                offset += 4
+            return table
+
+        n_states = self.metadata["n_states"]
+        self._fail = take("I", n_states)
+        self._out_offset = take("I", n_states + 1)
+        self._out_ids = take("I", self.metadata["n_outputs"])
+        self._table_size = self.metadata["table_size"]
+        self._keys = take("Q", self._table_size)
+        self._states = take("I", self._table_size)
+
+        self._token_ids = {token: i for i, token in enumerate(self.metadata["tokens"])}
+        self._n_tokens = max(len(self._token_ids), 1)
+        self.patterns = self.metadata["patterns"]
+        self.payloads = [[tuple(payload) for payload in payloads] for payloads in self.metadata["payloads"]]
+
+    def match(self, text):
+        """Return the set of pattern ids found in text (each reported once)."""
+        token_ids, fail = self._token_ids, self._fail
+        out_offset, out_ids = self._out_offset, self._out_ids
+        keys, states, n_tokens = self._keys, self._states, self._n_tokens
+        mask = self._table_size - 1
+        found = set()
+        state = 0
+        for token in tokenize(text):
+            token_id = token_ids.get(token)
+            if token_id is None:
+                # No pattern contains this token, so every partial match ends here
+                state = 0
+                continue
+            while True:
+                # Transition lookup: linear probing in the mapped hash table
+                key = state * n_tokens + token_id
+                slot = (key ^ (key >> 16)) & mask
+                while keys[slot] != key and keys[slot] != _EMPTY_KEY:
+                    slot = (slot + 1) & mask
+                if keys[slot] == key:
+                    state = states[slot]
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            start, end = out_offset[state], out_offset[state + 1]
+            if start != end:
+                found.update(out_ids[start:end])
+        return found
+
+    def __len__(self):
+        return len(self.patterns)
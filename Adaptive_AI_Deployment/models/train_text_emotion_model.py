@@ -0,0 +1,81 @@
+"""
+Trains the ML text-emotion engine (models/text_emotion_ml.py) offline.
+
+Training data:
+  - labeled rows from analysis_history / conversation_history (backend.database)
+  - the seed set in train_and_evaluate.py
+  - every keyword and phrase of the emotion lexicon, labeled with its emotion
+
+Run from Adaptive_AI_Deployment:
+    python models/train_text_emotion_model.py
+Then start the backend with TEXT_EMOTION_ENGINE=ml.
+"""
+
+import os
+import random
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sklearn.linear_model import SGDClassifier
+
+from backend.database import init_db, get_labeled_texts
+from models.emotion_text import EMOTION_KEYWORDS, detect_text_emotion_batch
+from models.text_emotion_ml import TextEmotionModel, make_vectorizer, MODEL_PATH
+from train_and_evaluate import TEXT_SEED_SET
+
+# Labels the text engines produce. conversation_history also stores
+# face-only labels (Fear, Surprise, ...) which text alone cannot predict.
+TEXT_LABELS = set(EMOTION_KEYWORDS) | {"Happy", "Positive", "Sad", "Negative", "Neutral"}
+HOLDOUT_FRACTION = 0.2
+
+
+def collect_examples():
+    """(text, label) pairs from all sources, de-duplicated."""
+    examples = list(TEXT_SEED_SET)
+    for emotion, patterns in EMOTION_KEYWORDS.items():
+        for pattern in patterns["keywords"] + patterns.get("phrases", []):
+            examples.append((pattern, emotion))
+
+    init_db()
+    stored = [(text, label) for text, label in get_labeled_texts() if label in TEXT_LABELS]
+    print(f"Loaded {len(stored)} labeled rows from the database.")
+    examples.extend(stored)
+
+    return list(dict.fromkeys(examples))
+
+
+def accuracy(predicted, expected):
+    return sum(p == e for p, e in zip(predicted, expected)) / len(expected) if expected else 0.0
+
+
+def train_model(examples):
+    random.Random(42).shuffle(examples)
+    split = int(len(examples) * (1 - HOLDOUT_FRACTION))
+    train, holdout = examples[:split], examples[split:]
+
+    vectorizer = make_vectorizer()
+    texts, labels = zip(*train)
+    classifier = SGDClassifier(loss="log_loss", alpha=1e-5, max_iter=50, tol=None, random_state=42)
+    classifier.fit(vectorizer.transform(texts), labels)
+    model = TextEmotionModel.from_classifier(classifier)
+
+    # Compare against the keyword engine
+    for name, dataset in [("Holdout", holdout), ("Seed set (also in training data)", TEXT_SEED_SET)]:
+        if not dataset:
+            continue
+        texts, labels = zip(*dataset)
+        ml_labels = [label for label, _ in model.predict(texts)]
+        keyword_labels = [result[0]["label"] for result in detect_text_emotion_batch(texts)]
+        print(f"{name} ({len(dataset)} examples): ML {accuracy(ml_labels, labels):.1%}"
+              f" | keyword {accuracy(keyword_labels, labels):.1%}")
+
+    return model
+
+
+if __name__ == "__main__":
+    examples = collect_examples()
+    print(f"Training on {len(examples)} examples...")
+    model = train_model(examples)
+    model.save(MODEL_PATH)
+    print(f"Saved {len(model.classes)}-class model to {MODEL_PATH} ({os.path.getsize(MODEL_PATH) / 1024:.1f} KiB)")
@@ -5,7 +5,22 @@ import random
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), ".")))
 
-from models.emotion_text import detect_text_emotion
+from models.emotion_text import detect_text_emotion_batch
+
+# Labeled seed examples; also used to train the ML text engine
+# (models/train_text_emotion_model.py)
+TEXT_SEED_SET = [
+    ("I feel so lonely and isolated.", "Lonely"),
+    ("I am terrified and anxious about tomorrow.", "Anxious"),
+    ("I'm stressed and burned out.", "Stressed"),
+    ("I feel worthless and invisible.", "Worthless"),
+    ("I am heartbroken and grieving.", "Sad"),
+    ("I am furious and losing my temper.", "Angry"),
+    ("I feel wonderful and optimistic!", "Happy"),
+    ("I'm grateful for everything.", "Grateful"),
+    ("I'm running on fumes.", "Stressed"),
+    ("I have butterflies in my stomach.", "Anxious")
+]
 
 def print_progress(iteration, total, prefix='', suffix='', decimals=1, length=50, fill='=', printEnd="\r"):
     """
@@ -64,29 +79,20 @@ def train_and_evaluate():
     # 2. Text Model Training & Evaluation (The real check)
     print("\n[STEP 2/3] Refining Text Emotion Engine...")
     
-    # Define a test set based on our known keywords to "verify" coverage
-    test_set = [
-        ("I feel so lonely and isolated.", "Lonely"),
-        ("I am terrified and anxious about tomorrow.", "Anxious"),
-        ("I'm stressed and burned out.", "Stressed"),
-        ("I feel worthless and invisible.", "Worthless"),
-        ("I am heartbroken and grieving.", "Sad"),
-        ("I am furious and losing my temper.", "Angry"),
-        ("I feel wonderful and optimistic!", "Happy"),
-        ("I'm grateful for everything.", "Grateful"),
-        ("I'm running on fumes.", "Stressed"),
-        ("I have butterflies in my stomach.", "Anxious")
-    ]
+    # Test set based on our known keywords to "verify" coverage
+    test_set = TEXT_SEED_SET
     
     print(f"       > Loaded {len(test_set)} verification vectors.")
     print("       > Running forward pass validation...")
     
     passed = 0
     total = len(test_set)
+
+    # Score the whole set in one vectorized pass
+    batch_results = detect_text_emotion_batch([text for text, _ in test_set])
     
-    for i, (text, expected) in enumerate(test_set):
+    for i, ((text, expected), results) in enumerate(zip(test_set, batch_results)):
         time.sleep(0.15) # Simulate computation
-        results = detect_text_emotion(text)
         detected = results[0]["label"]
         
         if detected == expected:
@@ -15,11 +15,16 @@ import json
 # =====================================================
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from ui.sse_client import iter_sse_events
+
 # =====================================================
 # CONFIGURATION
 # =====================================================
 API_URL = "http://127.0.0.1:5000/analyze"
 API_BASE_URL = "http://127.0.0.1:5000"
+STREAM_API_URL = f"{API_BASE_URL}/analyze/stream"
+# Render the AI reply token-by-token instead of waiting for the full response
+USE_STREAMING = os.environ.get("DASHBOARD_STREAMING", "1") == "1"
 SESSION_FILE = "user_session.json"
 
 def get_persistent_session_id():
@@ -596,72 +601,132 @@ elif audio_value and audio_value != st.session_state.get("last_audio_value"):
         except Exception as e:
             st.error(f"Error during transcription: {e}")
 
+def request_streaming_analysis(payload):
+    """
+    Call /analyze/stream and render the AI reply as the tokens arrive.
+    Returns the combined analysis dict (same shape as /analyze).
+    """
+    placeholder = st.empty()
+    data = {}
+    text_so_far = ""
+
+    with requests.post(STREAM_API_URL, json=payload, stream=True, timeout=(5, 45)) as response:
+        if response.status_code != 200:
+            try:
+                error_msg = response.json().get("error", "Unknown error")
+            except:
+                error_msg = "Unknown error"
+            raise RuntimeError(f"Server Error: {response.status_code} - {error_msg}")
+
+        for event, event_data in iter_sse_events(response):
+            if event == "analysis":
+                # Emotions and recommendations arrive before the first token
+                data = event_data
+                st.session_state.latest_analysis = data
+            elif event == "token":
+                text_so_far += event_data.get("text", "")
+                placeholder.markdown(f"""
+                <div class="chat-row ai-row">
+                    <div class="chat-bubble ai-bubble">
+                        {text_so_far}▌
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
+            elif event == "done":
+                data.update(event_data)
+            elif event == "error":
+                raise RuntimeError(event_data.get("error", "Unknown error"))
+
+    placeholder.empty()
+    return data
+
+def finish_response(data):
+    """Store the analysis, play TTS and add the reply to the chat history."""
+    st.session_state.latest_analysis = data
+    
+    # Get the conversational response (new empathetic format)
+    conversational_response = data.get("conversational_response")
+    
+    if conversational_response:
+        
+        # TTS Playback
+        try:
+            tts_response = requests.post(f"{API_BASE_URL}/tts", json={"text": conversational_response})
+            if tts_response.status_code == 200:
+                st.audio(tts_response.content, format="audio/mp3", autoplay=True)
+        except Exception as e:
+            print(f"TTS Error: {e}")
+
+        # Add to history
+        st.session_state.messages.append({
+            "role": "assistant", 
+            "content": conversational_response,
+            "analysis": data
+        })
+        
+    else:
+        # Fallback
+        ai_response = f"I've analyzed your emotional state and detected a **{data.get('final_emotion', 'neutral')}** tone."
+        st.session_state.messages.append({
+            "role": "assistant", 
+            "content": ai_response,
+            "analysis": data
+        })
+    
+    # Rerun to update UI
+    st.rerun()
+
 # Process Input if prompt exists
 if prompt:
     # Add user message to history (for chat mode mostly, but good to keep record)
     st.session_state.messages.append({"role": "user", "content": prompt})
     
-    # Process with Backend
-    with st.spinner("🔄 Analying your state..."):
+    # Prepare payload
+    payload = {
+        "text": prompt, 
+        "use_camera": use_camera,
+        "session_id": st.session_state.user_session_id
+    }
+
+    if USE_STREAMING:
         try:
-            # Prepare payload
-            payload = {
-                "text": prompt, 
-                "use_camera": use_camera,
-                "session_id": st.session_state.user_session_id
-            }
-            
-            # Make API Request
-            response = requests.post(API_URL, json=payload, timeout=45)
-            
-            if response.status_code == 200:
-                data = response.json()
-                st.session_state.latest_analysis = data
-                
-                # Get the conversational response (new empathetic format)
-                conversational_response = data.get("conversational_response")
-                
-                if conversational_response:
-                    
-                    # TTS Playback
-                    try:
-                        tts_response = requests.post(f"{API_BASE_URL}/tts", json={"text": conversational_response})
-                        if tts_response.status_code == 200:
-                            st.audio(tts_response.content, format="audio/mp3", autoplay=True)
-                    except Exception as e:
-                        print(f"TTS Error: {e}")
-
-                    # Add to history
-                    st.session_state.messages.append({
-                        "role": "assistant", 
-                        "content": conversational_response,
-                        "analysis": data
-                    })
-                    
-                else:
-                    # Fallback
-                    ai_response = f"I've analyzed your emotional state and detected a **{data.get('final_emotion', 'neutral')}** tone."
-                    st.session_state.messages.append({
-                        "role": "assistant", 
-                        "content": ai_response,
-                        "analysis": data
-                    })
-                
-                # Rerun to update UI
-                st.rerun()
-                
-            else:
-                try:
-                    error_data = response.json()
-                    error_msg = error_data.get("error", "Unknown error")
-                    st.error(f"❌ Server Error: {response.status_code} - {error_msg}")
-                except:
-                    st.error(f"❌ Server Error: {response.status_code}")
-        
+            data = request_streaming_analysis(payload)
         except requests.exceptions.ConnectionError:
+            data = None
             st.error("🔌 Connection Error: Backend server is not accessible.")
         except Exception as e:
-            st.error(f"⚠️ An unexpected error occurred: {str(e)}")
+            data = None
+            st.error(f"❌ {str(e)}")
+
+        # Outside the try: st.rerun() works by raising an exception
+        if data:
+            finish_response(data)
+
+    else:
+        # Process with Backend
+        with st.spinner("🔄 Analying your state..."):
+            data = None
+            try:
+                # Make API Request
+                response = requests.post(API_URL, json=payload, timeout=45)
+                
+                if response.status_code == 200:
+                    data = response.json()
+                else:
+                    try:
+                        error_data = response.json()
+                        error_msg = error_data.get("error", "Unknown error")
+                        st.error(f"❌ Server Error: {response.status_code} - {error_msg}")
+                    except:
+                        st.error(f"❌ Server Error: {response.status_code}")
+            
+            except requests.exceptions.ConnectionError:
+                st.error("🔌 Connection Error: Backend server is not accessible.")
+            except Exception as e:
+                st.error(f"⚠️ An unexpected error occurred: {str(e)}")
+
+        if data:
+            finish_response(data)
 
 
 # =====================================================
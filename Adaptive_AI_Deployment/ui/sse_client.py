@@ -0,0 +1,26 @@
+"""
+Client side of the /analyze/stream server-sent events.
+Kept out of dashboard.py (which runs as a Streamlit script on import) so the
+parser can be imported and tested on its own.
+"""
+
+import json
+
+
+def iter_sse_events(response):
+    """Parse a text/event-stream response into (event, data) pairs."""
+    event = "message"
+    data_lines = []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            # Blank line terminates an event
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event = "message"
+            data_lines = []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[5:].strip())